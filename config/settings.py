@@ -14,3 +14,195 @@ OPENAI_TEMPERATURE = 0.7
 
 # Content settings
 MAX_TEXT_LENGTH = 20000  # Characters to use from PDF text
+
+# OpenAI client settings (retries and adaptive concurrency)
+OPENAI_MAX_RETRIES = 6
+OPENAI_BACKOFF_BASE = 1.0  # Seconds, doubled on every retry
+OPENAI_BACKOFF_MAX = 60.0  # Upper bound for a single backoff sleep
+OPENAI_REQUEST_TIMEOUT = 120  # Seconds per HTTP request
+OPENAI_TPM_LIMIT = 200000  # Tokens per minute allowed for the account
+OPENAI_TPM_HEADROOM = 0.9  # Stay just under the TPM limit
+OPENAI_INITIAL_CONCURRENCY = 2
+OPENAI_MAX_CONCURRENCY = 16
+
+# LLM usage metrics
+LLM_METRICS_DB_PATH = BASE_DIR / "llm_metrics.db"
+# USD per 1M tokens: prompt, cached prompt and completion
+OPENAI_PRICING = {
+    "gpt-4o-mini": {"prompt": 0.15, "cached": 0.075, "completion": 0.60},
+    "gpt-4o": {"prompt": 2.50, "cached": 1.25, "completion": 10.00},
+    "gpt-4.1-mini": {"prompt": 0.40, "cached": 0.10, "completion": 1.60},
+    "gpt-4.1-nano": {"prompt": 0.10, "cached": 0.025, "completion": 0.40},
+}
+
+# OpenAI Batch API mode
+BATCH_DIR = BASE_DIR / "batch"
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Model routing: each generation task gets its own model profile.
+# Any key left out falls back to DEFAULT_MODEL_ROUTE.
+DEFAULT_MODEL_ROUTE = {
+    "model": OPENAI_MODEL,
+    "max_tokens": OPENAI_MAX_TOKENS,
+    "temperature": OPENAI_TEMPERATURE,
+    "backend": "openai",
+}
+MODEL_ROUTES = {
+    "caption": {"model": OPENAI_MODEL, "max_tokens": 800, "temperature": 0.7},
+    "image_prompt": {"model": OPENAI_MODEL, "max_tokens": 500, "temperature": 0.7},
+    "visual_prompt": {"model": OPENAI_MODEL, "max_tokens": 600, "temperature": 0.7},  # Image prompts of the videos
+    "video_prompt": {"model": OPENAI_MODEL, "max_tokens": 500, "temperature": 0.7},
+    "description": {"model": OPENAI_MODEL, "max_tokens": 800, "temperature": 0.7},
+    "thumbnail": {"model": OPENAI_MODEL, "max_tokens": 400, "temperature": 0.7},
+    "script": {"model": OPENAI_MODEL, "max_tokens": 4000, "temperature": 0.7},
+    "short_package": {"model": OPENAI_MODEL, "max_tokens": 2800, "temperature": 0.7},
+    "short_script": {"model": OPENAI_MODEL, "max_tokens": 500, "temperature": 0.7},
+    "prompt_repair": {"model": OPENAI_MODEL, "max_tokens": 400, "temperature": 0.3},
+    "prompt_diversify": {"model": OPENAI_MODEL, "max_tokens": 500, "temperature": 0.9},
+}
+# Force every route onto one backend, e.g. LLM_BACKEND=stub for offline tests
+LLM_BACKEND = os.getenv("LLM_BACKEND")
+
+# Hedged requests: once a call is slower than the given percentile of its
+# recent latencies, a duplicate is sent and the first answer wins
+HEDGE_ENABLED = {"openai": False, "wavespeed": False}
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # Latencies needed per task/endpoint before hedging starts
+HEDGE_BUDGET = {"openai": 0.05, "wavespeed": 0.02}  # Max duplicates as a fraction of requests
+HEDGE_HISTORY_SIZE = 200
+HEDGE_HISTORY_PATH = BASE_DIR / "hedge_latency.json"
+LATENCY_FLUSH_INTERVAL = 30  # Seconds between writes of a latency history file (and at exit)
+
+# Prompt linting before paid renders
+PROMPT_LINT_MIN_WORDS = 12
+PROMPT_LINT_MAX_CHARS = 1800
+PROMPT_LINT_THRESHOLD = 0.7  # Minimum score to send a prompt to WaveSpeed
+PROMPT_REPAIR_ATTEMPTS = 1  # LLM repairs before a prompt is rejected
+
+# Follow-up requests for sections a tagged LLM response left out
+MISSING_SECTION_ATTEMPTS = 1
+
+# Short video generation: "package" asks for every component in one completion,
+# "parallel" writes the script first, then the description and visual prompts concurrently
+SHORT_VIDEO_MODE = os.getenv("SHORT_VIDEO_MODE", "package")
+
+# WaveSpeed client
+WAVESPEED_BASE_URL = os.getenv("WAVESPEED_BASE_URL", "https://api.wavespeed.ai/api/v3")
+WAVESPEED_KEY_TTL = 3600  # Seconds before the API key is validated again
+WAVESPEED_POOL_SIZE = 16  # Keep-alive connections per host
+WAVESPEED_REQUEST_TIMEOUT = 30  # Seconds per submit/poll request
+WAVESPEED_SYNC_TIMEOUT = 180  # Seconds a sync-mode submit may block
+WAVESPEED_DOWNLOAD_WORKERS = 4
+WAVESPEED_IMAGE_TIMEOUT = 120  # Seconds from submit until an image job is given up (until learned)
+WAVESPEED_VIDEO_TIMEOUT = 600
+# Public URL that reaches the webhook receiver (e.g. a tunnel)
+WAVESPEED_WEBHOOK_URL = os.getenv("WAVESPEED_WEBHOOK_URL")
+# "poll" checks predictions on a timer; "webhook" has WaveSpeed call a local receiver,
+# and is only used when WAVESPEED_WEBHOOK_URL is set (jobs are polled otherwise)
+WAVESPEED_COMPLETION_MODE = os.getenv("WAVESPEED_COMPLETION_MODE", "poll") if WAVESPEED_WEBHOOK_URL else "poll"
+WAVESPEED_WEBHOOK_HOST = "0.0.0.0"
+WAVESPEED_WEBHOOK_PORT = int(os.getenv("WAVESPEED_WEBHOOK_PORT", "8787"))
+WAVESPEED_WEBHOOK_FALLBACK = 60  # Seconds without a callback before a job is polled
+
+# Learned WaveSpeed poll schedules from recorded submit-to-complete times
+POLL_HISTORY_PATH = BASE_DIR / "wavespeed_timings.json"
+POLL_HISTORY_SIZE = 200
+POLL_MIN_SAMPLES = 10  # Completions needed per endpoint/size/duration before learning
+POLL_START_PERCENTILE = 0.1  # First poll when the fastest typical jobs finish
+POLL_END_PERCENTILE = 0.9  # Dense polling until here, then back off
+POLL_DENSE_STEPS = 8  # Polls spread across the start-to-end window
+POLL_MIN_INTERVAL = 0.25
+POLL_MAX_INTERVAL = 10.0
+POLL_TIMEOUT_PERCENTILE = 0.99
+POLL_TIMEOUT_MARGIN = 3.0  # Learned timeout = p99 x margin
+POLL_MIN_TIMEOUT = 30  # Never give up on a job sooner than this (after WAVESPEED_WEBHOOK_FALLBACK in webhook mode)
+
+# Image delivery: "url" submits, polls and downloads; "sync" waits for the result
+# in the submit call; "base64" also returns the image inline, decoded straight to disk
+WAVESPEED_DELIVERY_MODE = os.getenv("WAVESPEED_DELIVERY_MODE", "url")
+WAVESPEED_SYNC_MODELS = ("bytedance/seedream-v3",)  # Endpoints that support sync/base64 output
+
+# Content-addressed store of finished renders, reused by identical requests
+ASSET_STORE_DIR = BASE_DIR / "asset_store"
+ASSET_STORE_MAX_BYTES = 5 * 1024**3
+ASSET_STORE_REFERENCE_TTL = 24 * 3600  # Seconds a stored video URL is trusted
+# Derive seeds from the request instead of -1 (random), so repeat renders hit the store
+WAVESPEED_DETERMINISTIC_SEED = os.getenv("WAVESPEED_DETERMINISTIC_SEED", "0") == "1"
+
+# Master images: render one high-resolution image per subject and crop the post
+# and long video thumbnails from it locally instead of rendering each
+MASTER_IMAGE_MODE = os.getenv("MASTER_IMAGE_MODE", "0") == "1"
+MASTER_IMAGE_SIZE = (2048, 2048)
+IMAGE_VARIANT_WORKERS = 4
+
+# Near-duplicate visual prompts of one name: "off" renders everything, "reuse" renders
+# one prompt per group (every substitution is logged and recorded), "diversify" has
+# the LLM rewrite the duplicates. Opt-in: reuse puts the same picture in two places
+PROMPT_DEDUPE_ACTION = os.getenv("PROMPT_DEDUPE_ACTION", "off")
+PROMPT_DEDUPE_THRESHOLD = 0.6  # TF-IDF cosine similarity from which prompts count as duplicates
+
+# Downloads of rendered files (resumable, size- and checksum-verified)
+DOWNLOAD_CONNECTIONS = 8  # Files fetched at once
+DOWNLOAD_RETRIES = 4  # Resumed attempts after an interrupted or corrupt transfer
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Journal of WaveSpeed submissions, so restarts and retries resume jobs instead of paying again
+JOB_JOURNAL_PATH = BASE_DIR / "wavespeed_jobs.jsonl"
+JOB_JOURNAL_MAX_AGE = 24 * 3600  # Seconds a journaled job may be resumed or reused
+
+# Concurrency governor: simultaneous jobs per provider and per endpoint, shared by
+# every generator and every name in a run; waiting jobs start longest-first
+PROVIDER_CONCURRENCY = {"wavespeed": 10}  # WaveSpeed's concurrent-job quota for the account
+ENDPOINT_CONCURRENCY = {
+    "wavespeed-ai/wan-2.2/t2v-720p-ultra-fast": 5,
+    "bytedance/seedream-v3": 8,
+}
+EXPECTED_RENDER_SECONDS = {"image": 10.0, "video": 90.0}  # Until completion times are recorded
+WAVESPEED_SUBMIT_WORKERS = 4  # Submit requests sent at once by the render queue
+
+# Local ffmpeg assembly of the finished long and short videos from the rendered assets
+VIDEO_ASSEMBLY = os.getenv("VIDEO_ASSEMBLY", "1") == "1"
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+ASSEMBLY_WORKERS = 4  # Segments encoded at once
+ASSEMBLY_FPS = 30
+NARRATION_WORDS_PER_MINUTE = 150  # Speaking rate that sets how long each section's visual is shown
+ASSEMBLY_MIN_SEGMENT_SECONDS = 3.0
+LONG_VIDEO_SIZE = (1280, 720)
+SHORT_VIDEO_SIZE = (720, 1280)
+
+# Post-processing of finished images: copies written next to each image by a worker
+# pool while the remaining renders run, e.g. long_video_image_1.jpg -> long_video_image_1_web.webp
+IMAGE_POSTPROCESS = os.getenv("IMAGE_POSTPROCESS", "0") == "1"
+IMAGE_POSTPROCESS_WORKERS = 4
+# name -> format (JPEG, PNG, WEBP or AVIF), quality, longest side (None keeps the size), progressive JPEG
+IMAGE_OUTPUT_VARIANTS = {
+    "publish": {"format": "JPEG", "quality": 88, "max_dimension": None, "progressive": True},
+    "web": {"format": "WEBP", "quality": 80, "max_dimension": 1600},
+    "avif": {"format": "AVIF", "quality": 60, "max_dimension": 1600},
+    "preview": {"format": "JPEG", "quality": 70, "max_dimension": 320, "progressive": True},
+}
+
+# Artifact store the generators write through (atomic writes, batched fsync):
+# "local" keeps each name in BASE_DIR/<name>; "tar"/"zip" publish each finished name
+# as one bundle in BASE_DIR, "sqlite" as rows of one database, "s3" as one tar object.
+# Non-local backends generate in ARTIFACT_WORK_DIR, which should be on local disk.
+ARTIFACT_BACKEND = os.getenv("ARTIFACT_BACKEND", "local")
+ARTIFACT_WORK_DIR = Path(os.getenv("ARTIFACT_WORK_DIR", BASE_DIR / "work"))
+ARTIFACT_FSYNC_BATCH = 64  # Files written between fsyncs
+ARTIFACT_SQLITE_PATH = BASE_DIR / "artifacts.sqlite"
+ARTIFACT_S3_BUCKET = os.getenv("ARTIFACT_S3_BUCKET")
+ARTIFACT_S3_PREFIX = os.getenv("ARTIFACT_S3_PREFIX", "")
+ARTIFACT_S3_ENDPOINT = os.getenv("ARTIFACT_S3_ENDPOINT")  # e.g. a local MinIO; None for AWS
+ARTIFACT_S3_PART_SIZE = 16 * 1024**2
+ARTIFACT_S3_CONCURRENCY = 8  # Parts uploaded at once
+
+# Catalog of stage outcomes and generated files (query with: python -m utils.content_catalog)
+CONTENT_CATALOG_DB_PATH = BASE_DIR / "content_catalog.db"
+
+# Structured event log: every message is also appended as a JSON line with its
+# timestamp, level, run ID, name and stage ("" disables the file)
+EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH", str(BASE_DIR / "events.jsonl"))
+EVENT_LOG_CONSOLE = os.getenv("EVENT_LOG_CONSOLE", "text")  # "json" prints the JSON lines instead
+# Prometheus metrics endpoint (counters, histograms and queue depths at /metrics); off unless a port is set
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
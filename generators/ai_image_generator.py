@@ -1,27 +1,41 @@
 # generators/ai_image_generator.py
-import os
-import requests
-import json
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Import from your existing API config
-from utils.api_config import setup_wavespeed_api
+from config.settings import (
+    WAVESPEED_COMPLETION_MODE,
+    WAVESPEED_DELIVERY_MODE,
+    WAVESPEED_SYNC_MODELS,
+    MASTER_IMAGE_SIZE,
+    IMAGE_VARIANT_WORKERS,
+)
+from utils.artifact_store import write_artifact
+from utils.asset_store import get_asset_store, render_seed
+from utils.concurrency_governor import get_concurrency_governor
+from utils.hedging import get_hedge_policy
+from utils.image_variants import derive_variant, record_derivation, postprocess_image
+from utils.job_journal import get_job_journal, register_completion
+from utils.poll_schedule import get_completion_times, render_key
+from utils.render_queue import get_render_queue
+from utils.wavespeed_client import get_wavespeed_client, WaveSpeedError
+from utils.event_log import log
 
-def generate_ai_image(ai_prompt, output_path, width=1024, height=1024, image_name="generated_image.jpg"):
+IMAGE_MODEL = "bytedance/seedream-v3"
+
+class ImageGenerationError(Exception):
+    """Custom exception for image generation errors"""
+    pass
+
+def _prepare_image_job(ai_prompt, output_path, width, height, image_name, delivery=None):
     """
-    Generate AI image using the provided prompt and WaveSpeedAI API
-    
-    Args:
-        ai_prompt (str or Path): AI image prompt text or path to prompt file
-        output_path (Path): Directory or full path to save the generated image
-        width (int): Image width in pixels (default: 1024)
-        height (int): Image height in pixels (default: 1024)
-        image_name (str): Name for the generated image file
+    Read the prompt and work out the payload and output location of an image job
     
     Returns:
-        tuple: (success: bool, image_path: Path or None, error_message: str or None)
+        tuple: (payload: dict, image_path: Path, output_dir: Path)
+    
+    Raises:
+        ImageGenerationError: If the prompt is missing or empty
     """
     # Read prompt from file if a Path is provided
     if isinstance(ai_prompt, Path):
@@ -29,49 +43,28 @@ def generate_ai_image(ai_prompt, output_path, width=1024, height=1024, image_nam
             with open(ai_prompt, 'r', encoding='utf-8') as f:
                 prompt_text = f.read().strip()
         except FileNotFoundError:
-            error_msg = f"AI image prompt file not found: {ai_prompt}"
-            print(f"❌ {error_msg}")
-            return False, None, error_msg
+            raise ImageGenerationError(f"AI image prompt file not found: {ai_prompt}")
         except Exception as e:
-            error_msg = f"Error reading AI image prompt: {e}"
-            print(f"❌ {error_msg}")
-            return False, None, error_msg
+            raise ImageGenerationError(f"Error reading AI image prompt: {e}")
     else:
         prompt_text = str(ai_prompt).strip()
     
     if not prompt_text:
-        error_msg = "AI image prompt is empty"
-        print(f"❌ {error_msg}")
-        return False, None, error_msg
-    
-    print(f"🎨 Using AI image prompt: {prompt_text[:100]}...")
-    print(f"📐 Image size: {width}x{height}")
-    
-    # Get and validate API key using your existing config system
-    API_KEY = setup_wavespeed_api()
-    if not API_KEY:
-        error_msg = "WaveSpeedAI API key is not configured or invalid"
-        print(f"❌ {error_msg}")
-        return False, None, error_msg
-    
-    # Configure API request
-    url = "https://api.wavespeed.ai/api/v3/bytedance/seedream-v3"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {API_KEY}",
-    }
+        raise ImageGenerationError("AI image prompt is empty")
     
-    # Set the specified image size
-    image_size = f"{width}*{height}"
+    log(f"🎨 Using AI image prompt: {prompt_text[:100]}...")
+    log(f"📐 Image size: {width}x{height}")
     
+    delivery = image_delivery_mode(delivery)
     payload = {
-        "enable_base64_output": False,
-        "enable_sync_mode": False,
+        "enable_base64_output": delivery == "base64",
+        "enable_sync_mode": delivery in ("sync", "base64"),
         "guidance_scale": 2.5,
         "prompt": prompt_text,
         "seed": -1,
-        "size": image_size
+        "size": f"{width}*{height}"
     }
+    payload["seed"] = render_seed(IMAGE_MODEL, payload)
     
     # Determine output directory and file path
     if output_path.is_dir():
@@ -83,82 +76,310 @@ def generate_ai_image(ai_prompt, output_path, width=1024, height=1024, image_nam
     
     # Create output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
+    return payload, image_path, output_dir
+
+def _save_image(client, payload, image_url, image_path, output_dir):
+    """
+    Download a finished image, add it to the asset store and record its URL
+    """
+    client.download(image_url, image_path)
+    get_asset_store().put(IMAGE_MODEL, payload, image_path)
+    log(f"✅ Image saved: {image_path}")
+    postprocess_image(image_path)
+    
+    # Also save the image URL for reference
+    url_path = output_dir / "image_url.txt"
+    write_artifact(url_path, image_url)
+    
+    return True, image_path, None
+
+def image_delivery_mode(requested=None):
+    """
+    Delivery mode for the image endpoint: the requested (or configured) mode
+    where the endpoint supports sync/base64 output, "url" otherwise
+    """
+    mode = requested or WAVESPEED_DELIVERY_MODE
+    if mode in ("sync", "base64") and IMAGE_MODEL in WAVESPEED_SYNC_MODELS:
+        return mode
+    return "url"
+
+def _deliver_sync(client, payload, image_path, output_dir):
+    """
+    Render an image in sync mode and write it to image_path (decoded on the fly for base64)
+    """
+    begin = time.monotonic()
+    data, image_url = client.run_sync(IMAGE_MODEL, payload, image_path)
+    get_asset_store().put(IMAGE_MODEL, payload, image_path)
+    delivery = "base64" if payload["enable_base64_output"] else "sync"
+    log(f"✅ Image saved: {image_path} ({time.monotonic() - begin:.2f} seconds, {delivery} delivery)")
+    postprocess_image(image_path)
+    
+    # Also save the image URL for reference (base64 outputs have none)
+    if image_url:
+        write_artifact(output_dir / "image_url.txt", image_url)
+    
+    return True, image_path, None
+
+def _complete_journaled_image(entry, image_url):
+    """
+    Save an image job left outstanding by an earlier run, as submit_ai_image would have
+    """
+    image_path = Path(entry["target"])
+    return _save_image(get_wavespeed_client(), entry["payload"], image_url, image_path, image_path.parent)
+
+register_completion(IMAGE_MODEL, _complete_journaled_image)
+
+def _failed(error_msg):
+    log(f"❌ {error_msg}")
+    return False, None, error_msg
+
+def generate_ai_image(ai_prompt, output_path, width=1024, height=1024, image_name="generated_image.jpg", delivery=None):
+    """
+    Generate AI image using the provided prompt and WaveSpeedAI API
+    
+    Args:
+        ai_prompt (str or Path): AI image prompt text or path to prompt file
+        output_path (Path): Directory or full path to save the generated image
+        width (int): Image width in pixels (default: 1024)
+        height (int): Image height in pixels (default: 1024)
+        image_name (str): Name for the generated image file
+        delivery (str): "url", "sync" or "base64" (default: WAVESPEED_DELIVERY_MODE)
+    
+    Returns:
+        tuple: (success: bool, image_path: Path or None, error_message: str or None)
+    """
+    # Webhook mode completes through the render queue's callback receiver
+    if WAVESPEED_COMPLETION_MODE == "webhook" and image_delivery_mode(delivery) == "url":
+        return wait_for_image(submit_ai_image(ai_prompt, output_path, width, height, image_name))
     
-    # Generate image
     try:
-        begin = time.time()
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        payload, image_path, output_dir = _prepare_image_job(ai_prompt, output_path, width, height, image_name,
+                                                             delivery)
+    except ImageGenerationError as e:
+        return _failed(str(e))
+    
+    # Identical earlier render (deterministic seeds only)
+    if get_asset_store().fetch(IMAGE_MODEL, payload, image_path):
+        postprocess_image(image_path)
+        return True, image_path, None
+    
+    # Shared client: the API key is validated once per process, not per image
+    client = get_wavespeed_client()
+    if not client.api_key():
+        return _failed("WaveSpeedAI API key is not configured or invalid")
+    
+    # Sync/base64 delivery: one request, no polling and no separate download for base64
+    if payload["enable_sync_mode"]:
+        key = render_key(IMAGE_MODEL, payload["size"])
+        try:
+            with get_concurrency_governor().slot("wavespeed", IMAGE_MODEL,
+                                                 get_completion_times().expected(key, "image")):
+                return _deliver_sync(client, payload, image_path, output_dir)
+        except WaveSpeedError as e:
+            return _failed(str(e))
+    
+    # Generate image (hedged against slow WaveSpeed tasks when enabled) once there is
+    # room under the WaveSpeed and endpoint concurrency limits; a duplicate is only
+    # sent if it can get a slot of its own right away
+    governor = get_concurrency_governor()
+    expected = get_completion_times().expected(render_key(IMAGE_MODEL, payload["size"]), "image")
+    try:
+        with governor.slot("wavespeed", IMAGE_MODEL, expected):
+            image_url = get_hedge_policy("wavespeed").run(
+                lambda cancelled: _render_image(client, payload, cancelled, target=image_path),
+                key=f"seedream-v3:{payload['size']}",
+                hedge_slot=lambda: governor.try_acquire("wavespeed", IMAGE_MODEL, expected)
+            )
+        return _save_image(client, payload, image_url, image_path, output_dir)
         
-        if response.status_code == 200:
-            result = response.json()["data"]
-            request_id = result["id"]
-            print(f"✅ Task submitted successfully. Request ID: {request_id}")
-        else:
-            error_msg = f"Error submitting task: {response.status_code}, {response.text}"
-            print(f"❌ {error_msg}")
-            return False, None, error_msg
+    except (ImageGenerationError, WaveSpeedError) as e:
+        return _failed(str(e))
+    except Exception as e:
+        return _failed(f"Error generating image: {e}")
+
+def submit_ai_image(ai_prompt, output_path, width=1024, height=1024, image_name="generated_image.jpg", delivery=None):
+    """
+    Submit an image job to the shared render queue without waiting for it
+    
+    Same arguments as generate_ai_image. Use wait_for_image on the returned
+    future to get the usual (success, image_path, error_message) tuple.
+    
+    Returns:
+        Future: Resolves once the image has been downloaded
+    """
+    try:
+        payload, image_path, output_dir = _prepare_image_job(ai_prompt, output_path, width, height, image_name,
+                                                             delivery)
+        if get_asset_store().fetch(IMAGE_MODEL, payload, image_path):
+            postprocess_image(image_path)
+            future = Future()
+            future.set_result((True, image_path, None))
+            return future
+        client = get_wavespeed_client()
+        if not client.api_key():
+            raise ImageGenerationError("WaveSpeedAI API key is not configured or invalid")
+        if payload["enable_sync_mode"]:
+            return get_render_queue().run_sync(
+                lambda: _deliver_sync(client, payload, image_path, output_dir),
+                label=f"Image {image_path.name}",
+                model=IMAGE_MODEL,
+                key=render_key(IMAGE_MODEL, payload["size"]),
+            )
+        return get_render_queue().submit(
+            IMAGE_MODEL,
+            payload,
+            on_complete=lambda image_url: _save_image(client, payload, image_url, image_path, output_dir),
+            label=f"Image {image_path.name}",
+            key=render_key(IMAGE_MODEL, payload["size"]),
+            kind="image",
+            target=image_path,
+            hedge_key=f"seedream-v3:{payload['size']}",
+        )
+    except Exception as e:
+        future = Future()
+        future.set_exception(e)
+        return future
+
+def wait_for_image(future):
+    """
+    Wait for a submitted image job
+    
+    Returns:
+        tuple: (success: bool, image_path: Path or None, error_message: str or None)
+    """
+    try:
+        return future.result()
+    except (ImageGenerationError, WaveSpeedError) as e:
+        return _failed(str(e))
+    except Exception as e:
+        return _failed(f"Error generating image: {e}")
+
+
+def _render_image(client, payload, cancelled, target=None):
+    """
+    Submit an image task and poll until it completes
+    
+    Args:
+        client (WaveSpeedClient): Shared WaveSpeed client
+        payload (dict): Task payload
+        cancelled (threading.Event): Set when a hedged duplicate has already won
+        target (Path): Where the image will be saved, journaled for a later run
+    
+    Returns:
+        str: URL of the generated image
+    
+    Raises:
+        ImageGenerationError: If the task cannot be submitted, fails or times out
+    """
+    # Poll on the schedule learned from earlier jobs of this size
+    key = render_key(IMAGE_MODEL, payload["size"])
+    schedule = get_completion_times().schedule(key, "image")
+    
+    # A duplicate whose race is already lost must not submit a paid job
+    if cancelled.is_set():
+        raise ImageGenerationError("Task superseded by a hedged request before it was submitted")
+    begin = time.monotonic()
+    journal = get_job_journal()
+    try:
+        request_id = journal.submit(client, IMAGE_MODEL, payload, target=target)
+    except WaveSpeedError as e:
+        raise ImageGenerationError(str(e))
+    try:
+        return _poll_image(client, journal, request_id, key, schedule, begin, cancelled)
+    finally:
+        journal.release(request_id)
+
+
+def _poll_image(client, journal, request_id, key, schedule, begin, cancelled):
+    """
+    Poll a submitted (or resumed) image task until it completes
+    """
+    resumed = request_id in journal.resumed
+    if not resumed:
+        log(f"✅ Task submitted successfully. Request ID: {request_id}")
+    
+    # Poll for results
+    attempts = 0
+    
+    while True:
+        elapsed = time.monotonic() - begin
+        if elapsed > schedule.timeout:
+            raise ImageGenerationError(f"Task timed out after {schedule.timeout:.0f} seconds")
         
-        # Poll for results
-        result_url = f"https://api.wavespeed.ai/api/v3/predictions/{request_id}/result"
+        # Wait for the next scheduled poll (a resumed job may be done already),
+        # stopping early if a hedged duplicate won
+        delay = 0.0 if resumed and not attempts else schedule.next_delay(elapsed)
+        if cancelled.wait(min(delay, schedule.timeout - elapsed)):
+            raise ImageGenerationError(f"Task {request_id} superseded by a hedged request")
         
-        max_attempts = 100  # 10 seconds maximum wait (100 attempts * 0.1s)
-        attempts = 0
+        try:
+            result = client.poll(request_id)
+        except WaveSpeedError as e:
+            raise ImageGenerationError(str(e))
+        status = result["status"]
         
-        while attempts < max_attempts:
-            response = requests.get(result_url, headers=headers)
-            
-            if response.status_code == 200:
-                result = response.json()["data"]
-                status = result["status"]
-                
-                if status == "completed":
-                    end = time.time()
-                    image_url = result["outputs"][0]
-                    print(f"✅ Task completed in {end - begin:.2f} seconds.")
-                    
-                    # Download the image
-                    image_response = requests.get(image_url)
-                    if image_response.status_code == 200:
-                        # Save the image
-                        with open(image_path, 'wb') as f:
-                            f.write(image_response.content)
-                        
-                        print(f"✅ Image saved: {image_path}")
-                        
-                        # Also save the image URL for reference
-                        url_path = output_dir / "image_url.txt"
-                        with open(url_path, 'w', encoding='utf-8') as f:
-                            f.write(image_url)
-                        
-                        return True, image_path, None
-                    else:
-                        error_msg = f"Error downloading image: {image_response.status_code}"
-                        print(f"❌ {error_msg}")
-                        return False, None, error_msg
-                    
-                elif status == "failed":
-                    error_msg = f"Task failed: {result.get('error', 'Unknown error')}"
-                    print(f"❌ {error_msg}")
-                    return False, None, error_msg
-                else:
-                    # Still processing
-                    attempts += 1
-                    if attempts % 10 == 0:  # Print status every 10 attempts
-                        print(f"⏳ Task still processing. Status: {status}")
-                    time.sleep(0.1)
-            else:
-                error_msg = f"Error checking task status: {response.status_code}, {response.text}"
-                print(f"❌ {error_msg}")
-                return False, None, error_msg
+        if status == "completed" and not result.get("outputs"):
+            journal.finished(request_id, "failed", error="no outputs")
+            raise ImageGenerationError(f"Task {request_id} completed with no outputs")
         
-        error_msg = "Task timed out - taking too long to process"
-        print(f"❌ {error_msg}")
-        return False, None, error_msg
+        elif status == "completed":
+            elapsed = time.monotonic() - begin
+            if not resumed:
+                get_completion_times().record(key, elapsed)
+            log(f"✅ Task completed in {elapsed:.2f} seconds.")
+            journal.finished(request_id, "completed", output=result["outputs"][0])
+            return result["outputs"][0]
         
+        elif status == "failed":
+            journal.finished(request_id, "failed", error=result.get("error"))
+            raise ImageGenerationError(f"Task failed: {result.get('error', 'Unknown error')}")
+        else:
+            # Still processing
+            attempts += 1
+            if attempts % 10 == 0:  # Print status every 10 attempts
+                log(f"⏳ Task still processing. Status: {status}")
+
+
+def generate_image_variants(ai_prompt, master_path, variants, master_size=MASTER_IMAGE_SIZE):
+    """
+    Render one high-resolution master image and derive every variant from it locally
+    
+    Each variant is cropped to its aspect ratio around the most detailed part of
+    the master and resized, in a worker pool. How each variant was made is
+    recorded in derived_images.json next to it.
+    
+    Args:
+        ai_prompt (str or Path): AI image prompt text or path to prompt file
+        master_path (Path): Full path of the master image
+        variants (list): (output_path, width, height) of every image to derive
+        master_size (tuple): (width, height) of the master render
+    
+    Returns:
+        tuple: (success: bool, variant paths: list, error_message: str or None)
+    """
+    master_path = Path(master_path)
+    success, _, error = generate_ai_image(ai_prompt, master_path, *master_size, image_name=master_path.name)
+    if not success:
+        return False, [], error
+    
+    def _derive(variant):
+        output_path, width, height = variant
+        derivation = derive_variant(master_path, output_path, width, height)
+        record_derivation(output_path, derivation)
+        postprocess_image(output_path)
+        log(f"✂️ Derived {width}x{height} variant: {output_path}")
+        return Path(output_path)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=IMAGE_VARIANT_WORKERS) as pool:
+            paths = list(pool.map(_derive, variants))
     except Exception as e:
-        error_msg = f"Error generating image: {e}"
-        print(f"❌ {error_msg}")
-        return False, None, error_msg
+        error = f"Error deriving image variants: {e}"
+        log(f"❌ {error}")
+        return False, [], error
+    
+    log(f"✅ {len(paths)} variants derived from one render ({len(paths) - 1} renders saved)")
+    return True, paths, None
 
 
 # Helper function for common use cases
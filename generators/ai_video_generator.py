@@ -1,14 +1,24 @@
 # generators/ai_video_generator.py
-import os
-import requests
-import json
 import time
 import re
-from typing import Optional, Tuple
+import threading
+from concurrent.futures import Future
 from pathlib import Path
+from typing import Callable, Optional, Tuple
 
-# Import from your existing API config
-from utils.api_config import setup_wavespeed_api
+from config.settings import WAVESPEED_VIDEO_TIMEOUT, WAVESPEED_COMPLETION_MODE
+from utils.artifact_store import write_artifact
+from utils.asset_store import get_asset_store, render_seed
+from utils.concurrency_governor import get_concurrency_governor
+from utils.hedging import get_hedge_policy
+from utils.downloader import download_url_files
+from utils.job_journal import get_job_journal, register_completion
+from utils.poll_schedule import get_completion_times, render_key, PollSchedule
+from utils.render_queue import get_render_queue
+from utils.wavespeed_client import get_wavespeed_client, WaveSpeedClient, WaveSpeedError
+from utils.event_log import log
+
+VIDEO_MODEL = "wavespeed-ai/wan-2.2/t2v-720p-ultra-fast"
 
 class VideoGenerationError(Exception):
     """Custom exception for video generation errors"""
@@ -80,7 +90,7 @@ def convert_aspect_ratio_to_api_format(aspect_ratio: str) -> str:
         return "720*1280"
     else:
         # Default to portrait for unrecognized formats
-        print(f"⚠️  Unrecognized aspect ratio '{aspect_ratio}', defaulting to portrait (720*1280)")
+        log(f"⚠️  Unrecognized aspect ratio '{aspect_ratio}', defaulting to portrait (720*1280)")
         return "720*1280"
 
 def generate_ai_video(
@@ -89,7 +99,7 @@ def generate_ai_video(
     aspect_ratio: Optional[str] = None,
     camera_fixed: bool = False,
     seed: int = -1,
-    poll_interval: float = 2.0,
+    poll_interval: Optional[float] = None,
     timeout: int = 600
 ) -> str:
     """
@@ -101,7 +111,8 @@ def generate_ai_video(
         aspect_ratio (str, optional): Video aspect ratio. If None, extracted from prompt
         camera_fixed (bool): Whether to use fixed camera (default: False)
         seed (int): Random seed for reproducibility (default: -1 for random)
-        poll_interval (float): Interval between polling requests in seconds
+        poll_interval (float, optional): Fixed interval between polls; by default the
+            schedule learned from earlier completion times is used
         timeout (int): Maximum time to wait for completion in seconds
     
     Returns:
@@ -110,6 +121,45 @@ def generate_ai_video(
     Raises:
         VideoGenerationError: If video generation fails
     """
+    # Webhook mode completes through the render queue's callback receiver
+    if WAVESPEED_COMPLETION_MODE == "webhook":
+        try:
+            return submit_ai_video(prompt, duration, aspect_ratio, seed, timeout=timeout).result()
+        except WaveSpeedError as e:
+            raise VideoGenerationError(str(e))
+    
+    client, payload = _prepare_video_job(prompt, duration, aspect_ratio, seed)
+    
+    # Identical earlier render (deterministic seeds only)
+    store = get_asset_store()
+    video_url = store.reference(VIDEO_MODEL, payload)
+    if video_url:
+        return video_url
+    
+    # Submit and poll, hedged against slow WaveSpeed tasks when enabled, once there is
+    # room under the WaveSpeed and endpoint concurrency limits; a duplicate is only
+    # sent if it can get a slot of its own right away
+    governor = get_concurrency_governor()
+    expected = get_completion_times().expected(render_key(VIDEO_MODEL, payload["size"], payload["duration"]), "video")
+    with governor.slot("wavespeed", VIDEO_MODEL, expected):
+        video_url = get_hedge_policy("wavespeed").run(
+            lambda cancelled: _submit_and_poll(client, payload, poll_interval, timeout, cancelled),
+            key=f"wan-2.2:{payload['size']}:{payload['duration']}s",
+            hedge_slot=lambda: governor.try_acquire("wavespeed", VIDEO_MODEL, expected)
+        )
+    store.put_reference(VIDEO_MODEL, payload, video_url)
+    return video_url
+
+def _prepare_video_job(prompt, duration, aspect_ratio, seed):
+    """
+    Validate a video request and build its payload
+    
+    Returns:
+        tuple: (client: WaveSpeedClient, payload: dict)
+    
+    Raises:
+        VideoGenerationError: If the key or any input is invalid
+    """
     # Parse metadata from prompt if not explicitly provided
     parsed_duration, parsed_aspect, clean_prompt = parse_video_size_from_prompt(prompt)
     
@@ -117,9 +167,9 @@ def generate_ai_video(
     final_duration = duration if duration is not None else parsed_duration
     final_aspect = aspect_ratio if aspect_ratio is not None else parsed_aspect
     
-    # Get API key using your existing config system
-    api_key = setup_wavespeed_api()
-    if not api_key:
+    # Shared client: the API key is validated once per process, not per video
+    client = get_wavespeed_client()
+    if not client.api_key():
         raise VideoGenerationError("WaveSpeedAI API key is not configured or invalid")
     
     # Validate inputs
@@ -135,13 +185,6 @@ def generate_ai_video(
     # Convert aspect ratio to API format
     api_size_format = convert_aspect_ratio_to_api_format(final_aspect)
     
-    # Updated API configuration with new endpoint
-    url = "https://api.wavespeed.ai/api/v3/wavespeed-ai/wan-2.2/t2v-720p-ultra-fast"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}",
-    }
-    
     payload = {
         "duration": final_duration,
         "negative_prompt": "",
@@ -149,88 +192,178 @@ def generate_ai_video(
         "seed": seed,
         "size": api_size_format  # Use the converted format
     }
+    if seed == -1:
+        payload["seed"] = render_seed(VIDEO_MODEL, payload)
+    
+    log("🎬 Generating video:")
+    log(f"   Prompt: {clean_prompt}")
+    log(f"   Duration: {final_duration}s")
+    log(f"   Size: {api_size_format}")
+    return client, payload
+
+def submit_ai_video(
+    prompt: str,
+    duration: Optional[int] = None,
+    aspect_ratio: Optional[str] = None,
+    seed: int = -1,
+    timeout: int = WAVESPEED_VIDEO_TIMEOUT,
+    on_complete: Optional[Callable[[str], object]] = None,
+    label: str = "Video",
+    url_file: Optional[Path] = None
+) -> Future:
+    """
+    Submit a video job to the shared render queue without waiting for it
     
-    print(f"🎬 Generating video:")
-    print(f"   Prompt: {clean_prompt}")
-    print(f"   Duration: {final_duration}s")
-    print(f"   Size: {api_size_format}")
+    Args:
+        prompt, duration, aspect_ratio, seed: As for generate_ai_video
+        timeout (int): Seconds from submit until the job is given up
+        on_complete (callable): Called with the video URL in a download worker
+        label (str): Name of the job in log output
+        url_file (Path): File on_complete writes the video URL to (e.g. video_url_3.txt);
+            journaled so a later run can deliver the video if this one dies first
     
-    # Submit generation request
-    begin = time.time()
+    Returns:
+        Future: Resolves to on_complete's result (the video URL by default);
+            raises VideoGenerationError or WaveSpeedError on failure
+    """
+    on_complete = on_complete or (lambda video_url: video_url)
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=30)
-    except requests.exceptions.Timeout:
-        raise VideoGenerationError("API request timeout")
-    except requests.exceptions.RequestException as e:
-        raise VideoGenerationError(f"API request failed: {e}")
-    
-    if response.status_code != 200:
-        raise VideoGenerationError(
-            f"API request failed: {response.status_code}, {response.text}"
+        client, payload = _prepare_video_job(prompt, duration, aspect_ratio, seed)
+        
+        # Identical earlier render (deterministic seeds only)
+        store = get_asset_store()
+        video_url = store.reference(VIDEO_MODEL, payload)
+        if video_url:
+            future = Future()
+            future.set_result(on_complete(video_url))
+            return future
+        
+        def _complete(video_url):
+            store.put_reference(VIDEO_MODEL, payload, video_url)
+            return on_complete(video_url)
+        
+        return get_render_queue().submit(
+            VIDEO_MODEL, payload, on_complete=_complete,
+            label=label, timeout=timeout, target=url_file,
+            key=render_key(VIDEO_MODEL, payload["size"], payload["duration"]), kind="video",
+            hedge_key=f"wan-2.2:{payload['size']}:{payload['duration']}s"
         )
+    except Exception as e:
+        future = Future()
+        future.set_exception(e)
+        return future
+
+def _complete_journaled_video(entry, video_url):
+    """
+    Deliver a video job left outstanding by an earlier run: record the URL in its
+    URL file and fetch the clip next to it, as the video generators do
+    """
+    url_file = Path(entry["target"])
+    get_asset_store().put_reference(VIDEO_MODEL, entry["payload"], video_url)
+    write_artifact(url_file, video_url)
+    download_url_files(url_file.parent, pattern=url_file.name)
+    return video_url
+
+register_completion(VIDEO_MODEL, _complete_journaled_video)
+
+def _submit_and_poll(
+    client: WaveSpeedClient,
+    payload: dict,
+    poll_interval: Optional[float],
+    timeout: int,
+    cancelled: threading.Event
+) -> str:
+    """
+    Submit a video task and poll until it completes
     
-    try:
-        result = response.json()["data"]
-        request_id = result["id"]
-        print(f"✅ Task submitted. Request ID: {request_id}")
-    except (KeyError, ValueError) as e:
-        raise VideoGenerationError(f"Invalid API response format: {e}")
+    Args:
+        client (WaveSpeedClient): Shared WaveSpeed client
+        payload (dict): Task payload
+        poll_interval (float, optional): Fixed interval between polls, or None for the learned schedule
+        timeout (int): Maximum time to wait for completion in seconds
+        cancelled (threading.Event): Set when a hedged duplicate has already won
+    
+    Returns:
+        str: URL of the generated video
+    
+    Raises:
+        VideoGenerationError: If video generation fails
+    """
+    # Poll on the schedule learned from earlier jobs of this size and duration,
+    # or at a fixed interval if one was given
+    key = render_key(VIDEO_MODEL, payload["size"], payload["duration"])
+    if poll_interval is None:
+        schedule = get_completion_times().schedule(key, "video")
+    else:
+        schedule = PollSchedule(poll_interval, poll_interval, poll_interval * 5, timeout)
+    timeout = min(timeout, schedule.timeout)
     
-    # Poll for results
-    result_url = f"https://api.wavespeed.ai/api/v3/predictions/{request_id}/result"
-    result_headers = {"Authorization": f"Bearer {api_key}"}
+    # A duplicate whose race is already lost must not submit a paid job
+    if cancelled.is_set():
+        raise VideoGenerationError("Task superseded by a hedged request before it was submitted")
     
-    poll_start = time.time()
-    poll_count = 0
+    # Submit generation request, or resume the journaled job for the same prompt
+    begin = time.monotonic()
+    journal = get_job_journal()
+    try:
+        request_id = journal.submit(client, VIDEO_MODEL, payload)
+    except WaveSpeedError as e:
+        raise VideoGenerationError(str(e))
+    try:
+        return _poll_video(client, journal, request_id, key, schedule, timeout, begin, cancelled)
+    finally:
+        journal.release(request_id)
+
+def _poll_video(client, journal, request_id, key, schedule, timeout, begin, cancelled):
+    """
+    Poll a submitted (or resumed) video task until it completes
+    """
+    resumed = request_id in journal.resumed
+    if not resumed:
+        log(f"✅ Task submitted. Request ID: {request_id}")
     
+    # Poll for results; a resumed job may be done already, so it is checked right away
+    delay = 0.0 if resumed else None
     while True:
-        poll_count += 1
+        elapsed = time.monotonic() - begin
         
         # Check timeout
-        if time.time() - poll_start > timeout:
-            raise VideoGenerationError(f"Generation timeout after {timeout} seconds")
+        if elapsed > timeout:
+            raise VideoGenerationError(f"Generation timeout after {timeout:.0f} seconds")
         
-        # Wait before polling (longer wait after first few polls)
-        if poll_count > 5:
-            time.sleep(poll_interval * 2)  # Longer wait after initial polls
-        else:
-            time.sleep(poll_interval)
+        # Wait for the next scheduled poll, stopping early if a hedged duplicate won
+        if cancelled.wait(min(schedule.next_delay(elapsed) if delay is None else delay, timeout - elapsed)):
+            raise VideoGenerationError(f"Task {request_id} superseded by a hedged request")
+        delay = None
         
         try:
-            response = requests.get(result_url, headers=result_headers, timeout=30)
-        except requests.exceptions.Timeout:
-            print("⏳ Polling timeout, retrying...")
-            continue
-        except requests.exceptions.RequestException as e:
-            print(f"⏳ Polling error: {e}, retrying...")
+            result = client.poll(request_id)
+        except WaveSpeedError as e:
+            log(f"⏳ {e}, retrying...")
             continue
         
-        if response.status_code != 200:
-            print(f"⏳ Polling failed: {response.status_code}, retrying...")
-            continue
+        status = result.get("status")
+        if status == "completed" and not result.get("outputs"):
+            journal.finished(request_id, "failed", error="no outputs")
+            raise VideoGenerationError(f"Task {request_id} completed with no outputs")
         
-        try:
-            result = response.json()["data"]
-            status = result["status"]
-            
-            if status == "completed":
-                end_time = time.time()
-                total_time = end_time - begin
-                video_url = result["outputs"][0]
-                print(f"✅ Video generated in {total_time:.2f} seconds")
-                print(f"📹 Video URL: {video_url}")
-                return video_url
-            
-            elif status == "failed":
-                error_msg = result.get('error', 'Unknown error')
-                raise VideoGenerationError(f"Task failed: {error_msg}")
-            
-            else:
-                print(f"⏳ Processing... Status: {status}")
-                
-        except (KeyError, ValueError) as e:
-            print(f"⏳ Invalid polling response: {e}, retrying...")
-            continue
+        elif status == "completed":
+            total_time = time.monotonic() - begin
+            if not resumed:
+                get_completion_times().record(key, total_time)
+            video_url = result["outputs"][0]
+            journal.finished(request_id, "completed", output=video_url)
+            log(f"✅ Video generated in {total_time:.2f} seconds")
+            log(f"📹 Video URL: {video_url}")
+            return video_url
+        
+        elif status == "failed":
+            error_msg = result.get('error', 'Unknown error')
+            journal.finished(request_id, "failed", error=error_msg)
+            raise VideoGenerationError(f"Task failed: {error_msg}")
+        
+        else:
+            log(f"⏳ Processing... Status: {status}")
 
 # Convenience function for short videos
 def generate_short_video(prompt: str, **kwargs) -> str:
@@ -272,12 +405,12 @@ def main():
         test_prompt = "A beautiful sunset over mountains [duration:8] [aspect:9:16] with vibrant colors"
         
         video_url = generate_ai_video(test_prompt)
-        print(f"Test successful! Video URL: {video_url}")
+        log(f"Test successful! Video URL: {video_url}")
         
     except VideoGenerationError as e:
-        print(f"Error: {e}")
+        log(f"Error: {e}")
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        log(f"Unexpected error: {e}")
 
 if __name__ == "__main__":
     main()
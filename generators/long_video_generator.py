@@ -1,58 +1,34 @@
 # generators/long_video_generator.py
-import openai
-import re
 from pathlib import Path
-from config.settings import OPENAI_MODEL, OPENAI_TEMPERATURE, MAX_TEXT_LENGTH
-from generators.ai_image_generator import generate_image_from_prompt_file
-from generators.ai_video_generator import generate_ai_video, VideoGenerationError
-
-# List of restricted words that cannot be in the final prompts
-RESTRICTED_WORDS = [
-    "strike", "attack", "kill", "murder", "shoot", "shot", "stab", "blood", "gore", "bomb", 
-    "gun", "rifle", "pistol", "knife", "sword", "chainsaw", "explosion", "massacre", "execution", 
-    "decapitate", "torture", "mutilation", "behead", "slaughter", "corpse", "cadaver", "weapon", 
-    "bullet", "grenade", "mine", "missile", "war", "combat", "battlefield", "militia", "insurgent", 
-    "fighter", "assassination", "terrorist", "terrorism", "jihad", "extremist", "nazi", "hitler", 
-    "fascist", "racist", "slurs", "hate", "slavery", "genocide", "lynching", "burning", "hanging", 
-    "protest", "riot", "uprising", "coup", "holocaust", "concentration camp", "dictator", "war crimes", 
-    "prison camp", "executioner", "hostage", "abuse", "rape", "incest", "molest", "pedophile", "child", 
-    "minor", "underage", "toddler", "infant", "baby", "trafficking", "kidnapping", "exploitation", 
-    "nude", "naked", "topless", "bottomless", "sex", "erotic", "porn", "pornography", "hentai", "xxx", 
-    "fetish", "bdsm", "dominatrix", "bondage", "dildo", "vibrator", "intercourse", "orgasm", 
-    "ejaculation", "masturbation", "obscene", "strip", "stripping", "lingerie", "seduce", "prostitute", 
-    "escort", "brothel", "incestuous", "adultery", "lust", "genitals", "penis", "vagina", "breast", 
-    "nipples", "clitoris", "anus", "rectum", "oral sex", "anal sex", "bestiality", "zoophilia", 
-    "necrophilia", "pedophilia", "suicide", "self-harm", "cut", "cutting", "overdose", "hang", 
-    "depression", "depressed", "mental illness", "disorder", "trauma", "PTSD", "schizophrenia", 
-    "bipolar", "anorexia", "bulimia", "starvation", "eating disorder", "thinspo", "self-injury", 
-    "self-destruction", "jump", "fall", "drown", "asphyxiation", "choking", "suffocation", "drugs", 
-    "drug", "cocaine", "heroin", "meth", "methamphetamine", "crack", "LSD", "acid", "ecstasy", "MDMA", 
-    "molly", "opium", "opioid", "oxy", "fentanyl", "shrooms", "psilocybin", "cannabis", "weed", 
-    "marijuana", "pot", "joint", "blunt", "bong", "smoking", "vape", "nicotine", "cigarette", "cigar", 
-    "hookah", "alcohol", "beer", "wine", "vodka", "rum", "tequila", "whiskey", "absinthe", "drunk", 
-    "intoxicated", "poisoning", "addict", "addiction", "trafficking", "smuggling", "cartel", "gang", 
-    "mafia", "underworld", "crime", "criminal", "robbery", "theft", "burglary", "fraud", "scam", 
-    "hacking", "hacker", "dark web", "deep web", "darknet", "illegal", "contraband", "counterfeit", 
-    "forgery", "bribery", "corruption", "blackmail", "extortion", "mob", "gang violence", "prison", 
-    "inmate", "prisoner", "jail", "convict", "execution chamber", "lethal injection", "gas chamber", 
-    "electric chair", "cancer", "AIDS", "HIV", "COVID", "SARS", "Ebola", "plague", "leprosy", 
-    "tuberculosis", "cholera", "malaria", "syphilis", "gonorrhea", "STD", "STI", "hepatitis", 
-    "pandemic", "epidemic", "tumor", "brain damage", "organ failure", "miscarriage", "abortion", 
-    "stillbirth", "deformity", "mutation", "genetic disease", "disability"
-]
-
-def generate_long_video_content(first_name, text, base_dir):
+from config.settings import MAX_TEXT_LENGTH, MASTER_IMAGE_MODE, LONG_VIDEO_SIZE, VIDEO_ASSEMBLY
+from utils.artifact_store import write_artifact
+from utils.openai_client import chat_completion
+from utils.content_filter import clean_ai_prompt, RESTRICTED_WORDS
+from utils.prompt_linter import ensure_renderable_prompt
+from utils.image_variants import current_derivation
+from utils.prompt_dedupe import VisualPrompt, collapse_duplicate_prompts, link_duplicate_outputs
+from utils.tagged_output import split_numbered_sections
+from utils.wavespeed_client import WaveSpeedError
+from utils.downloader import download_url_files
+from utils.video_assembly import create_assembler, long_video_timeline
+from utils.event_log import log
+from generators.ai_image_generator import submit_ai_image, wait_for_image
+from generators.ai_video_generator import submit_ai_video, VideoGenerationError
+
+# Sections illustrated by an image; the rest (3, 6, 9, 12) get a video clip
+IMAGE_SECTIONS = [1, 2, 4, 5, 7, 8, 10, 11, 13, 14]
+VIDEO_SECTIONS = [3, 6, 9, 12]
+
+# Files of a complete long video directory (the content catalog records the rest as missing)
+LONG_VIDEO_OUTPUTS = (["script.txt", "youtube_description.txt", "long_video_thumbnail.jpg"]
+                      + [f"long_video_image_{section}.jpg" for section in IMAGE_SECTIONS]
+                      + [f"video_{section}.mp4" for section in VIDEO_SECTIONS]
+                      + (["long_video.mp4"] if VIDEO_ASSEMBLY else []))
+
+def build_script_request(first_name, text):
     """
-    Generate professional long video content based on PDF text with separate files
+    Build the chat request for the 14-section documentary script
     """
-    long_video_dir = base_dir / "long video"
-    long_video_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Save the restricted words list for reference
-    with open(long_video_dir / "restricted_words.txt", "w", encoding="utf-8") as f:
-        f.write("\n".join(RESTRICTED_WORDS))
-    
-    # Generate the main script first
     script_prompt = f"""
 Based EXCLUSIVELY on the following information about {first_name}:
 
@@ -75,22 +51,36 @@ SPECIFIC REQUIREMENTS:
 Format the script with clear section markers like [SECTION 1], [SECTION 2], etc.
 """
 
+    return {
+        "task": "script",
+        "messages": [
+            {"role": "system", "content": "You are an acclaimed documentary filmmaker and storyteller. Write powerful, cinematic scripts tailored for the Visioneers channel, which highlights the achievements of great thinkers, inventors, and visionaries. Use only centuries or parts of centuries when referencing time — never exact dates. Keep the narrative inspiring, accessible, and professional, designed to engage a wide YouTube audience. Ensure Section 1 ends with the exact phrase: 'I'm Habeeb — this is Visioneers. Subscribe and stay inspired."},
+            {"role": "user", "content": script_prompt}
+        ],
+    }
+
+def generate_long_video_content(first_name, text, base_dir):
+    """
+    Generate professional long video content based on PDF text with separate files
+    """
+    long_video_dir = base_dir / "long video"
+    long_video_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Save the restricted words list for reference
+    write_artifact(long_video_dir / "restricted_words.txt", "\n".join(RESTRICTED_WORDS), skip_unchanged=True)
+    
     try:
-        response = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are an acclaimed documentary filmmaker and storyteller. Write powerful, cinematic scripts tailored for the Visioneers channel, which highlights the achievements of great thinkers, inventors, and visionaries. Use only centuries or parts of centuries when referencing time — never exact dates. Keep the narrative inspiring, accessible, and professional, designed to engage a wide YouTube audience. Ensure Section 1 ends with the exact phrase: 'I'm Habeeb — this is Visioneers. Subscribe and stay inspired."},
-                {"role": "user", "content": script_prompt}
-            ],
-            temperature=OPENAI_TEMPERATURE,
-            max_tokens=4000
+        # Generate the main script first
+        response = chat_completion(
+            **build_script_request(first_name, text),
+            name=first_name,
+            stage="long_script"
         )
         
-        script_content = response.choices[0].message.content.strip()
+        script_content = response.strip()
         
         # Save the script
-        with open(long_video_dir / "script.txt", "w", encoding="utf-8") as f:
-            f.write(script_content)
+        write_artifact(long_video_dir / "script.txt", script_content)
         
         # Extract section content for more targeted visual prompts
         section_contents = extract_section_contents(script_content)
@@ -98,35 +88,58 @@ Format the script with clear section markers like [SECTION 1], [SECTION 2], etc.
         # Generate 14 visual prompts (10 images + 4 videos) with specific section arrangement
         visual_prompts = generate_visual_prompts(first_name, text, section_contents, long_video_dir)
         
-        # Generate thumbnail prompt for the long video
-        thumbnail_prompt = generate_thumbnail_prompt(first_name, text)
-        if thumbnail_prompt:
-            with open(long_video_dir / "thumbnail_prompt.txt", "w", encoding="utf-8") as f:
-                f.write(thumbnail_prompt)
+        # Generate thumbnail prompt for the long video, unless the thumbnail is cropped
+        # from the subject's current master image and never rendered from a prompt
+        if MASTER_IMAGE_MODE and current_derivation(long_video_dir / "long_video_thumbnail.jpg"):
+            log("✂️ Thumbnail comes from the master image, skipping its prompt")
+        else:
+            thumbnail_prompt = generate_thumbnail_prompt(first_name, text)
+            if thumbnail_prompt:
+                write_artifact(long_video_dir / "thumbnail_prompt.txt", thumbnail_prompt)
         
         # Generate YouTube description with emojis and hashtags
         youtube_description = generate_youtube_description(first_name, text, script_content)
         if youtube_description:
-            with open(long_video_dir / "youtube_description.txt", "w", encoding="utf-8") as f:
-                f.write(youtube_description)
+            write_artifact(long_video_dir / "youtube_description.txt", youtube_description)
+        
+        # Near-duplicate prompts share one render (or are rewritten) instead of each being paid for
+        duplicates = collapse_duplicate_prompts(long_visual_prompts(long_video_dir), first_name, stage="long")
+        
+        # Sections are encoded into the finished video as their renders arrive
+        assembler = create_assembler(
+            long_video_timeline(long_video_dir, section_contents, IMAGE_SECTIONS, VIDEO_SECTIONS),
+            long_video_dir / "long_video.mp4", LONG_VIDEO_SIZE
+        )
         
-        # Generate AI images from the prompts (all in 1280x720 format)
-        image_success = generate_ai_images_from_prompts(long_video_dir)
+        # Submit every image (1280x720) and video (5 seconds, 16:9) job up front so
+        # WaveSpeed renders them in parallel, then wait for all of them together;
+        # the slow videos go first so they are not queued behind images
+        video_jobs = submit_ai_videos_from_prompts(long_video_dir, skip=duplicates, assembler=assembler)
+        image_jobs = submit_ai_images_from_prompts(long_video_dir, skip=duplicates)
+        if assembler:
+            assembler.watch(future for _, future in image_jobs)
+        image_success = collect_image_jobs(image_jobs)
+        video_success = collect_video_jobs(video_jobs)
+        image_success = link_duplicate_outputs(duplicates) and image_success
         
-        # Generate AI videos from the video prompts (5 seconds, 16:9 aspect ratio)
-        video_success = generate_ai_videos_from_prompts(long_video_dir)
+        # Fetch the clips while their URLs are fresh (video_url_N.txt -> video_N.mp4)
+        video_success = download_url_files(long_video_dir) and video_success
         
-        print(f"✅ Long video content generated successfully!")
-        print(f"📝 Script, YouTube description, and 14 visual prompts (10 images + 4 videos) saved")
+        # Encode what is left (reused renders, late clips) and join the sections
+        if assembler:
+            assembler.finish()
+        
+        log("✅ Long video content generated successfully!")
+        log("📝 Script, YouTube description, and 14 visual prompts (10 images + 4 videos) saved")
         return True and image_success and video_success
         
     except Exception as e:
-        print(f"❌ Error generating script: {e}")
+        log(f"❌ Error generating script: {e}")
         return False
 
-def generate_youtube_description(first_name, text, script_content):
+def build_description_request(first_name, text, script_content):
     """
-    Generate a professional YouTube description with emojis, formatting, and hashtags
+    Build the chat request for the long video's YouTube description
     """
     description_prompt = f"""
 Based EXCLUSIVELY on the following information about {first_name}:
@@ -173,46 +186,38 @@ EXAMPLE STRUCTURE:
 #Documentary #Biography #{first_name.replace(' ', '')} #History #Inspiration [more hashtags]
 """
 
+    return {
+        "task": "description",
+        "messages": [
+            {"role": "system", "content": "You are a YouTube SEO expert and content strategist. Write professional, engaging video descriptions designed to maximize audience retention and search visibility. Use clear formatting, add relevant emojis, include timestamps where appropriate, and end with a strong call-to-action. Integrate strategic hashtags naturally to improve discoverability, ensuring the description is both viewer-friendly and optimized for YouTube’s algorithm."},
+            {"role": "user", "content": description_prompt}
+        ],
+    }
+
+def generate_youtube_description(first_name, text, script_content):
+    """
+    Generate a professional YouTube description with emojis, formatting, and hashtags
+    """
     try:
-        response = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a YouTube SEO expert and content strategist. Write professional, engaging video descriptions designed to maximize audience retention and search visibility. Use clear formatting, add relevant emojis, include timestamps where appropriate, and end with a strong call-to-action. Integrate strategic hashtags naturally to improve discoverability, ensuring the description is both viewer-friendly and optimized for YouTube’s algorithm."},
-                {"role": "user", "content": description_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=800
+        response = chat_completion(
+            **build_description_request(first_name, text, script_content),
+            name=first_name,
+            stage="long_description"
         )
         
-        description_content = response.choices[0].message.content.strip()
+        description_content = response.strip()
         return description_content
         
     except Exception as e:
-        print(f"❌ Error generating YouTube description: {e}")
+        log(f"❌ Error generating YouTube description: {e}")
         return None
 
 def extract_section_contents(script_content):
     """
     Extract the content of each section from the script for more targeted visual prompts
     """
-    section_contents = {}
-    
-    # Try to extract sections based on common patterns
-    section_patterns = [
-        r'\[SECTION (\d+)\](.*?)(?=\[SECTION \d+\]|$)',
-        r'Section (\d+):(.*?)(?=Section \d+:|$)',
-        r'Part (\d+):(.*?)(?=Part \d+:|$)',
-        r'### Section (\d+) ###(.*?)(?=### Section \d+ ###|$)'
-    ]
-    
-    for pattern in section_patterns:
-        matches = re.findall(pattern, script_content, re.DOTALL | re.IGNORECASE)
-        if matches:
-            for match in matches:
-                section_num = int(match[0])
-                section_content = match[1].strip()
-                section_contents[section_num] = section_content
-            break
+    # One scan over all supported marker styles
+    section_contents = split_numbered_sections(script_content)
     
     # If no sections found, split the script into 14 equal parts
     if not section_contents:
@@ -289,95 +294,132 @@ SPECIFIC REQUIREMENTS:
 Make it suitable for AI video models.
 """
 
+        prompt_file = long_video_dir / f"{prompt_type}_prompt_{section}.txt"
         try:
-            response = openai.ChatCompletion.create(
-                model=OPENAI_MODEL,
+            response = chat_completion(
+                task="video_prompt" if prompt_type == "video" else "visual_prompt",
                 messages=[
                     {"role": "system", "content": f"You are an expert in designing advanced AI {prompt_type} generation prompts for Visioneers documentary storytelling. Create cinematic and symbolic prompts that reflect the themes of innovation, discovery, and human achievement. Emphasize mood, lighting, perspective, and composition to capture the spirit of visionaries. Avoid personal names or restricted terms. Focus on clarity, creativity, and professional documentary style."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=OPENAI_TEMPERATURE,
-                max_tokens=600 if prompt_type == "image" else 500
+                name=first_name,
+                stage=f"long_{prompt_type}_prompt_{section}"
             )
             
-            prompt_content = response.choices[0].message.content.strip()
-            cleaned_prompt = clean_ai_prompt(prompt_content, first_name, remove_name=True)
+            prompt_content = response.strip()
+            cleaned_prompt = clean_ai_prompt(prompt_content, first_name, remove_name=True, remove_centuries=True)
+            
+            # Lint before paying for a render; unrepairable prompts are not saved
+            cleaned_prompt = ensure_renderable_prompt(
+                cleaned_prompt, first_name, kind=prompt_type, stage=f"long_{prompt_type}_prompt_{section}_repair"
+            )
+            if cleaned_prompt is None:
+                # Do not let a previous run's prompt file get rendered instead
+                prompt_file.unlink(missing_ok=True)
+                visual_prompts.append("")
+                continue
             visual_prompts.append(cleaned_prompt)
             
             # Save each cleaned prompt to separate file
-            if prompt_type == "image":
-                with open(long_video_dir / f"image_prompt_{section}.txt", "w", encoding="utf-8") as f:
-                    f.write(cleaned_prompt)
-            else:
-                with open(long_video_dir / f"video_prompt_{section}.txt", "w", encoding="utf-8") as f:
-                    f.write(cleaned_prompt)
+            write_artifact(prompt_file, cleaned_prompt)
                     
         except Exception as e:
-            print(f"❌ Error generating {prompt_type} prompt for section {section}: {e}")
+            log(f"❌ Error generating {prompt_type} prompt for section {section}: {e}")
+            prompt_file.unlink(missing_ok=True)
             visual_prompts.append("")
     
     return visual_prompts
 
-def generate_ai_videos_from_prompts(long_video_dir):
+def submit_ai_videos_from_prompts(long_video_dir, skip=(), assembler=None):
     """
-    Generate AI videos from the video prompt files in the long video directory
+    Submit AI video jobs for every video prompt file in the long video directory
     Uses 5-second duration and 16:9 aspect ratio for documentary-style content
+    
+    Args:
+        skip: VisualPrompts that reuse another prompt's render
+        assembler (VideoAssembler): Downloads each clip as soon as it is rendered and
+            hands it to the assembler
+    
+    Returns:
+        list: (section, future or None) pairs; None marks a missing or empty prompt
     """
-    try:
-        video_success = True
+    jobs = []
+    skipped = {prompt.prompt_file for prompt in skip}
+    
+    for section in VIDEO_SECTIONS:
+        video_prompt_file = long_video_dir / f"video_prompt_{section}.txt"
         
-        # Video sections: 3, 6, 9, 12
-        video_sections = [3, 6, 9, 12]
+        if video_prompt_file in skipped:
+            continue
         
-        for section in video_sections:
-            video_prompt_file = long_video_dir / f"video_prompt_{section}.txt"
-            
-            if video_prompt_file.exists():
-                print(f"🎬 Generating AI video for section {section} from prompt...")
-                
-                # Read the video prompt
-                with open(video_prompt_file, "r", encoding="utf-8") as f:
-                    video_prompt = f.read().strip()
-                
-                if not video_prompt:
-                    print(f"❌ Video prompt for section {section} is empty")
-                    video_success = False
-                    continue
-                
-                # Generate video with fixed 5-second duration and 16:9 aspect ratio
-                try:
-                    video_url = generate_ai_video(
-                        prompt=video_prompt,
-                        duration=5,           # Fixed 5-second duration
-                        aspect_ratio="16:9",  # Fixed documentary aspect ratio
-                        timeout=600           # 10 minute timeout for video generation
-                    )
-                    
-                    # Save the video URL
-                    with open(long_video_dir / f"video_url_{section}.txt", "w", encoding="utf-8") as f:
-                        f.write(video_url)
-                    
-                    print(f"✅ AI video for section {section} generated successfully!")
-                    
-                except VideoGenerationError as e:
-                    print(f"❌ AI video for section {section} generation failed: {e}")
-                    video_success = False
-                except Exception as e:
-                    print(f"❌ Unexpected error generating AI video for section {section}: {e}")
-                    video_success = False
-            else:
-                print(f"❌ Video prompt file for section {section} not found")
-                video_success = False
+        if not video_prompt_file.exists():
+            log(f"❌ Video prompt file for section {section} not found")
+            jobs.append((section, None))
+            continue
+        
+        # Read the video prompt
+        with open(video_prompt_file, "r", encoding="utf-8") as f:
+            video_prompt = f.read().strip()
+        
+        if not video_prompt:
+            log(f"❌ Video prompt for section {section} is empty")
+            jobs.append((section, None))
+            continue
+        
+        log(f"🎬 Submitting AI video for section {section}...")
         
-        return video_success
+        def save_video_url(video_url, section=section):
+            write_artifact(long_video_dir / f"video_url_{section}.txt", video_url)
+            if assembler and download_url_files(long_video_dir, pattern=f"video_url_{section}.txt"):
+                assembler.source_ready(long_video_dir / f"video_{section}.mp4")
+            return video_url
         
+        # Fixed 5-second duration and documentary aspect ratio, 10 minute timeout
+        jobs.append((section, submit_ai_video(
+            prompt=video_prompt,
+            duration=5,
+            aspect_ratio="16:9",
+            timeout=600,
+            on_complete=save_video_url,
+            label=f"Video for section {section}",
+            url_file=long_video_dir / f"video_url_{section}.txt"
+        )))
+    
+    return jobs
+
+def collect_video_jobs(jobs):
+    """
+    Wait for submitted long video jobs. Returns True if every video was generated.
+    """
+    video_success = True
+    for section, future in jobs:
+        if future is None:
+            video_success = False
+            continue
+        try:
+            future.result()
+            log(f"✅ AI video for section {section} generated successfully!")
+        except (VideoGenerationError, WaveSpeedError) as e:
+            log(f"❌ AI video for section {section} generation failed: {e}")
+            video_success = False
+        except Exception as e:
+            log(f"❌ Unexpected error generating AI video for section {section}: {e}")
+            video_success = False
+    return video_success
+
+def generate_ai_videos_from_prompts(long_video_dir):
+    """
+    Generate AI videos from the video prompt files in the long video directory
+    """
+    try:
+        return collect_video_jobs(submit_ai_videos_from_prompts(long_video_dir))
     except Exception as e:
-        print(f"❌ Error generating AI videos: {e}")
+        log(f"❌ Error generating AI videos: {e}")
         return False
 
-def generate_thumbnail_prompt(first_name, text):
+def build_thumbnail_request(first_name, text):
     """
-    Generate a professional thumbnail prompt for the long video
+    Build the chat request for the long video thumbnail prompt
     """
     thumbnail_prompt = f"""
 Based EXCLUSIVELY on the following information about {first_name}:
@@ -399,133 +441,114 @@ IMPORTANT:
 - Make it visually striking and click-worthy.
 """
 
+    return {
+        "task": "thumbnail",
+        "messages": [
+            {"role": "system", "content": "You are an expert in crafting compelling AI prompts for YouTube thumbnails. Develop professional, cinematic concepts tailored for the Visioneers channel, which celebrates the achievements of great thinkers, inventors, and visionaries. Thumbnails should instantly capture attention with bold symbolism, dramatic lighting, and clear focal points. Keep the style clean, emotionally powerful, and optimized for high click-through rates while reflecting the channel’s inspiring theme of human achievement."},
+            {"role": "user", "content": thumbnail_prompt}
+        ],
+    }
+
+def generate_thumbnail_prompt(first_name, text):
+    """
+    Generate a professional thumbnail prompt for the long video
+    """
     try:
-        response = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are an expert in crafting compelling AI prompts for YouTube thumbnails. Develop professional, cinematic concepts tailored for the Visioneers channel, which celebrates the achievements of great thinkers, inventors, and visionaries. Thumbnails should instantly capture attention with bold symbolism, dramatic lighting, and clear focal points. Keep the style clean, emotionally powerful, and optimized for high click-through rates while reflecting the channel’s inspiring theme of human achievement."},
-                {"role": "user", "content": thumbnail_prompt}
-            ],
-            temperature=OPENAI_TEMPERATURE,
-            max_tokens=400
+        response = chat_completion(
+            **build_thumbnail_request(first_name, text),
+            name=first_name,
+            stage="long_thumbnail_prompt"
         )
         
-        prompt_content = response.choices[0].message.content.strip()
-        return clean_ai_prompt(prompt_content, first_name, remove_name=False)  # Keep name for thumbnail
+        prompt_content = response.strip()
+        cleaned_prompt = clean_ai_prompt(prompt_content, first_name, remove_name=False, remove_centuries=True)  # Keep name for thumbnail
+        return ensure_renderable_prompt(
+            cleaned_prompt, first_name, kind="image", allow_name=True, stage="long_thumbnail_prompt_repair"
+        )
         
     except Exception as e:
-        print(f"❌ Error generating thumbnail prompt: {e}")
+        log(f"❌ Error generating thumbnail prompt: {e}")
         return None
 
-def generate_ai_images_from_prompts(long_video_dir):
+def long_visual_prompts(long_video_dir):
     """
-    Generate AI images from the prompt files in the long video directory
+    Image and video prompt files of the long video with the files their renders end up in
+    """
+    return [
+        VisualPrompt(long_video_dir / f"image_prompt_{section}.txt",
+                     long_video_dir / f"long_video_image_{section}.jpg", "image")
+        if section not in VIDEO_SECTIONS else
+        VisualPrompt(long_video_dir / f"video_prompt_{section}.txt",
+                     long_video_dir / f"video_url_{section}.txt", "video")
+        for section in range(1, 15)
+    ]
+
+def submit_ai_images_from_prompts(long_video_dir, skip=()):
+    """
+    Submit AI image jobs for the prompt files in the long video directory
     ALL images use 1280x720 format for documentary-style content
+    
+    Args:
+        skip: VisualPrompts that reuse another prompt's render
+    
+    Returns:
+        list: (label, future) pairs
     """
-    try:
-        image_success = True
-        
-        # Image sections: 1, 2, 4, 5, 7, 8, 10, 11, 13, 14
-        image_sections = [1, 2, 4, 5, 7, 8, 10, 11, 13, 14]
-        
-        for section in image_sections:
-            prompt_file = long_video_dir / f"image_prompt_{section}.txt"
-            
-            if prompt_file.exists():
-                print(f"🖼️ Generating AI image for section {section} from prompt...")
-                
-                # Use documentary format (1280x720) for long video content
-                success, image_path, error = generate_image_from_prompt_file(
-                    prompt_file, 
-                    long_video_dir, 
-                    width=1280, 
-                    height=720, 
-                    image_name=f"long_video_image_{section}.jpg"
-                )
-                
-                if success:
-                    print(f"✅ AI image for section {section} generated successfully!")
-                else:
-                    print(f"❌ AI image for section {section} generation failed: {error}")
-                    image_success = False
+    jobs = []
+    skipped = {prompt.prompt_file for prompt in skip}
+    
+    for section in IMAGE_SECTIONS:
+        prompt_file = long_video_dir / f"image_prompt_{section}.txt"
         
-        # Generate thumbnail image (also in 1280x720 format)
-        thumbnail_prompt_file = long_video_dir / "thumbnail_prompt.txt"
-        if thumbnail_prompt_file.exists():
-            print("🖼️ Generating thumbnail image from prompt...")
+        if prompt_file.exists() and prompt_file not in skipped:
+            log(f"🖼️ Submitting AI image for section {section}...")
             
-            # Use documentary format (1280x720) for thumbnail
-            success, image_path, error = generate_image_from_prompt_file(
-                thumbnail_prompt_file, 
+            # Use documentary format (1280x720) for long video content
+            jobs.append((f"AI image for section {section}", submit_ai_image(
+                prompt_file, 
                 long_video_dir, 
                 width=1280, 
                 height=720, 
-                image_name="long_video_thumbnail.jpg"
-            )
-            
-            if success:
-                print("✅ Thumbnail image generated successfully!")
-            else:
-                print(f"❌ Thumbnail image generation failed: {error}")
-                image_success = False
-        
-        return image_success
-        
-    except Exception as e:
-        print(f"❌ Error generating AI images: {e}")
-        return False
+                image_name=f"long_video_image_{section}.jpg"
+            )))
+    
+    # Thumbnail image (also in 1280x720 format), unless it was cropped from the subject's
+    # current master image
+    thumbnail_prompt_file = long_video_dir / "thumbnail_prompt.txt"
+    if MASTER_IMAGE_MODE and current_derivation(long_video_dir / "long_video_thumbnail.jpg"):
+        log("✂️ Using thumbnail derived from the master image")
+    elif thumbnail_prompt_file.exists():
+        log("🖼️ Submitting thumbnail image...")
+        jobs.append(("Thumbnail image", submit_ai_image(
+            thumbnail_prompt_file, 
+            long_video_dir, 
+            width=1280, 
+            height=720, 
+            image_name="long_video_thumbnail.jpg"
+        )))
+    
+    return jobs
 
-def clean_ai_prompt(prompt_text, first_name, remove_name=True):
+def collect_image_jobs(jobs):
     """
-    Clean the AI image prompt by removing unwanted introductory text, year references, 
-    restricted words, and optionally the person's name
+    Wait for submitted long video image jobs. Returns True if every image was generated.
     """
-    # Remove common introductory patterns
-    patterns_to_remove = [
-        "**AI Image Generation Prompt:**",
-        "**AI Video Generation Prompt:**",
-        "This prompt is designed to create",
-        "capturing not just his physical likeness",
-        "the essence of his legacy",
-        "one of the greatest minds in history",
-        "==================================================",
-        "**Prompt:**",
-        "Here is a detailed AI image generation prompt:",
-        "Here is a detailed AI video generation prompt:",
-        "Create an image of",
-        "Generate a visual of",
-        "Produce an image showing",
-    ]
-    
-    cleaned_prompt = prompt_text
-    for pattern in patterns_to_remove:
-        cleaned_prompt = cleaned_prompt.replace(pattern, "")
-    
-    # Remove the person's name specifically if requested
-    if remove_name:
-        cleaned_prompt = cleaned_prompt.replace(first_name, "").replace(first_name.lower(), "").replace(first_name.upper(), "")
-    
-    # Remove specific year references (including full dates)
-    cleaned_prompt = re.sub(r'\b\d{1,2}(st|nd|rd|th)?\s+(century|Century)\b', '', cleaned_prompt, flags=re.IGNORECASE)
-    cleaned_prompt = re.sub(r'\b(in|from|during|of|circa)\s+\d{4}s?\b', '', cleaned_prompt, flags=re.IGNORECASE)
-    cleaned_prompt = re.sub(r'\b\d{4}s?\b', '', cleaned_prompt)
-    
-    # Remove any restricted words
-    for restricted_word in RESTRICTED_WORDS:
-        # Use regex to match whole words only
-        cleaned_prompt = re.sub(r'\b' + restricted_word + r'\b', '', cleaned_prompt, flags=re.IGNORECASE)
-    
-    # Remove any phrases that start with creation verbs
-    if re.match(r'^(Create|Generate|Make|Design|Produce)\s+(a|an|the)?\s+', cleaned_prompt, re.IGNORECASE):
-        cleaned_prompt = re.sub(r'^(Create|Generate|Make|Design|Produce)\s+(a|an|the)?\s*', '', cleaned_prompt, flags=re.IGNORECASE)
-    
-    # Remove any double newlines and clean up whitespace
-    cleaned_prompt = "\n".join([line.strip() for line in cleaned_prompt.split("\n") if line.strip()])
-    cleaned_prompt = re.sub(r'\s+', ' ', cleaned_prompt)  # Remove extra spaces
-    cleaned_prompt = cleaned_prompt.strip()
-    
-    # Ensure the prompt starts with descriptive content, not commands
-    if cleaned_prompt.startswith(('a ', 'an ', 'the ')):
-        cleaned_prompt = cleaned_prompt[0].upper() + cleaned_prompt[1:]
-    
-    return cleaned_prompt
+    image_success = True
+    for label, future in jobs:
+        success, image_path, error = wait_for_image(future)
+        if success:
+            log(f"✅ {label} generated successfully!")
+        else:
+            log(f"❌ {label} generation failed: {error}")
+            image_success = False
+    return image_success
+
+def generate_ai_images_from_prompts(long_video_dir):
+    """
+    Generate AI images from the prompt files in the long video directory
+    """
+    try:
+        return collect_image_jobs(submit_ai_images_from_prompts(long_video_dir))
+    except Exception as e:
+        log(f"❌ Error generating AI images: {e}")
+        return False
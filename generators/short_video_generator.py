@@ -1,57 +1,40 @@
 # generators/short_video_generator.py
-import openai
-import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from config.settings import OPENAI_MODEL, OPENAI_TEMPERATURE, MAX_TEXT_LENGTH
-from generators.ai_image_generator import generate_image_from_prompt_file
-from generators.ai_video_generator import generate_ai_video, VideoGenerationError
-
-# List of restricted words that cannot be in the final prompts
-RESTRICTED_WORDS = [
-    "strike", "attack", "kill", "murder", "shoot", "shot", "stab", "blood", "gore", "bomb", 
-    "gun", "rifle", "pistol", "knife", "sword", "chainsaw", "explosion", "massacre", "execution", 
-    "decapitate", "torture", "mutilation", "behead", "slaughter", "corpse", "cadaver", "weapon", 
-    "bullet", "grenade", "mine", "missile", "war", "combat", "battlefield", "militia", "insurgent", 
-    "fighter", "assassination", "terrorist", "terrorism", "jihad", "extremist", "nazi", "hitler", 
-    "fascist", "racist", "slurs", "hate", "slavery", "genocide", "lynching", "burning", "hanging", 
-    "protest", "riot", "uprising", "coup", "holocaust", "concentration camp", "dictator", "war crimes", 
-    "prison camp", "executioner", "hostage", "abuse", "rape", "incest", "molest", "pedophile", "child", 
-    "minor", "underage", "toddler", "infant", "baby", "trafficking", "kidnapping", "exploitation", 
-    "nude", "naked", "topless", "bottomless", "sex", "erotic", "porn", "pornography", "hentai", "xxx", 
-    "fetish", "bdsm", "dominatrix", "bondage", "dildo", "vibrator", "intercourse", "orgasm", 
-    "ejaculation", "masturbation", "obscene", "strip", "stripping", "lingerie", "seduce", "prostitute", 
-    "escort", "brothel", "incestuous", "adultery", "lust", "genitals", "penis", "vagina", "breast", 
-    "nipples", "clitoris", "anus", "rectum", "oral sex", "anal sex", "bestiality", "zoophilia", 
-    "necrophilia", "pedophilia", "suicide", "self-harm", "cut", "cutting", "overdose", "hang", 
-    "depression", "depressed", "mental illness", "disorder", "trauma", "PTSD", "schizophrenia", 
-    "bipolar", "anorexia", "bulimia", "starvation", "eating disorder", "thinspo", "self-injury", 
-    "self-destruction", "jump", "fall", "drown", "asphyxiation", "choking", "suffocation", "drugs", 
-    "drug", "cocaine", "heroin", "meth", "methamphetamine", "crack", "LSD", "acid", "ecstasy", "MDMA", 
-    "molly", "opium", "opioid", "oxy", "fentanyl", "shrooms", "psilocybin", "cannabis", "weed", 
-    "marijuana", "pot", "joint", "blunt", "bong", "smoking", "vape", "nicotine", "cigarette", "cigar", 
-    "hookah", "alcohol", "beer", "wine", "vodka", "rum", "tequila", "whiskey", "absinthe", "drunk", 
-    "intoxicated", "poisoning", "addict", "addiction", "trafficking", "smuggling", "cartel", "gang", 
-    "mafia", "underworld", "crime", "criminal", "robbery", "theft", "burglary", "fraud", "scam", 
-    "hacking", "hacker", "dark web", "deep web", "darknet", "illegal", "contraband", "counterfeit", 
-    "forgery", "bribery", "corruption", "blackmail", "extortion", "mob", "gang violence", "prison", 
-    "inmate", "prisoner", "jail", "convict", "execution chamber", "lethal injection", "gas chamber", 
-    "electric chair", "cancer", "AIDS", "HIV", "COVID", "SARS", "Ebola", "plague", "leprosy", 
-    "tuberculosis", "cholera", "malaria", "syphilis", "gonorrhea", "STD", "STI", "hepatitis", 
-    "pandemic", "epidemic", "tumor", "brain damage", "organ failure", "miscarriage", "abortion", 
-    "stillbirth", "deformity", "mutation", "genetic disease", "disability"
-]
+from config.settings import MAX_TEXT_LENGTH, MISSING_SECTION_ATTEMPTS, SHORT_VIDEO_MODE, SHORT_VIDEO_SIZE, VIDEO_ASSEMBLY
+from utils.artifact_store import write_artifact
+from utils.openai_client import chat_completion
+from utils.content_filter import clean_ai_prompt, RESTRICTED_WORDS
+from utils.prompt_linter import ensure_renderable_prompt
+from utils.tagged_output import parse_tagged_output, complete_missing_sections
+from utils.prompt_dedupe import VisualPrompt, collapse_duplicate_prompts, link_duplicate_outputs
+from utils.wavespeed_client import WaveSpeedError
+from utils.downloader import download_url_files
+from utils.video_assembly import create_assembler, short_video_timeline
+from utils.event_log import log
+from generators.ai_image_generator import submit_ai_image, wait_for_image
+from generators.ai_video_generator import submit_ai_video, VideoGenerationError
 
-def generate_short_video_content(first_name, text, base_dir):
+SHORT_PACKAGE_TAGS = ("SCRIPT", "DESCRIPTION", "IMAGE_PROMPT_1", "VIDEO_PROMPT", "IMAGE_PROMPT_2")
+
+SHORT_CLIP_SECONDS = 5
+
+# Files of a complete short video directory (the content catalog records the rest as missing)
+SHORT_VIDEO_OUTPUTS = (["script.txt", "description.txt", "short_video_image_1.jpg", "video.mp4",
+                        "short_video_image_2.jpg"]
+                       + (["short_video.mp4"] if VIDEO_ASSEMBLY else []))
+
+# Visual prompts of the parallel mode: (file stem, kind, third of the script it represents)
+SHORT_VISUALS = (
+    ("image_prompt_1", "image", "FIRST"),
+    ("video_prompt", "video", "SECOND"),
+    ("image_prompt_2", "image", "FINAL"),
+)
+
+def build_short_package_request(first_name, text):
     """
-    Generate short video content based on PDF text with separate files
+    Build the chat request for the complete short video package
     """
-    short_video_dir = base_dir / "short video"
-    short_video_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Save the restricted words list for reference
-    with open(short_video_dir / "restricted_words.txt", "w", encoding="utf-8") as f:
-        f.write("\n".join(RESTRICTED_WORDS))
-    
     prompt = f"""
     Based EXCLUSIVELY on the following information about {first_name}:
     
@@ -103,86 +86,305 @@ def generate_short_video_content(first_name, text, base_dir):
     [APPEARS_AT: FINAL third of script]
     """
 
+    return {
+        "task": "short_package",
+        "messages": [
+            {"role": "system", "content": "You are a professional video content creator specializing in short-form vertical storytelling. Develop cinematic and symbolic visual prompts that translate script content into striking imagery. For image and video prompts, do not include personal names or restricted terms. Instead, emphasize atmosphere, environment, mood, and symbolic representation. Use precise, professional cinematic language that evokes strong emotion, captures attention instantly, and is optimized for vertical formats."},
+            {"role": "user", "content": prompt}
+        ],
+    }
+
+def build_short_script_request(first_name, text):
+    """
+    Build the chat request for the short video script alone (parallel mode)
+    """
+    prompt = f"""
+    Based EXCLUSIVELY on the following information about {first_name}:
+    
+    {text[:MAX_TEXT_LENGTH]}
+    
+    Write a 200-word script for a YouTube Shorts/TikTok/Instagram Reels video.
+    Start with a HOOK and end with a QUESTION asking viewers to comment.
+    Return only the script text.
+    """
+
+    return {
+        "task": "short_script",
+        "messages": [
+            {"role": "system", "content": "You are a professional video content creator specializing in short-form vertical storytelling. Write tight, emotionally engaging scripts that capture attention instantly."},
+            {"role": "user", "content": prompt}
+        ],
+    }
+
+def build_short_description_request(first_name, script):
+    """
+    Build the chat request for the short video description from its script
+    """
+    prompt = f"""
+    Write a professional description for this short video about {first_name}, with relevant hashtags and emojis.
+    Return only the description.
+    
+    Script:
+    {script}
+    """
+
+    return {
+        "task": "description",
+        "messages": [
+            {"role": "system", "content": "You are a social media strategist for short-form vertical video. Write concise, engaging descriptions optimized for discovery."},
+            {"role": "user", "content": prompt}
+        ],
+    }
+
+def build_short_visual_request(first_name, script, kind, third):
+    """
+    Build the chat request for one image or video prompt covering a third of the script
+    """
+    prompt = f"""
+    Based on this short video script:
+    
+    {script}
+    
+    Create 1 detailed AI {kind} generation prompt that conceptually represents the {third} third of the script{" as a 5-second clip" if kind == "video" else ""}.
+    
+    IMPORTANT RULES:
+    - DO NOT include the person's name ({first_name})
+    - DO NOT include any restricted or inappropriate words (violence, weapons, explicit content, etc.)
+    - Focus on symbolic, atmospheric, and environmental representations
+    - Describe atmosphere and mood, lighting and color palette, composition and framing{", camera angles and movement" if kind == "video" else ""}
+    - Use professional cinematic language
+    
+    Return only the prompt.
+    """
+
+    return {
+        "task": "video_prompt" if kind == "video" else "visual_prompt",
+        "messages": [
+            {"role": "system", "content": "You are a professional video content creator specializing in short-form vertical storytelling. Translate script content into cinematic, symbolic visual prompts without personal names or restricted terms, optimized for vertical formats."},
+            {"role": "user", "content": prompt}
+        ],
+    }
+
+def generate_short_video_content(first_name, text, base_dir):
+    """
+    Generate short video content based on PDF text with separate files
+    """
+    short_video_dir = base_dir / "short video"
+    short_video_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Save the restricted words list for reference
+    write_artifact(short_video_dir / "restricted_words.txt", "\n".join(RESTRICTED_WORDS), skip_unchanged=True)
+    
+    if SHORT_VIDEO_MODE == "parallel":
+        return generate_short_video_content_parallel(first_name, text, short_video_dir)
+    
     try:
-        response = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a professional video content creator specializing in short-form vertical storytelling. Develop cinematic and symbolic visual prompts that translate script content into striking imagery. For image and video prompts, do not include personal names or restricted terms. Instead, emphasize atmosphere, environment, mood, and symbolic representation. Use precise, professional cinematic language that evokes strong emotion, captures attention instantly, and is optimized for vertical formats."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=OPENAI_TEMPERATURE,
-            max_tokens=2800
+        response = chat_completion(
+            **build_short_package_request(first_name, text),
+            name=first_name,
+            stage="short_package"
         )
         
-        content = response.choices[0].message.content.strip()
+        content = response.strip()
         
         # Save complete response for reference
-        with open(short_video_dir / "complete_response.txt", "w", encoding="utf-8") as f:
-            f.write(f"Complete AI Response for {first_name}\n")
-            f.write("="*50 + "\n\n")
-            f.write(content)
+        write_artifact(short_video_dir / "complete_response.txt",
+                       f"Complete AI Response for {first_name}\n" + "="*50 + "\n\n" + content)
         
         # Parse and save individual components
-        components = parse_video_components(content, first_name, short_video_dir)
-        
-        # Generate AI images from the prompts (all in 720x1280 format)
-        image_success = generate_ai_images_from_prompts(short_video_dir)
+        components = parse_video_components(content, first_name, short_video_dir, text=text)
         
-        # Generate AI video from the video prompt (5 seconds, vertical format)
-        video_success = generate_ai_video_from_prompt(short_video_dir)
+        render_success = render_short_visuals(first_name, short_video_dir)
         
-        print(f"✅ Short video content generated successfully!")
-        return True and image_success and video_success
+        log("✅ Short video content generated successfully!")
+        return render_success
         
     except Exception as e:
-        print(f"❌ Error generating short video content: {e}")
+        log(f"❌ Error generating short video content: {e}")
         return False
 
-def generate_ai_video_from_prompt(short_video_dir):
+def generate_short_video_content_parallel(first_name, text, short_video_dir):
     """
-    Generate AI video from the video prompt file
-    Uses 5-second duration and vertical format (720x1280)
+    Generate the script first, then the description and each visual prompt concurrently
+
+    The prompts are then deduplicated and rendered like in package mode, and the
+    files are the same.
     """
     try:
-        video_prompt_file = short_video_dir / "video_prompt.txt"
+        script = chat_completion(
+            **build_short_script_request(first_name, text),
+            name=first_name,
+            stage="short_script"
+        ).strip()
+        write_artifact(short_video_dir / "script.txt", script)
         
-        if video_prompt_file.exists():
-            print("🎬 Generating AI video from prompt...")
-            
-            # Read the video prompt
-            with open(video_prompt_file, "r", encoding="utf-8") as f:
-                video_prompt = f.read().strip()
-            
-            if not video_prompt:
-                print("❌ Video prompt is empty")
-                return False
-            
-            # Generate video with fixed 5-second duration and vertical format
-            # Use "720*1280" format which is accepted by the API
-            video_url = generate_ai_video(
-             prompt=video_prompt,
-             duration=5,
-             aspect_ratio="9:16",  # Back to width:height format
-             timeout=600
+        with ThreadPoolExecutor(max_workers=len(SHORT_VISUALS) + 1, thread_name_prefix="short-video") as pool:
+            description = pool.submit(
+                chat_completion,
+                **build_short_description_request(first_name, script),
+                name=first_name,
+                stage="short_description"
             )
+            visuals = [
+                pool.submit(_write_short_visual_prompt, first_name, script, stem, kind, third, short_video_dir)
+                for stem, kind, third in SHORT_VISUALS
+            ]
             
-            # Save the video URL
-            with open(short_video_dir / "video_url.txt", "w", encoding="utf-8") as f:
-                f.write(video_url)
-            
-            print("✅ AI video generated successfully!")
-            return True
-        else:
-            print("❌ Video prompt file not found")
-            return False
-            
-    except VideoGenerationError as e:
-        print(f"❌ AI video generation failed: {e}")
+            write_artifact(short_video_dir / "description.txt", description.result().strip())
+            prompts_written = all([visual.result() for visual in visuals])
+        
+        render_success = render_short_visuals(first_name, short_video_dir)
+        
+        log("✅ Short video content generated successfully!")
+        return prompts_written and render_success
+        
+    except Exception as e:
+        log(f"❌ Error generating short video content: {e}")
+        return False
+
+def _write_short_visual_prompt(first_name, script, stem, kind, third, short_video_dir):
+    """
+    Write one cleaned visual prompt. Returns False if it was rejected.
+    """
+    prompt = chat_completion(
+        **build_short_visual_request(first_name, script, kind, third),
+        name=first_name,
+        stage=f"short_{stem}"
+    ).strip()
+    cleaned_prompt = clean_ai_prompt(prompt, first_name, remove_name=True)
+    cleaned_prompt = ensure_renderable_prompt(
+        cleaned_prompt, first_name, kind=kind, stage=f"short_{stem}_repair"
+    )
+    if cleaned_prompt is None:
+        (short_video_dir / f"{stem}.txt").unlink(missing_ok=True)
+        return False
+    write_artifact(short_video_dir / f"{stem}.txt", cleaned_prompt)
+    return True
+
+def render_short_visuals(first_name, short_video_dir):
+    """
+    Render the visual prompt files of the short video and join them into the finished short
+
+    Near-duplicate prompts share one render (or are rewritten) instead of each being
+    paid for. Returns True if every render succeeded.
+    """
+    duplicates = collapse_duplicate_prompts(short_visual_prompts(short_video_dir), first_name, stage="short")
+    
+    # Image 1, clip, image 2 are encoded into the finished short as they arrive
+    assembler = create_assembler(short_video_timeline(short_video_dir, SHORT_CLIP_SECONDS),
+                                 short_video_dir / "short_video.mp4", SHORT_VIDEO_SIZE)
+    
+    # Submit the images (720x1280) and the video (5 seconds, vertical) up front
+    # so WaveSpeed renders them in parallel, then wait for all of them;
+    # the slow video goes first so it is not queued behind images
+    video_job = submit_short_video(short_video_dir)
+    image_jobs = submit_short_images(short_video_dir, skip=duplicates)
+    if assembler:
+        assembler.watch(future for _, future in image_jobs)
+    image_success = all([finish_short_image(i, future) for i, future in image_jobs])
+    image_success = link_duplicate_outputs(duplicates) and image_success
+    video_success = finish_short_video(video_job) and download_url_files(short_video_dir)
+    if assembler:
+        assembler.finish()
+    return image_success and video_success
+
+def submit_short_video(short_video_dir):
+    """
+    Submit the AI video job for the video prompt file
+    Uses 5-second duration and vertical format (720x1280)
+    
+    Returns:
+        Future or None: None if the prompt is missing or empty
+    """
+    video_prompt_file = short_video_dir / "video_prompt.txt"
+    
+    if not video_prompt_file.exists():
+        log("❌ Video prompt file not found")
+        return None
+    
+    # Read the video prompt
+    with open(video_prompt_file, "r", encoding="utf-8") as f:
+        video_prompt = f.read().strip()
+    
+    if not video_prompt:
+        log("❌ Video prompt is empty")
+        return None
+    
+    log("🎬 Submitting AI video from prompt...")
+    
+    def save_video_url(video_url):
+        write_artifact(short_video_dir / "video_url.txt", video_url)
+        return video_url
+    
+    # Fixed 5-second duration and vertical format ("720*1280" in the API)
+    return submit_ai_video(
+        prompt=video_prompt,
+        duration=SHORT_CLIP_SECONDS,
+        aspect_ratio="9:16",
+        timeout=600,
+        on_complete=save_video_url,
+        label="Short video",
+        url_file=short_video_dir / "video_url.txt"
+    )
+
+def finish_short_video(future):
+    """
+    Wait for the submitted short video job. Returns True if the video was generated.
+    """
+    if future is None:
+        return False
+    try:
+        future.result()
+        log("✅ AI video generated successfully!")
+        return True
+    except (VideoGenerationError, WaveSpeedError) as e:
+        log(f"❌ AI video generation failed: {e}")
         return False
     except Exception as e:
-        print(f"❌ Unexpected error generating AI video: {e}")
+        log(f"❌ Unexpected error generating AI video: {e}")
         return False
 
+def generate_ai_video_from_prompt(short_video_dir):
+    """
+    Generate AI video from the video prompt file
+    """
+    try:
+        return finish_short_video(submit_short_video(short_video_dir))
+    except Exception as e:
+        log(f"❌ Unexpected error generating AI video: {e}")
+        return False
+
+def short_visual_prompts(short_video_dir):
+    """
+    Visual prompt files of the short video with the files their renders end up in
+    """
+    outputs = {"image_prompt_1": "short_video_image_1.jpg", "video_prompt": "video_url.txt",
+               "image_prompt_2": "short_video_image_2.jpg"}
+    return [
+        VisualPrompt(short_video_dir / f"{stem}.txt", short_video_dir / outputs[stem], kind)
+        for stem, kind, _ in SHORT_VISUALS
+    ]
+
+def submit_short_images(short_video_dir, skip=()):
+    """
+    Submit AI image jobs for the prompt files in the short video directory
+    
+    Args:
+        skip: VisualPrompts that reuse another prompt's render
+    
+    Returns:
+        list: (i, future) pairs
+    """
+    skipped = {prompt.prompt_file for prompt in skip}
+    
+    # One job per image prompt (up to 2 prompts)
+    return [
+        (i, submit_short_image(short_video_dir, i))
+        for i in range(1, 3)
+        if (short_video_dir / f"image_prompt_{i}.txt").exists()
+        and short_video_dir / f"image_prompt_{i}.txt" not in skipped
+    ]
+
 def generate_ai_images_from_prompts(short_video_dir):
     """
     Generate AI images from the prompt files in the short video directory
@@ -190,128 +392,139 @@ def generate_ai_images_from_prompts(short_video_dir):
     """
     try:
         image_success = True
-        
-        # Generate images for each image prompt (up to 2 prompts)
-        for i in range(1, 3):
-            prompt_file = short_video_dir / f"image_prompt_{i}.txt"
-            
-            if prompt_file.exists():
-                print(f"🖼️ Generating AI image {i} from prompt...")
-                
-                # Use vertical format (720x1280) for all short video content
-                success, image_path, error = generate_image_from_prompt_file(
-                    prompt_file, 
-                    short_video_dir, 
-                    width=720, 
-                    height=1280, 
-                    image_name=f"short_video_image_{i}.jpg"
-                )
-                
-                if success:
-                    print(f"✅ AI image {i} generated successfully!")
-                else:
-                    print(f"❌ AI image {i} generation failed: {error}")
-                    image_success = False
-        
+        for i, future in submit_short_images(short_video_dir):
+            image_success = finish_short_image(i, future) and image_success
         return image_success
         
     except Exception as e:
-        print(f"❌ Error generating AI images: {e}")
+        log(f"❌ Error generating AI images: {e}")
         return False
 
-def parse_video_components(content, first_name, short_video_dir):
-    """Parse and save individual video components to separate files"""
+def submit_short_image(short_video_dir, i):
+    """
+    Submit image_prompt_{i}.txt in the vertical 720x1280 format
+    """
+    log(f"🖼️ Submitting AI image {i}...")
+    
+    # Use vertical format (720x1280) for all short video content
+    return submit_ai_image(
+        short_video_dir / f"image_prompt_{i}.txt", 
+        short_video_dir, 
+        width=720, 
+        height=1280, 
+        image_name=f"short_video_image_{i}.jpg"
+    )
+
+def finish_short_image(i, future):
+    """
+    Wait for a submitted short video image. Returns True if it was generated.
+    """
+    success, image_path, error = wait_for_image(future)
+    if success:
+        log(f"✅ AI image {i} generated successfully!")
+    else:
+        log(f"❌ AI image {i} generation failed: {error}")
+    return success
+
+def build_missing_sections_request(first_name, text, parsed, missing):
+    """
+    Build a follow-up request for only the package sections that were left out
+    """
+    script = parsed.get("SCRIPT")
+    script_context = f"""
+    The script already written for this video:
+
+    {script}
+    """ if script else ""
+
+    prompt = f"""
+    Based EXCLUSIVELY on the following information about {first_name}:
+
+    {text[:MAX_TEXT_LENGTH]}
+    {script_context}
+    A previous answer for this short video package was missing some sections.
+    Write ONLY these sections, each starting with its tag on its own line:
+
+    {chr(10).join(f"[{tag}]" for tag in missing)}
+
+    Follow the same rules as before: no personal names ({first_name}) or restricted words in
+    image or video prompts, cinematic and symbolic visuals, IMAGE_PROMPT_1 for the first third
+    of the script, VIDEO_PROMPT for the second third and IMAGE_PROMPT_2 for the final third.
+    """
+
+    return {
+        "task": "short_package",
+        "messages": [
+            {"role": "system", "content": "You are a professional video content creator specializing in short-form vertical storytelling. Return only the requested sections in the requested tagged format."},
+            {"role": "user", "content": prompt}
+        ],
+    }
+
+def parse_video_components(content, first_name, short_video_dir, text=None):
+    """
+    Parse and save individual video components to separate files
+
+    The response is tokenized once; sections the model left out are requested
+    again on their own (when the source text is given) instead of being dropped.
+    """
     try:
-        # Save script
-        if "[SCRIPT]" in content and "[DESCRIPTION]" in content:
-            script = content.split("[SCRIPT]")[1].split("[DESCRIPTION]")[0].strip()
-            with open(short_video_dir / "script.txt", "w", encoding="utf-8") as f:
-                f.write(script)
-        
-        # Save description
-        if "[DESCRIPTION]" in content and "[IMAGE_PROMPT_1]" in content:
-            description = content.split("[DESCRIPTION]")[1].split("[IMAGE_PROMPT_1]")[0].strip()
-            with open(short_video_dir / "description.txt", "w", encoding="utf-8") as f:
-                f.write(description)
-        
+        parsed = parse_tagged_output(content, SHORT_PACKAGE_TAGS)
+        if text is not None:
+            still_missing = complete_missing_sections(
+                parsed,
+                SHORT_PACKAGE_TAGS,
+                lambda missing: chat_completion(
+                    **build_missing_sections_request(first_name, text, parsed, missing),
+                    name=first_name,
+                    stage="short_package_missing"
+                ),
+                SHORT_PACKAGE_TAGS,
+                attempts=MISSING_SECTION_ATTEMPTS,
+            )
+            if still_missing:
+                log(f"⚠️ Sections still missing: {', '.join(still_missing)}")
+
+        # Save script and description
+        for tag, filename in (("SCRIPT", "script.txt"), ("DESCRIPTION", "description.txt")):
+            if parsed.get(tag):
+                write_artifact(short_video_dir / filename, parsed.get(tag))
+
         # Save image prompts (cleaned - remove name and restricted words)
         image_prompts = []
         for i in range(1, 3):
-            start_tag = f"[IMAGE_PROMPT_{i}]"
-            end_tag = f"[VIDEO_PROMPT]" if i == 1 else "[IMAGE_PROMPT_2]"
-            
-            if start_tag in content and end_tag in content:
-                prompt_content = content.split(start_tag)[1].split(end_tag)[0].strip()
-                # Remove the [APPEARS_AT] line if present
-                if "[APPEARS_AT:" in prompt_content:
-                    prompt_content = prompt_content.split("[APPEARS_AT:")[0].strip()
-                cleaned_prompt = clean_ai_prompt(prompt_content, first_name, remove_name=True)
-                image_prompts.append(cleaned_prompt)
-                
-                with open(short_video_dir / f"image_prompt_{i}.txt", "w", encoding="utf-8") as f:
-                    f.write(cleaned_prompt)
-        
+            prompt_file = short_video_dir / f"image_prompt_{i}.txt"
+            prompt_content = parsed.get(f"IMAGE_PROMPT_{i}")
+            if not prompt_content:
+                prompt_file.unlink(missing_ok=True)
+                continue
+            cleaned_prompt = clean_ai_prompt(prompt_content, first_name, remove_name=True)
+            # Lint before paying for a render; unrepairable prompts are not saved, and
+            # a previous run's prompt file is removed so it does not get rendered instead
+            cleaned_prompt = ensure_renderable_prompt(
+                cleaned_prompt, first_name, kind="image", stage=f"short_image_prompt_{i}_repair"
+            )
+            if cleaned_prompt is None:
+                prompt_file.unlink(missing_ok=True)
+                continue
+            image_prompts.append(cleaned_prompt)
+
+            write_artifact(prompt_file, cleaned_prompt)
+
         # Save video prompt (cleaned - remove name and restricted words)
-        if "[VIDEO_PROMPT]" in content and "[IMAGE_PROMPT_2]" in content:
-            video_prompt = content.split("[VIDEO_PROMPT]")[1].split("[IMAGE_PROMPT_2]")[0].strip()
-            # Remove the [APPEARS_AT] line if present
-            if "[APPEARS_AT:" in video_prompt:
-                video_prompt = video_prompt.split("[APPEARS_AT:")[0].strip()
+        video_prompt = parsed.get("VIDEO_PROMPT")
+        video_prompt_file = short_video_dir / "video_prompt.txt"
+        cleaned_video_prompt = None
+        if video_prompt:
             cleaned_video_prompt = clean_ai_prompt(video_prompt, first_name, remove_name=True)
-            with open(short_video_dir / "video_prompt.txt", "w", encoding="utf-8") as f:
-                f.write(cleaned_video_prompt)
-                
+            cleaned_video_prompt = ensure_renderable_prompt(
+                cleaned_video_prompt, first_name, kind="video", stage="short_video_prompt_repair"
+            )
+        if cleaned_video_prompt is None:
+            video_prompt_file.unlink(missing_ok=True)
+            return parsed
+        write_artifact(video_prompt_file, cleaned_video_prompt)
+
+        return parsed
+
     except Exception as e:
-        print(f"⚠️ Error parsing video components: {e}")
-
-def clean_ai_prompt(prompt_text, first_name, remove_name=True):
-    """
-    Clean the AI image prompt by removing unwanted introductory text, year references, 
-    restricted words, and optionally the person's name
-    """
-    # Remove common introductory patterns
-    patterns_to_remove = [
-        "**AI Image Generation Prompt:**",
-        "This prompt is designed to create",
-        "capturing not just his physical likeness",
-        "the essence of his legacy",
-        "one of the greatest minds in history",
-        "==================================================",
-        "**Prompt:**",
-        "Here is a detailed AI image generation prompt:",
-        "Create an image of",
-        "Generate a visual of",
-        "Produce an image showing",
-    ]
-    
-    cleaned_prompt = prompt_text
-    for pattern in patterns_to_remove:
-        cleaned_prompt = cleaned_prompt.replace(pattern, "")
-    
-    # Remove the person's name specifically if requested
-    if remove_name:
-        cleaned_prompt = cleaned_prompt.replace(first_name, "").replace(first_name.lower(), "").replace(first_name.upper(), "")
-    
-    # Remove specific year references
-    cleaned_prompt = re.sub(r'\b(in|from|during|of|circa)\s+\d{4}s?\b', '', cleaned_prompt, flags=re.IGNORECASE)
-    cleaned_prompt = re.sub(r'\b\d{4}s?\b', '', cleaned_prompt)
-    
-    # Remove any restricted words
-    for restricted_word in RESTRICTED_WORDS:
-        # Use regex to match whole words only
-        cleaned_prompt = re.sub(r'\b' + restricted_word + r'\b', '', cleaned_prompt, flags=re.IGNORECASE)
-    
-    # Remove any phrases that start with creation verbs
-    if re.match(r'^(Create|Generate|Make|Design|Produce)\s+(a|an|the)?\s+', cleaned_prompt, re.IGNORECASE):
-        cleaned_prompt = re.sub(r'^(Create|Generate|Make|Design|Produce)\s+(a|an|the)?\s*', '', cleaned_prompt, flags=re.IGNORECASE)
-    
-    # Remove any double newlines and clean up whitespace
-    cleaned_prompt = "\n".join([line.strip() for line in cleaned_prompt.split("\n") if line.strip()])
-    cleaned_prompt = re.sub(r'\s+', ' ', cleaned_prompt)  # Remove extra spaces
-    cleaned_prompt = cleaned_prompt.strip()
-    
-    # Ensure the prompt starts with descriptive content, not commands
-    if cleaned_prompt.startswith(('a ', 'an ', 'the ')):
-        cleaned_prompt = cleaned_prompt[0].upper() + cleaned_prompt[1:]
-    
-    return cleaned_prompt
+        log(f"⚠️ Error parsing video components: {e}")
@@ -1,114 +1,255 @@
 # main.py - Clean main controller
+import argparse
+import json
 import os
+import time
 from pathlib import Path
 
 # Import from separate modules
-from config.settings import BASE_DIR, EXCEL_FILE_PATH, EXCEL_SHEET_NAME
+from config.settings import BATCH_DIR, EXCEL_FILE_PATH, EXCEL_SHEET_NAME, WAVESPEED_COMPLETION_MODE
 from utils.api_config import setup_openai_api
-from utils.excel_reader import read_excel_names
+from utils.artifact_store import get_artifact_store, write_artifact
+from utils.excel_reader import read_excel_names, read_all_excel_names
 from utils.pdf_downloader import download_wikipedia_pdf
 from utils.pdf_processor import extract_text_from_pdf
-from generators.youtube_post_generator import generate_youtube_post
-from generators.short_video_generator import generate_short_video_content
-from generators.long_video_generator import generate_long_video_content
+from utils.llm_metrics import BATCH_ID, get_metrics_store, format_report
+from utils.content_catalog import get_content_catalog
+from utils.openai_client import get_openai_client
+from utils.job_journal import resume_outstanding_jobs
+from utils.image_variants import wait_for_postprocessing
+from utils.event_log import log, log_context, set_run
+from utils.prometheus_metrics import FAILURES, STAGE_SECONDS, start_metrics_server
+from generators.youtube_post_generator import generate_youtube_post, POST_OUTPUTS
+from generators.short_video_generator import generate_short_video_content, SHORT_VIDEO_OUTPUTS
+from generators.long_video_generator import generate_long_video_content, LONG_VIDEO_OUTPUTS
 
 def setup_directories(first_name):
     """
     Create all necessary directories
     """
-    base_dir = BASE_DIR / first_name
+    base_dir = get_artifact_store().workspace(first_name)
     directories = [
         base_dir / "post",
         base_dir / "short video",
         base_dir / "long video"
     ]
-    
+
     for directory in directories:
         directory.mkdir(parents=True, exist_ok=True)
-    
-    print("✅ Directories created successfully")
+
+    log("✅ Directories created successfully")
     return base_dir
 
+def prepare_name_text(first_name):
+    """
+    Download (or reuse) the Wikipedia PDF for a name and extract its text
+    """
+    workspace = get_artifact_store().workspace(first_name)
+    pdf_path = workspace / f"{first_name.replace(' ', '_')}.pdf"
+    if pdf_path.exists():
+        log(f"✅ Reusing downloaded PDF: {pdf_path}")
+    else:
+        try:
+            pdf_path = download_wikipedia_pdf(first_name, workspace.parent)
+            log(f"✅ PDF downloaded: {pdf_path}")
+        except Exception as e:
+            log(f"❌ Failed to download PDF: {e}")
+            return None
+
+    text = extract_text_from_pdf(pdf_path)
+    if not text:
+        log("❌ Cannot proceed without extracted PDF content.")
+        return None
+
+    log(f"✅ Text extracted ({len(text)} characters)")
+    return text
+
+def run_stage(stage, generator, first_name, text, base_dir, folder, expected, run_id):
+    """
+    Run one generator and record its outcome and files in the content catalog
+    """
+    begin = time.monotonic()
+    error = None
+    with log_context(stage=stage):
+        try:
+            success = generator(first_name, text, base_dir)
+        except Exception as e:
+            success, error = False, str(e)
+            log(f"❌ {stage} failed: {e}")
+        duration = time.monotonic() - begin
+        log(f"⏱️ {stage} {'finished' if success else 'failed'} in {duration:.1f} seconds", level="debug", echo=False,
+            event="stage_finished", success=bool(success), duration_s=round(duration, 3))
+    STAGE_SECONDS.observe(duration, stage=stage)
+    if not success:
+        FAILURES.inc(kind="stage", stage=stage)
+    get_content_catalog().record_stage(first_name, stage, success, duration, base_dir / folder,
+                                       expected=expected, error=error, batch_id=BATCH_ID, run_id=run_id)
+    return success
+
+def generate_all_content(first_name, text, base_dir):
+    """
+    Run the post, short video and long video generators for one name
+    """
+    metrics = get_metrics_store()
+    run_id = metrics.begin_run(first_name)
+    set_run(first_name, run_id)
+
+    success1 = run_stage("post", generate_youtube_post, first_name, text, base_dir, "post", POST_OUTPUTS, run_id)
+    success2 = run_stage("short_video", generate_short_video_content, first_name, text, base_dir,
+                         "short video", SHORT_VIDEO_OUTPUTS, run_id)
+    success3 = run_stage("long_video", generate_long_video_content, first_name, text, base_dir,
+                         "long video", LONG_VIDEO_OUTPUTS, run_id)
+    
+    # Web copies and previews were written during the renders; wait for the last few
+    wait_for_postprocessing()
+
+    # Final Summary
+    log("📊 Final Summary:")
+    log(f"📝 Name Processed: {first_name}")
+    log(f"📄 PDF Content: ✅ Extracted ({len(text)} characters)")
+    log(f"📱 YouTube Post: {'✅ Success' if success1 else '❌ Failed'}")
+    log(f"🎥 Short Video: {'✅ Success' if success2 else '❌ Failed'}")
+    log(f"🎬 Long Video: {'✅ Success' if success3 else '❌ Failed'}")
+
+    # LLM usage report for this name
+    run_report = format_report(metrics.summarize(run_id=run_id))
+    write_artifact(base_dir / "llm_usage_report.txt", run_report)
+    log(f"📈 LLM usage report saved: {base_dir}/llm_usage_report.txt")
+    
+    # Bundle, upload or sync the name's files, depending on the artifact backend
+    get_artifact_store().publish(first_name)
+
+    if all([success1, success2, success3]):
+        log("\n🎉 All content generated successfully!")
+        log(f"📁 Files saved in: {base_dir}/")
+    else:
+        log("\n⚠️  Some content generation failed.")
+
+    return all([success1, success2, success3])
+
+def batch_write(submit=False):
+    """
+    Write Batch API request files for every name in the Excel file
+    """
+    from utils.openai_batch import write_batch_requests, submit_batch
+
+    names = read_all_excel_names(EXCEL_FILE_PATH, EXCEL_SHEET_NAME)
+    texts = {}
+    for name in names:
+        log(f"📄 Preparing {name}...")
+        text = prepare_name_text(name)
+        if text:
+            texts[name] = text
+
+    if not texts:
+        log("❌ No names could be prepared for the batch.")
+        return
+
+    requests_path = write_batch_requests(texts, BATCH_DIR / "requests.jsonl")
+    if submit:
+        batch_id = submit_batch(requests_path)
+        write_artifact(BATCH_DIR / "batch_id.txt", batch_id)
+
+def batch_ingest(results_path, requests_path):
+    """
+    Ingest Batch API results and resume every name's pipeline from them
+    """
+    from utils.openai_batch import BatchResponseStore, ingest_batch_results, manifest_path_for
+
+    with open(manifest_path_for(requests_path), "r", encoding="utf-8") as f:
+        names = list(dict.fromkeys(entry["name"] for entry in json.load(f).values()))
+    texts = {name: text for name in names if (text := prepare_name_text(name))}
+
+    store = BatchResponseStore()
+    ingested = ingest_batch_results(
+        results_path, requests_path, store=store, texts=texts,
+        followup_path=Path(requests_path).with_name(Path(requests_path).stem + "_followup.jsonl"),
+    )
+    get_openai_client().use_prefilled_responses(store)
+
+    for name in ingested:
+        if name not in texts:
+            continue
+        log(f"🎬 Resuming pipeline for {name} from batch responses...")
+        generate_all_content(name, texts[name], setup_directories(name))
+
+    log(format_report(get_metrics_store().summarize()), event="llm_report")
+
+def batch_local(requests_path, results_path):
+    """
+    Produce a results file locally (stand-in for the Batch API, no network)
+    """
+    from utils.openai_batch import LocalBatchRunner
+
+    LocalBatchRunner().run(requests_path, results_path)
+    log(f"✅ Local batch results written: {results_path}")
+
 def main():
     """
     Main function to run the complete pipeline
     """
-    print("🚀 Starting Complete Content Generation Pipeline")
-    print("=" * 60)
-    
+    log("🚀 Starting Complete Content Generation Pipeline")
+
     # Step 1: Setup API
-    print("🔑 Step 1: Configuring API...")
+    log("🔑 Step 1: Configuring API...")
     if not setup_openai_api():
-        print("❌ Cannot proceed without valid API configuration.")
+        log("❌ Cannot proceed without valid API configuration.")
         return
-    
-    print("\n" + "=" * 60)
-    
+    if os.getenv("WAVESPEED_COMPLETION_MODE") == "webhook" and WAVESPEED_COMPLETION_MODE != "webhook":
+        log("⚠️ WAVESPEED_COMPLETION_MODE=webhook needs WAVESPEED_WEBHOOK_URL; polling WaveSpeed jobs instead")
+
+    # Keep polling WaveSpeed jobs a previous run submitted but never saw finish
+    resume_outstanding_jobs()
+
     # Step 2: Read name from Excel
-    print("📊 Step 2: Reading name from Excel file...")
+    log("📊 Step 2: Reading name from Excel file...")
     first_name = read_excel_names(EXCEL_FILE_PATH, EXCEL_SHEET_NAME)
-    
+
     if not first_name:
-        print("❌ Cannot proceed without a valid name.")
-        return
-    
-    print("\n" + "=" * 60)
-    
-    # Step 3: Download PDF
-    print("📄 Step 3: Downloading Wikipedia PDF...")
-    try:
-        pdf_path = download_wikipedia_pdf(first_name, BASE_DIR)
-        print(f"✅ PDF downloaded: {pdf_path}")
-    except Exception as e:
-        print(f"❌ Failed to download PDF: {e}")
+        log("❌ Cannot proceed without a valid name.")
         return
-    
-    print("\n" + "=" * 60)
-    
-    # Step 4: Extract text from PDF
-    print("📖 Step 4: Extracting text from PDF...")
-    text = extract_text_from_pdf(pdf_path)
-    
+
+    # Step 3: Download PDF and extract text
+    log("📄 Step 3: Downloading Wikipedia PDF and extracting text...")
+    text = prepare_name_text(first_name)
+
     if not text:
-        print("❌ Cannot proceed without extracted PDF content.")
         return
-    
-    print(f"✅ Text extracted ({len(text)} characters)")
-    
-    print("\n" + "=" * 60)
-    
-    # Step 5: Setup directories
-    print("📁 Step 5: Creating directories...")
+
+    # Step 4: Setup directories
+    log("📁 Step 4: Creating directories...")
     base_dir = setup_directories(first_name)
-    
-    print("\n" + "=" * 60)
-    
-    # Step 6: Generate content
-    print("🎬 Step 6: Generating content...")
-    
-    success1 = generate_youtube_post(first_name, text, base_dir)
-    print()
-    
-    success2 = generate_short_video_content(first_name, text, base_dir)
-    print()
-    
-    success3 = generate_long_video_content(first_name, text, base_dir)
-    print()
-    
-    # Final Summary
-    print("📊 Final Summary:")
-    print("=" * 60)
-    print(f"📝 Name Processed: {first_name}")
-    print(f"📄 PDF Content: ✅ Extracted ({len(text)} characters)")
-    print(f"📱 YouTube Post: {'✅ Success' if success1 else '❌ Failed'}")
-    print(f"🎥 Short Video: {'✅ Success' if success2 else '❌ Failed'}")
-    print(f"🎬 Long Video: {'✅ Success' if success3 else '❌ Failed'}")
-    
-    if all([success1, success2, success3]):
-        print("\n🎉 All content generated successfully!")
-        print(f"📁 Files saved in: {base_dir}/")
-    else:
-        print("\n⚠️  Some content generation failed.")
+
+    # Step 5: Generate content
+    log("🎬 Step 5: Generating content...")
+    generate_all_content(first_name, text, base_dir)
+
+    log(format_report(get_metrics_store().summarize()), event="llm_report")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate social media content from Wikipedia biographies")
+    parser.add_argument("--batch-write", action="store_true",
+                        help="Write Batch API request files for all names instead of running live")
+    parser.add_argument("--submit", action="store_true",
+                        help="With --batch-write: upload the request file and create the batch")
+    parser.add_argument("--batch-ingest", metavar="RESULTS",
+                        help="Ingest a Batch API results file and resume each name's pipeline")
+    parser.add_argument("--batch-local", metavar="RESULTS",
+                        help="Write a results file locally from the request file (no network)")
+    parser.add_argument("--requests", default=str(BATCH_DIR / "requests.jsonl"),
+                        help="Batch request file used by --batch-ingest and --batch-local")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    start_metrics_server()
+    if args.batch_local:
+        batch_local(args.requests, args.batch_local)
+    elif args.batch_write:
+        batch_write(submit=args.submit)
+    elif args.batch_ingest:
+        if setup_openai_api():
+            resume_outstanding_jobs()
+            batch_ingest(args.batch_ingest, args.requests)
+    else:
+        main()
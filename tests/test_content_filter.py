@@ -0,0 +1,39 @@
+# tests/test_content_filter.py
+import unittest
+
+from utils.content_filter import ContentFilter, _legacy_filter, clean_ai_prompt, get_content_filter
+from utils.prompt_linter import tidy_prompt
+
+POST_PROMPT = ("**Prompt:**\n\nA portrait of Ada Lovelace at her desk in 1843.\n"
+               "  Soft window light, brass instruments.  \n\n"
+               "Oil painting style.")
+
+
+class ContentFilterTest(unittest.TestCase):
+    def test_phrases_win_over_their_words(self):
+        result = ContentFilter(["war", "war crimes", "crime"]).filter("after the war crimes trial")
+        self.assertEqual(result.text, "after the  trial")
+        self.assertEqual(result.hits, {"war crimes": 1})
+
+    def test_matches_the_per_word_filter(self):
+        text = "A Gun and a KNIFE beside a warm candle, a war archive, drugstore sign"
+        self.assertEqual(get_content_filter().filter(text).text, _legacy_filter(text))
+        self.assertEqual(get_content_filter().find(text), {"gun": 1, "knife": 1, "war": 1})
+
+
+class CleanPromptTest(unittest.TestCase):
+    def test_collapses_whitespace_by_default(self):
+        cleaned = clean_ai_prompt(POST_PROMPT, "Ada Lovelace", remove_name=True)
+        self.assertEqual(cleaned, "A portrait of at her desk . Soft window light, brass instruments. Oil painting style.")
+
+    def test_post_prompt_keeps_its_lines(self):
+        cleaned = clean_ai_prompt(POST_PROMPT, "Ada Lovelace", remove_name=False, filter_restricted=False,
+                                  keep_newlines=True)
+        self.assertEqual(cleaned, "A portrait of Ada Lovelace at her desk .\n"
+                                  "Soft window light, brass instruments.\n"
+                                  "Oil painting style.")
+        self.assertEqual(tidy_prompt(cleaned), cleaned.replace(" .", "."))
+
+
+if __name__ == "__main__":
+    unittest.main()
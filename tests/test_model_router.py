@@ -0,0 +1,54 @@
+# tests/test_model_router.py
+import unittest
+from unittest import mock
+
+from config.settings import DEFAULT_MODEL_ROUTE, MODEL_ROUTES
+from generators.short_video_generator import build_short_visual_request
+from utils.model_router import StubBackend, resolve_route, route_request_body, stub_response
+
+
+@mock.patch("utils.model_router.LLM_BACKEND", None)
+class ResolveRouteTest(unittest.TestCase):
+    def test_task_profile(self):
+        route = resolve_route("script")
+        self.assertEqual(route["max_tokens"], MODEL_ROUTES["script"]["max_tokens"])
+        self.assertEqual(route["model"], MODEL_ROUTES["script"]["model"])
+        self.assertEqual(route["backend"], "openai")
+
+    def test_unknown_and_missing_task_fall_back_to_default(self):
+        for task in ("no_such_task", None):
+            self.assertEqual(resolve_route(task), DEFAULT_MODEL_ROUTE)
+
+    def test_backend_override(self):
+        with mock.patch("utils.model_router.LLM_BACKEND", "stub"):
+            self.assertEqual(resolve_route("caption")["backend"], "stub")
+            self.assertEqual(resolve_route(None)["backend"], "stub")
+
+    def test_video_prompts_have_their_own_route(self):
+        self.assertEqual(resolve_route("video_prompt")["max_tokens"], 500)
+        self.assertEqual(resolve_route("visual_prompt")["max_tokens"], 600)
+        video = build_short_visual_request("Ada", "A script.", "video", "first")
+        image = build_short_visual_request("Ada", "A script.", "image", "first")
+        self.assertEqual(route_request_body(video)["max_tokens"], 500)
+        self.assertEqual(route_request_body(image)["max_tokens"], 600)
+
+
+class StubBackendTest(unittest.TestCase):
+    def test_records_calls_and_usage(self):
+        backend = StubBackend(responder=lambda task, messages: "x" * 40)
+        messages = [{"role": "system", "content": "s" * 20}, {"role": "user", "content": "u" * 60}]
+
+        content, usage = backend.complete("gpt-test", messages, 0.7, 123, task="caption")
+
+        self.assertEqual(content, "x" * 40)
+        self.assertEqual(backend.calls, [{"task": "caption", "model": "gpt-test", "max_tokens": 123}])
+        self.assertEqual(usage, {"prompt_tokens": 20, "completion_tokens": 10, "total_tokens": 30})
+
+    def test_default_responses_are_shaped_per_task(self):
+        content, _ = StubBackend().complete("gpt-test", [], 0.7, 100, task="script")
+        self.assertEqual(content, stub_response("script", []))
+        self.assertIn("[SECTION 14]", content)
+
+
+if __name__ == "__main__":
+    unittest.main()
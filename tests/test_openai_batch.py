@@ -0,0 +1,97 @@
+# tests/test_openai_batch.py
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import utils.llm_metrics as llm_metrics
+from utils.openai_batch import (
+    INITIAL_STAGES,
+    BatchResponseStore,
+    LocalBatchRunner,
+    batch_custom_id,
+    ingest_batch_results,
+    manifest_path_for,
+    write_batch_requests,
+)
+
+TEXTS = {
+    "Ada Lovelace": "Ada Lovelace wrote the first published algorithm for Babbage's Analytical Engine.",
+    "José Martí": "José Martí was a Cuban poet, essayist and journalist.",
+}
+
+
+def _read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class BatchRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.requests_path = self.directory / "requests.jsonl"
+        self.results_path = self.directory / "results.jsonl"
+        self.store = BatchResponseStore(self.directory / "responses")
+        # Keep ingest's metrics out of the real database
+        self._previous_store = llm_metrics._store
+        llm_metrics._store = llm_metrics.LLMMetricsStore(self.directory / "metrics.db")
+
+    def tearDown(self):
+        llm_metrics._store = self._previous_store
+
+    def _ingest(self):
+        return ingest_batch_results(self.results_path, self.requests_path, store=self.store)
+
+    def test_request_file_round_trip(self):
+        write_batch_requests(TEXTS, self.requests_path)
+
+        lines = _read_lines(self.requests_path)
+        with open(manifest_path_for(self.requests_path), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.assertEqual(len(lines), len(TEXTS) * len(INITIAL_STAGES))
+        self.assertEqual(len({line["custom_id"] for line in lines}), len(lines))
+        for line in lines:
+            self.assertEqual(line["method"], "POST")
+            self.assertTrue(line["body"]["model"])
+            self.assertTrue(line["body"]["messages"])
+            entry = manifest[line["custom_id"]]
+            self.assertEqual(line["custom_id"], batch_custom_id(entry["name"], entry["stage"]))
+        self.assertEqual({(entry["name"], entry["stage"]) for entry in manifest.values()},
+                         {(name, stage) for name in TEXTS for stage in INITIAL_STAGES})
+
+    def test_results_map_back_to_name_and_stage(self):
+        write_batch_requests(TEXTS, self.requests_path)
+        LocalBatchRunner(responder=lambda custom_id, body: f"answer for {custom_id}").run(
+            self.requests_path, self.results_path)
+
+        names = self._ingest()
+
+        self.assertEqual(sorted(names), sorted(TEXTS))
+        for name in TEXTS:
+            for stage in INITIAL_STAGES:
+                self.assertEqual(self.store.lookup(name, stage), f"answer for {batch_custom_id(name, stage)}")
+
+    def test_partially_failed_batch(self):
+        write_batch_requests(TEXTS, self.requests_path)
+        LocalBatchRunner(responder=lambda custom_id, body: "ok").run(self.requests_path, self.results_path)
+        failed_id = batch_custom_id("José Martí", "long_script")
+        results = _read_lines(self.results_path)
+        for result in results:
+            if result["custom_id"] == failed_id:
+                result["response"] = {"status_code": 500, "body": {"error": {"message": "server error"}}}
+                result["error"] = {"code": "server_error"}
+        results.append({"custom_id": "Unknown-00000000--post_caption", "response": {"status_code": 200}})
+        with open(self.results_path, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+        names = self._ingest()
+
+        self.assertEqual(sorted(names), sorted(TEXTS))
+        self.assertIsNone(self.store.lookup("José Martí", "long_script"))
+        self.assertEqual(self.store.lookup("José Martí", "post_caption"), "ok")
+        self.assertEqual(self.store.lookup("Ada Lovelace", "long_script"), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# tests/test_wavespeed_client.py
+import base64
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from utils.wavespeed_client import WaveSpeedClient, WaveSpeedError
+from utils.wavespeed_stub import WaveSpeedStubServer
+
+
+class _Response:
+    def __init__(self, chunks, status_code=200):
+        self.chunks = chunks
+        self.status_code = status_code
+        self.text = ""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, size):
+        for chunk in self.chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+
+class _Session:
+    def __init__(self, response):
+        self.response = response
+
+    def post(self, *args, **kwargs):
+        return self.response
+
+
+def _body(data: bytes) -> bytes:
+    encoded = base64.b64encode(data).decode()
+    return json.dumps({"data": {"id": "r1", "status": "completed", "outputs": [encoded]}}).encode()
+
+
+class RunSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        # An output hard-linked to a shared asset store blob (see utils.asset_store)
+        self.blob = self.directory / "blob"
+        self.blob.write_bytes(b"previous render")
+        self.output = self.directory / "image_1.jpg"
+        os.link(self.blob, self.output)
+
+    def _client(self, response):
+        client = WaveSpeedClient(base_url="http://wavespeed.invalid")
+        client.session = _Session(response)
+        client._auth_headers = lambda: {}
+        return client
+
+    def _leftovers(self):
+        return sorted(path.name for path in self.directory.iterdir() if path.name.endswith(".tmp"))
+
+    def test_failed_stream_keeps_old_file_and_blob(self):
+        import requests
+
+        body = _body(b"new render " * 1000)
+        response = _Response([body[:200], requests.exceptions.ChunkedEncodingError("connection reset")])
+        with self.assertRaises(WaveSpeedError):
+            self._client(response).run_sync("model", {}, self.output)
+        self.assertEqual(self.output.read_bytes(), b"previous render")
+        self.assertEqual(self.blob.read_bytes(), b"previous render")
+        self.assertEqual(self._leftovers(), [])
+
+    def test_failed_task_keeps_old_file(self):
+        body = json.dumps({"data": {"id": "r1", "status": "failed", "error": "nsfw", "outputs": []}}).encode()
+        with self.assertRaises(WaveSpeedError):
+            self._client(_Response([body])).run_sync("model", {}, self.output)
+        self.assertEqual(self.output.read_bytes(), b"previous render")
+        self.assertEqual(self._leftovers(), [])
+
+    def test_success_replaces_link_without_touching_blob(self):
+        data, url = self._client(_Response([_body(b"new render")])).run_sync("model", {}, self.output)
+        self.assertIsNone(url)
+        self.assertEqual(self.output.read_bytes(), b"new render")
+        self.assertEqual(self.blob.read_bytes(), b"previous render")
+        self.assertEqual(self._leftovers(), [])
+
+
+@mock.patch.dict(os.environ, {"WAVESPEED_API_KEY": "test-key"})
+class StubServerTest(unittest.TestCase):
+    """
+    The client against the local WaveSpeed stand-in: submit, poll, download
+    """
+
+    def setUp(self):
+        self.stub = WaveSpeedStubServer(image_delay=0.2, output_bytes=b"rendered image " * 500).start()
+        self.addCleanup(self.stub.stop)
+        self.client = WaveSpeedClient(base_url=self.stub.base_url)
+        self.directory = Path(tempfile.mkdtemp())
+
+    def _wait(self, request_id, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            result = self.client.poll(request_id)
+            if result["status"] in ("completed", "failed"):
+                return result
+            time.sleep(0.05)
+        self.fail(f"request {request_id} did not finish")
+
+    def test_submit_poll_download(self):
+        request_id = self.client.submit("bytedance/seedream-v3", {"prompt": "a lighthouse", "size": "1024*1024"})
+        self.assertEqual(self.client.poll(request_id)["status"], "processing")
+
+        result = self._wait(request_id)
+        self.assertEqual(result["status"], "completed")
+        path = self.client.download(result["outputs"][0], self.directory / "image.jpg")
+
+        self.assertEqual(path.read_bytes(), b"rendered image " * 500)
+        self.assertEqual(self.stub.counts["submits"], 1)
+        self.assertEqual(self.stub.counts["downloads"], 1)
+        self.assertGreaterEqual(self.stub.counts["polls"], 2)
+
+    def test_unknown_request(self):
+        with self.assertRaises(WaveSpeedError):
+            self.client.poll("no-such-request")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,337 @@
+# utils/artifact_store.py
+import atexit
+import hashlib
+import os
+import sqlite3
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from config.settings import (
+    BASE_DIR,
+    ARTIFACT_BACKEND,
+    ARTIFACT_WORK_DIR,
+    ARTIFACT_FSYNC_BATCH,
+    ARTIFACT_SQLITE_PATH,
+    ARTIFACT_S3_BUCKET,
+    ARTIFACT_S3_PREFIX,
+    ARTIFACT_S3_ENDPOINT,
+    ARTIFACT_S3_PART_SIZE,
+    ARTIFACT_S3_CONCURRENCY,
+)
+from utils.event_log import log
+
+# Already-compressed media is stored as-is in zip bundles
+_STORED_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".avif", ".mp4", ".pdf"}
+
+
+class ArtifactStore:
+    """
+    Where the generators write a name's files
+
+    Every file is written to a temporary name and renamed into place, so a
+    crash never leaves a half-written file that a resumed run would trust.
+    fsyncs are batched: files (and their directories) are synced every
+    fsync_batch writes and on flush(), instead of once per file.
+
+    The base store keeps each name's files in root/<name>, which is final.
+    Other backends work in a local directory and publish() each finished name
+    in one go (a bundle, a database or an object store), so shared storage
+    sees a few large operations instead of many small ones.
+    """
+
+    def __init__(self, root=BASE_DIR, fsync_batch=ARTIFACT_FSYNC_BATCH):
+        self.root = Path(root)
+        self.fsync_batch = fsync_batch
+        self._unsynced = []
+        self._lock = threading.Lock()
+
+    def workspace(self, name) -> Path:
+        """
+        Directory a name's files are generated in
+        """
+        return self.root / name
+
+    def write_bytes(self, path, data: bytes, skip_unchanged=False) -> bool:
+        """
+        Atomically write a file
+
+        Args:
+            skip_unchanged (bool): Leave the file alone if it already has this content
+
+        Returns:
+            bool: True if the file was written
+        """
+        path = Path(path)
+        if skip_unchanged and _unchanged(path, data):
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+        with self._lock:
+            self._unsynced.append(path)
+            due = len(self._unsynced) >= self.fsync_batch
+        if due:
+            self.flush()
+        return True
+
+    def write_text(self, path, text: str, skip_unchanged=False) -> bool:
+        return self.write_bytes(path, text.encode("utf-8"), skip_unchanged=skip_unchanged)
+
+    def flush(self):
+        """
+        fsync every file written since the last flush, then their directories
+        """
+        with self._lock:
+            paths, self._unsynced = self._unsynced, []
+        directories = set()
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    os.fsync(f.fileno())
+            except OSError:
+                continue  # Replaced or removed since
+            directories.add(path.parent)
+        if os.name == "posix":
+            for directory in directories:
+                descriptor = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(descriptor)
+                finally:
+                    os.close(descriptor)
+
+    def publish(self, name) -> bool:
+        """
+        Make a finished name's files durable in the backend. Returns True on success.
+        """
+        self.flush()
+        return True
+
+    def _files(self, name):
+        # Every file of a name's workspace, skipping temporary files
+        workspace = self.workspace(name)
+        return sorted(path for path in workspace.rglob("*")
+                      if path.is_file() and not path.name.endswith((".tmp", ".part", ".part.json")))
+
+
+class BundleArtifactStore(ArtifactStore):
+    """
+    Works in a local directory and publishes each name as one tar or zip file in bundle_dir
+    """
+
+    def __init__(self, bundle_dir=BASE_DIR, bundle_format="tar", work_dir=ARTIFACT_WORK_DIR, **kwargs):
+        super().__init__(root=work_dir, **kwargs)
+        self.bundle_dir = Path(bundle_dir)
+        self.bundle_format = bundle_format
+
+    def bundle_path(self, name) -> Path:
+        return self.bundle_dir / f"{name}.{self.bundle_format}"
+
+    def write_bundle(self, name, target) -> int:
+        """
+        Write a name's workspace into a bundle at target. Returns the number of files.
+        """
+        files = self._files(name)
+        workspace = self.workspace(name)
+        if self.bundle_format == "zip":
+            with zipfile.ZipFile(target, "w") as bundle:
+                for path in files:
+                    compression = zipfile.ZIP_STORED if path.suffix.lower() in _STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+                    bundle.write(path, f"{name}/{path.relative_to(workspace).as_posix()}", compress_type=compression)
+        else:
+            with tarfile.open(target, "w") as bundle:
+                for path in files:
+                    bundle.add(path, f"{name}/{path.relative_to(workspace).as_posix()}")
+        with open(target, "rb") as f:
+            os.fsync(f.fileno())
+        return len(files)
+
+    def publish(self, name) -> bool:
+        self.flush()
+        target = self.bundle_path(name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_name(f".{target.name}.tmp")
+        begin = time.monotonic()
+        try:
+            count = self.write_bundle(name, temporary)
+            os.replace(temporary, target)
+        except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+            log(f"❌ Could not bundle {name}: {e}")
+            return False
+        log(f"📦 {count} files of {name} bundled: {target} ({time.monotonic() - begin:.2f} seconds)")
+        return True
+
+
+class SQLiteArtifactStore(ArtifactStore):
+    """
+    Works in a local directory and publishes each name's files as rows of one SQLite database
+
+    Files whose checksum is unchanged since the last publish are not rewritten.
+    """
+
+    def __init__(self, db_path=ARTIFACT_SQLITE_PATH, work_dir=ARTIFACT_WORK_DIR, **kwargs):
+        super().__init__(root=work_dir, **kwargs)
+        self.db_path = Path(db_path)
+
+    def _connect(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "name TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, sha256 TEXT NOT NULL, "
+            "updated REAL NOT NULL, data BLOB NOT NULL, PRIMARY KEY (name, path))"
+        )
+        return connection
+
+    def publish(self, name) -> bool:
+        self.flush()
+        workspace = self.workspace(name)
+        begin = time.monotonic()
+        written = 0
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    known = dict(connection.execute("SELECT path, sha256 FROM artifacts WHERE name = ?", (name,)))
+                    for path in self._files(name):
+                        relative = path.relative_to(workspace).as_posix()
+                        data = path.read_bytes()
+                        digest = hashlib.sha256(data).hexdigest()
+                        if known.get(relative) == digest:
+                            continue
+                        connection.execute(
+                            "INSERT OR REPLACE INTO artifacts (name, path, size, sha256, updated, data) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (name, relative, len(data), digest, time.time(), data)
+                        )
+                        written += 1
+            finally:
+                connection.close()
+        except (OSError, sqlite3.Error) as e:
+            log(f"❌ Could not store {name} in {self.db_path}: {e}")
+            return False
+        log(f"🗄️ {written} changed files of {name} stored in {self.db_path} ({time.monotonic() - begin:.2f} seconds)")
+        return True
+
+
+class S3ArtifactStore(BundleArtifactStore):
+    """
+    Works in a local directory and uploads each name as one tar object to an
+    S3-compatible bucket (AWS, MinIO, ...), in parts sent in parallel
+
+    Needs boto3; credentials come from the usual AWS environment variables or files.
+    """
+
+    def __init__(self, bucket=ARTIFACT_S3_BUCKET, prefix=ARTIFACT_S3_PREFIX, endpoint=ARTIFACT_S3_ENDPOINT,
+                 part_size=ARTIFACT_S3_PART_SIZE, concurrency=ARTIFACT_S3_CONCURRENCY, work_dir=ARTIFACT_WORK_DIR,
+                 **kwargs):
+        # The bundle is staged next to the workspaces before it is uploaded
+        super().__init__(bundle_dir=work_dir, bundle_format="tar", work_dir=work_dir, **kwargs)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint = endpoint
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self._client = None
+
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("s3", endpoint_url=self.endpoint)
+        return self._client
+
+    def upload(self, path, key):
+        """
+        Upload a file, in parallel parts of part_size once it is larger than one part
+        """
+        client = self.client()
+        size = path.stat().st_size
+        if size <= self.part_size:
+            with open(path, "rb") as f:
+                client.put_object(Bucket=self.bucket, Key=key, Body=f)
+            return
+
+        upload_id = client.create_multipart_upload(Bucket=self.bucket, Key=key)["UploadId"]
+
+        def _part(number):
+            with open(path, "rb") as f:
+                f.seek((number - 1) * self.part_size)
+                body = f.read(self.part_size)
+            etag = client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                      PartNumber=number, Body=body)["ETag"]
+            return {"PartNumber": number, "ETag": etag}
+
+        parts = range(1, (size + self.part_size - 1) // self.part_size + 1)
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="s3-upload") as pool:
+                uploaded = list(pool.map(_part, parts))
+            client.complete_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                             MultipartUpload={"Parts": uploaded})
+        except Exception:
+            client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+    def publish(self, name) -> bool:
+        if not super().publish(name):
+            return False
+        key = f"{self.prefix}{name}.tar"
+        begin = time.monotonic()
+        try:
+            self.upload(self.bundle_path(name), key)
+        except Exception as e:
+            log(f"❌ Could not upload {name} to s3://{self.bucket}/{key}: {e}")
+            return False
+        log(f"☁️ {name} uploaded to s3://{self.bucket}/{key} ({time.monotonic() - begin:.2f} seconds)")
+        return True
+
+
+def create_artifact_store(backend=ARTIFACT_BACKEND) -> ArtifactStore:
+    """
+    Artifact store for a backend name: "local", "tar", "zip", "sqlite" or "s3"
+    """
+    if backend in ("tar", "zip"):
+        return BundleArtifactStore(bundle_format=backend)
+    if backend == "sqlite":
+        return SQLiteArtifactStore()
+    if backend == "s3":
+        return S3ArtifactStore()
+    return ArtifactStore()
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """
+    Process-wide artifact store (fsyncs outstanding writes at exit)
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_artifact_store()
+            atexit.register(_store.flush)
+        return _store
+
+
+def _unchanged(path, data) -> bool:
+    # A file that cannot be read back (permissions, I/O error) is simply rewritten
+    try:
+        return path.exists() and path.stat().st_size == len(data) and path.read_bytes() == data
+    except OSError as e:
+        log(f"⚠️ Could not read {path} ({e}), writing it again")
+        return False
+
+
+def write_artifact(path, text, skip_unchanged=False) -> bool:
+    """
+    Atomically write a text artifact through the process-wide store
+    """
+    return get_artifact_store().write_text(path, text, skip_unchanged=skip_unchanged)
@@ -0,0 +1,199 @@
+# utils/asset_store.py
+"""
+Content-addressed store of finished renders, hard-linked into output directories
+
+Invariant: a path under an output directory may share its inode with a store
+blob (and with every other output linked to it), so nothing may open an output
+for writing in place. Every writer creates a temporary file in the same
+directory and os.replace()s it onto the output: WaveSpeedClient.run_sync,
+utils.downloader.download_file (via "<name>.part"), the image variant and
+post-processing writers, the video assembler and utils.artifact_store.
+Replacing a link only repoints that one path; the blob and other links keep
+their content.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from config.settings import (
+    ASSET_STORE_DIR,
+    ASSET_STORE_MAX_BYTES,
+    ASSET_STORE_REFERENCE_TTL,
+    WAVESPEED_DETERMINISTIC_SEED,
+)
+from utils.event_log import log
+
+# Payload fields that change how a render is delivered, not what is rendered
+_DELIVERY_FIELDS = {"enable_sync_mode", "enable_base64_output"}
+
+
+def render_seed(model, payload) -> int:
+    """
+    Seed for a render: derived from the endpoint and payload when deterministic
+    seeds are enabled (so identical requests can be served from the store),
+    -1 (random) otherwise
+    """
+    if not WAVESPEED_DETERMINISTIC_SEED:
+        return -1
+    fields = {k: v for k, v in payload.items() if k != "seed" and k not in _DELIVERY_FIELDS}
+    digest = hashlib.sha256(json.dumps([model, fields], sort_keys=True).encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % 2**31
+
+
+def asset_key(model, payload) -> Optional[str]:
+    """
+    Content address of a render: endpoint, prompt, size, seed, guidance and any
+    other payload field. None for random-seed renders, which are never reused.
+    """
+    if payload.get("seed", -1) == -1:
+        return None
+    fields = {k: v for k, v in payload.items() if k not in _DELIVERY_FIELDS}
+    return hashlib.sha256(json.dumps([model, fields], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class AssetStore:
+    """
+    Content-addressed store of finished renders
+
+    Files live at root/ab/<key><suffix> and are hard-linked into output
+    directories (copied across filesystems), so outputs must be replaced rather
+    than edited in place. Renders that are only known by URL (videos) are kept
+    as references that expire after reference_ttl seconds. The least recently
+    used files are evicted once the store exceeds max_bytes.
+    """
+
+    def __init__(self, root=ASSET_STORE_DIR, max_bytes=ASSET_STORE_MAX_BYTES,
+                 reference_ttl=ASSET_STORE_REFERENCE_TTL):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.reference_ttl = reference_ttl
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key, suffix) -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def fetch(self, model, payload, target) -> bool:
+        """
+        Link a stored render to target if there is one
+
+        Returns:
+            bool: True on a hit
+        """
+        key = asset_key(model, payload)
+        if key is None:
+            return False
+        stored = self._path(key, Path(target).suffix)
+        if not stored.exists():
+            return False
+        try:
+            link_file(stored, target)
+            os.utime(stored)  # Mark as recently used
+        except OSError as e:
+            log(f"⚠️ Could not reuse stored render {stored}: {e}")
+            return False
+        self.hits += 1
+        log(f"♻️ Reused stored render: {target}")
+        return True
+
+    def put(self, model, payload, source):
+        """
+        Add a finished render to the store (no-op for random-seed renders)
+        """
+        key = asset_key(model, payload)
+        if key is None:
+            return
+        source = Path(source)
+        stored = self._path(key, source.suffix)
+        try:
+            stored.parent.mkdir(parents=True, exist_ok=True)
+            if not stored.exists():
+                link_file(source, stored)
+        except OSError as e:
+            log(f"⚠️ Could not store render {source}: {e}")
+            return
+        self.evict()
+
+    def reference(self, model, payload) -> Optional[str]:
+        """
+        URL of a stored render that is only kept remotely, if still fresh
+        """
+        key = asset_key(model, payload)
+        if key is None:
+            return None
+        stored = self._path(key, ".url")
+        try:
+            if time.time() - stored.stat().st_mtime > self.reference_ttl:
+                return None
+            url = stored.read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        self.hits += 1
+        log(f"♻️ Reused stored render: {url}")
+        return url or None
+
+    def put_reference(self, model, payload, url):
+        key = asset_key(model, payload)
+        if key is None:
+            return
+        stored = self._path(key, ".url")
+        try:
+            stored.parent.mkdir(parents=True, exist_ok=True)
+            stored.write_text(url, encoding="utf-8")
+        except OSError as e:
+            log(f"⚠️ Could not store render reference: {e}")
+
+    def evict(self):
+        """
+        Delete least recently used files until the store fits in max_bytes
+        """
+        with self._lock:
+            files = []
+            for path in self.root.glob("*/*"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                except OSError:
+                    pass
+
+
+def link_file(source, target):
+    """
+    Hard-link source to target, replacing target; copy if linking is not possible
+    """
+    target = Path(target)
+    temporary = target.with_name(f".{target.name}.{threading.get_ident()}.tmp")
+    try:
+        os.link(source, temporary)
+    except OSError:
+        shutil.copy2(source, temporary)
+    os.replace(temporary, target)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_asset_store() -> AssetStore:
+    """
+    Process-wide asset store
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AssetStore()
+        return _store
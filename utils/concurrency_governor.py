@@ -0,0 +1,163 @@
+# utils/concurrency_governor.py
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from config.settings import PROVIDER_CONCURRENCY, ENDPOINT_CONCURRENCY
+from utils.event_log import log
+
+
+class Slot:
+    """
+    A granted place under a provider's and an endpoint's concurrency limit
+    """
+
+    def __init__(self, governor, provider, endpoint, expected_seconds, requested_at):
+        self.governor = governor
+        self.provider = provider
+        self.endpoint = endpoint
+        self.expected_seconds = expected_seconds
+        self.waited = time.monotonic() - requested_at
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.governor._release(self)
+
+
+class ConcurrencyGovernor:
+    """
+    Concurrency limits per provider (e.g. WaveSpeed's concurrent-job quota) and
+    per endpoint, with a longest-job-first wait queue
+
+    Waiting requests are granted in order of expected duration, longest first,
+    so multi-minute video renders start before images that take seconds; a
+    request whose endpoint is full does not hold back shorter requests for
+    other endpoints. Providers or endpoints without a configured limit are
+    unlimited.
+    """
+
+    def __init__(self, provider_limits=None, endpoint_limits=None):
+        self.provider_limits: Dict[str, int] = dict(PROVIDER_CONCURRENCY if provider_limits is None else provider_limits)
+        self.endpoint_limits: Dict[str, int] = dict(ENDPOINT_CONCURRENCY if endpoint_limits is None else endpoint_limits)
+        self._running = {}  # provider or (provider, endpoint) -> slots held
+        self._waiting = []  # heap of (-expected seconds, sequence, request)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _has_room(self, provider, endpoint):
+        provider_limit = self.provider_limits.get(provider)
+        endpoint_limit = self.endpoint_limits.get(endpoint)
+        return ((provider_limit is None or self._running.get(provider, 0) < provider_limit)
+                and (endpoint_limit is None or self._running.get((provider, endpoint), 0) < endpoint_limit))
+
+    def _take(self, provider, endpoint):
+        self._running[provider] = self._running.get(provider, 0) + 1
+        self._running[(provider, endpoint)] = self._running.get((provider, endpoint), 0) + 1
+
+    def request(self, provider, endpoint, expected_seconds, start: Callable[[Slot], None]):
+        """
+        Ask for a slot without blocking; start(slot) is called once it is granted
+
+        start runs on the thread that frees the slot (or the caller's, if there is
+        room right away), so it should only hand the work off. The work must call
+        slot.release() when it is done.
+        """
+        with self._lock:
+            heapq.heappush(self._waiting, (-expected_seconds, next(self._sequence),
+                                           (provider, endpoint, expected_seconds, time.monotonic(), start)))
+            granted = self._grant()
+        self._start(granted)
+
+    def acquire(self, provider, endpoint, expected_seconds) -> Slot:
+        """
+        Block until a slot is granted
+        """
+        granted = threading.Event()
+        holder = []
+
+        def _start(slot):
+            holder.append(slot)
+            granted.set()
+
+        self.request(provider, endpoint, expected_seconds, _start)
+        granted.wait()
+        return holder[0]
+
+    def try_acquire(self, provider, endpoint, expected_seconds) -> Optional[Slot]:
+        """
+        Take a slot only if one is free right now and nothing of the provider's is
+        queued for one (e.g. for a hedged duplicate, which must not wait or jump
+        the queue); None otherwise
+        """
+        with self._lock:
+            if any(entry[2][0] == provider for entry in self._waiting) or not self._has_room(provider, endpoint):
+                return None
+            self._take(provider, endpoint)
+            return Slot(self, provider, endpoint, expected_seconds, time.monotonic())
+
+    @contextmanager
+    def slot(self, provider, endpoint, expected_seconds):
+        slot = self.acquire(provider, endpoint, expected_seconds)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    def _grant(self):
+        # Walk the queue longest-first and grant everything that fits; caller holds the lock
+        granted = []
+        remaining = []
+        while self._waiting:
+            entry = heapq.heappop(self._waiting)
+            provider, endpoint, expected_seconds, requested_at, start = entry[2]
+            if self._has_room(provider, endpoint):
+                self._take(provider, endpoint)
+                granted.append((Slot(self, provider, endpoint, expected_seconds, requested_at), start))
+            else:
+                remaining.append(entry)
+        for entry in remaining:
+            heapq.heappush(self._waiting, entry)
+        return granted
+
+    def _start(self, granted):
+        for slot, start in granted:
+            try:
+                start(slot)
+            except Exception as e:
+                log(f"⚠️ Could not start {slot.endpoint} job: {e}")
+                slot.release()
+
+    def _release(self, slot):
+        with self._lock:
+            self._running[slot.provider] -= 1
+            self._running[(slot.provider, slot.endpoint)] -= 1
+            granted = self._grant()
+        self._start(granted)
+
+    def stats(self, provider) -> dict:
+        with self._lock:
+            return {
+                "running": self._running.get(provider, 0),
+                "waiting": sum(1 for entry in self._waiting if entry[2][0] == provider),
+                "limit": self.provider_limits.get(provider),
+            }
+
+
+_governor: Optional[ConcurrencyGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_concurrency_governor() -> ConcurrencyGovernor:
+    """
+    Process-wide governor, shared by every generator and every name in a run
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = ConcurrencyGovernor()
+        return _governor
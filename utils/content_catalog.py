@@ -0,0 +1,257 @@
+# utils/content_catalog.py
+import argparse
+import hashlib
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from config.settings import CONTENT_CATALOG_DB_PATH
+from utils.event_log import log
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    batch_id TEXT,
+    run_id TEXT,
+    name TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration_s REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_stages_name ON stages (name, stage, ts);
+CREATE INDEX IF NOT EXISTS idx_stages_batch ON stages (batch_id);
+CREATE TABLE IF NOT EXISTS artifacts (
+    name TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    section INTEGER,
+    status TEXT NOT NULL,
+    size INTEGER,
+    sha256 TEXT,
+    mtime REAL,
+    ts REAL NOT NULL,
+    run_id TEXT,
+    PRIMARY KEY (name, path)
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_status ON artifacts (status, stage, kind);
+"""
+
+_SECTION_RE = re.compile(r"_(\d+)\.[^.]+$")
+# Stages every name goes through (see main.generate_all_content)
+STAGES = ("post", "short_video", "long_video")
+
+
+def artifact_kind(filename) -> str:
+    """
+    What a generated file is, from its name: clip, video, image, thumbnail, prompt, url, script, text or source
+    """
+    if filename in ("long_video.mp4", "short_video.mp4"):
+        return "video"
+    suffix = Path(filename).suffix.lower()
+    if suffix == ".mp4":
+        return "clip"
+    if suffix in (".jpg", ".jpeg", ".png", ".webp", ".avif"):
+        return "thumbnail" if "thumbnail" in filename else "image"
+    if suffix == ".pdf":
+        return "source"
+    if "prompt" in filename:
+        return "prompt"
+    if "_url" in filename or "_path" in filename:
+        return "url"
+    if filename == "script.txt":
+        return "script"
+    return "text"
+
+
+def _sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentCatalog:
+    """
+    Local SQLite index of every stage outcome and generated file, by name
+
+    Stages are appended (the latest row per name and stage counts); artifacts
+    are kept current, including expected files that are missing, so status
+    questions are answered from indexes instead of walking BASE_DIR.
+    """
+
+    def __init__(self, db_path=CONTENT_CATALOG_DB_PATH):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def record_stage(self, name, stage, success, duration_s, directory, expected: Iterable[str] = (),
+                     error=None, batch_id=None, run_id=None):
+        """
+        Record a stage's outcome and the files in its directory
+
+        Files already catalogued with the same size and modification time are
+        not hashed again. Expected files that do not exist, and catalogued files
+        that have disappeared, are recorded as missing.
+        """
+        directory = Path(directory)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                known = {row[0]: row[1:] for row in conn.execute(
+                    "SELECT path, size, mtime, sha256 FROM artifacts WHERE name = ? AND stage = ?", (name, stage))}
+                rows = []
+                present = set()
+                files = sorted(path for path in directory.iterdir()
+                               if path.is_file() and not path.name.startswith(".")) if directory.exists() else []
+                for path in files:
+                    relative = f"{directory.name}/{path.name}"
+                    present.add(relative)
+                    stat = path.stat()
+                    size, mtime, sha256 = known.get(relative, (None, None, None))
+                    if size != stat.st_size or mtime != stat.st_mtime or not sha256:
+                        sha256 = _sha256(path)
+                    rows.append((name, stage, relative, artifact_kind(path.name), self._section(path.name),
+                                 "present", stat.st_size, sha256, stat.st_mtime, now, run_id))
+                missing = {f"{directory.name}/{filename}" for filename in expected} | set(known)
+                for relative in sorted(missing - present):
+                    filename = relative.rsplit("/", 1)[-1]
+                    rows.append((name, stage, relative, artifact_kind(filename), self._section(filename),
+                                 "missing", None, None, None, now, run_id))
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO artifacts (name, stage, path, kind, section, status, size, sha256, "
+                        "mtime, ts, run_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    conn.execute(
+                        "INSERT INTO stages (ts, batch_id, run_id, name, stage, status, duration_s, error) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (now, batch_id, run_id, name, stage, "ok" if success else "failed", duration_s, error))
+        except (sqlite3.Error, OSError) as e:
+            # The catalog must never break generation
+            log(f"⚠️ Could not record {stage} of {name} in the content catalog: {e}")
+
+    @staticmethod
+    def _section(filename) -> Optional[int]:
+        match = _SECTION_RE.search(filename)
+        return int(match.group(1)) if match else None
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def latest_stages(self, name=None):
+        """
+        (name, stage, status, duration_s, error, ts) of each name's latest run of every stage
+        """
+        where, params = ("WHERE name = ?", (name,)) if name else ("", ())
+        return self.query(
+            f"SELECT name, stage, status, duration_s, error, MAX(ts) FROM stages {where} "
+            f"GROUP BY name, stage ORDER BY name, stage", params)
+
+    def missing(self, stage=None, kind=None):
+        """
+        (name, path, section) of every missing artifact, optionally of one stage and kind
+        """
+        conditions, params = ["status = 'missing'"], []
+        if stage:
+            conditions.append("stage = ?")
+            params.append(stage)
+        if kind:
+            conditions.append("kind = ?")
+            params.append(kind)
+        return self.query(
+            f"SELECT name, path, section FROM artifacts WHERE {' AND '.join(conditions)} ORDER BY name, path", params)
+
+    def failures(self):
+        """
+        Latest stage runs that failed: (name, stage, error, ts)
+        """
+        return [(name, stage, error, ts) for name, stage, status, _, error, ts in self.latest_stages()
+                if status == "failed"]
+
+    def completion(self, batch_id=None, stages=STAGES) -> dict:
+        """
+        Share of names whose latest run of every expected stage succeeded, overall or
+        within one batch; a stage that never ran counts as incomplete
+        """
+        where, params = ("WHERE batch_id = ?", (batch_id,)) if batch_id else ("", ())
+        placeholders = ", ".join("?" for _ in stages)
+        rows = self.query(
+            f"SELECT name, SUM(stage IN ({placeholders}) AND status = 'ok') FROM "
+            f"(SELECT name, stage, status, MAX(ts) FROM stages {where} GROUP BY name, stage) GROUP BY name",
+            tuple(stages) + params)
+        complete = sum(1 for _, ok in rows if ok == len(stages))
+        return {"names": len(rows), "complete": complete,
+                "percent": 100.0 * complete / len(rows) if rows else 0.0}
+
+
+_catalog: Optional[ContentCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_content_catalog() -> ContentCatalog:
+    """
+    Process-wide content catalog
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ContentCatalog()
+        return _catalog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the catalog of generated content")
+    parser.add_argument("--db", default=str(CONTENT_CATALOG_DB_PATH), help="Catalog database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    status = commands.add_parser("status", help="Latest outcome of every stage, per name")
+    status.add_argument("name", nargs="?")
+    missing = commands.add_parser("missing", help="Missing artifacts, e.g. --stage long_video --kind clip")
+    missing.add_argument("--stage", choices=STAGES)
+    missing.add_argument("--kind", help="clip, video, image, thumbnail, prompt, url, script or text")
+    missing.add_argument("--names", action="store_true", help="Only list the names")
+    commands.add_parser("failed", help="Stages whose latest run failed")
+    completion = commands.add_parser("completion", help="Share of names with every stage complete")
+    completion.add_argument("--batch", help="Batch ID (default: all batches)")
+    args = parser.parse_args(argv)
+
+    begin = time.monotonic()
+    catalog = ContentCatalog(args.db)
+    if args.command == "status":
+        for name, stage, state, duration_s, error, ts in catalog.latest_stages(args.name):
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(ts))
+            print(f"{name:<30}{stage:<14}{state:<8}{(duration_s or 0):>8.1f}s  {when}  {error or ''}")
+    elif args.command == "missing":
+        rows = catalog.missing(args.stage, args.kind)
+        if args.names:
+            for name in dict.fromkeys(name for name, _, _ in rows):
+                print(name)
+        else:
+            for name, path, section in rows:
+                print(f"{name:<30}{path:<45}{'' if section is None else section}")
+    elif args.command == "failed":
+        for name, stage, error, ts in catalog.failures():
+            print(f"{name:<30}{stage:<14}{error or ''}")
+    elif args.command == "completion":
+        result = catalog.completion(args.batch)
+        print(f"{result['complete']}/{result['names']} names complete ({result['percent']:.1f}%)")
+    print(f"({(time.monotonic() - begin) * 1000:.1f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# utils/content_filter.py
+import re
+import time
+from collections import Counter, namedtuple
+
+from utils.event_log import log
+
+# List of restricted words that cannot be in the final prompts
+RESTRICTED_WORDS = [
+    "strike", "attack", "kill", "murder", "shoot", "shot", "stab", "blood", "gore", "bomb", 
+    "gun", "rifle", "pistol", "knife", "sword", "chainsaw", "explosion", "massacre", "execution", 
+    "decapitate", "torture", "mutilation", "behead", "slaughter", "corpse", "cadaver", "weapon", 
+    "bullet", "grenade", "mine", "missile", "war", "combat", "battlefield", "militia", "insurgent", 
+    "fighter", "assassination", "terrorist", "terrorism", "jihad", "extremist", "nazi", "hitler", 
+    "fascist", "racist", "slurs", "hate", "slavery", "genocide", "lynching", "burning", "hanging", 
+    "protest", "riot", "uprising", "coup", "holocaust", "concentration camp", "dictator", "war crimes", 
+    "prison camp", "executioner", "hostage", "abuse", "rape", "incest", "molest", "pedophile", "child", 
+    "minor", "underage", "toddler", "infant", "baby", "trafficking", "kidnapping", "exploitation", 
+    "nude", "naked", "topless", "bottomless", "sex", "erotic", "porn", "pornography", "hentai", "xxx", 
+    "fetish", "bdsm", "dominatrix", "bondage", "dildo", "vibrator", "intercourse", "orgasm", 
+    "ejaculation", "masturbation", "obscene", "strip", "stripping", "lingerie", "seduce", "prostitute", 
+    "escort", "brothel", "incestuous", "adultery", "lust", "genitals", "penis", "vagina", "breast", 
+    "nipples", "clitoris", "anus", "rectum", "oral sex", "anal sex", "bestiality", "zoophilia", 
+    "necrophilia", "pedophilia", "suicide", "self-harm", "cut", "cutting", "overdose", "hang", 
+    "depression", "depressed", "mental illness", "disorder", "trauma", "PTSD", "schizophrenia", 
+    "bipolar", "anorexia", "bulimia", "starvation", "eating disorder", "thinspo", "self-injury", 
+    "self-destruction", "jump", "fall", "drown", "asphyxiation", "choking", "suffocation", "drugs", 
+    "drug", "cocaine", "heroin", "meth", "methamphetamine", "crack", "LSD", "acid", "ecstasy", "MDMA", 
+    "molly", "opium", "opioid", "oxy", "fentanyl", "shrooms", "psilocybin", "cannabis", "weed", 
+    "marijuana", "pot", "joint", "blunt", "bong", "smoking", "vape", "nicotine", "cigarette", "cigar", 
+    "hookah", "alcohol", "beer", "wine", "vodka", "rum", "tequila", "whiskey", "absinthe", "drunk", 
+    "intoxicated", "poisoning", "addict", "addiction", "trafficking", "smuggling", "cartel", "gang", 
+    "mafia", "underworld", "crime", "criminal", "robbery", "theft", "burglary", "fraud", "scam", 
+    "hacking", "hacker", "dark web", "deep web", "darknet", "illegal", "contraband", "counterfeit", 
+    "forgery", "bribery", "corruption", "blackmail", "extortion", "mob", "gang violence", "prison", 
+    "inmate", "prisoner", "jail", "convict", "execution chamber", "lethal injection", "gas chamber", 
+    "electric chair", "cancer", "AIDS", "HIV", "COVID", "SARS", "Ebola", "plague", "leprosy", 
+    "tuberculosis", "cholera", "malaria", "syphilis", "gonorrhea", "STD", "STI", "hepatitis", 
+    "pandemic", "epidemic", "tumor", "brain damage", "organ failure", "miscarriage", "abortion", 
+    "stillbirth", "deformity", "mutation", "genetic disease", "disability"
+]
+
+# Boilerplate the models like to wrap their prompts in
+INTRO_PATTERNS = [
+    "**AI Image Generation Prompt:**",
+    "**AI Video Generation Prompt:**",
+    "This prompt is designed to create",
+    "capturing not just his physical likeness",
+    "the essence of his legacy",
+    "one of the greatest minds in history",
+    "==================================================",
+    "**Prompt:**",
+    "Here is a detailed AI image generation prompt:",
+    "Here is a detailed AI video generation prompt:",
+    "Create an image of",
+    "Generate a visual of",
+    "Produce an image showing",
+]
+
+FilterResult = namedtuple("FilterResult", ["text", "hits"])
+
+_INTRO_RE = re.compile("|".join(re.escape(pattern) for pattern in INTRO_PATTERNS))
+_CENTURY_RE = re.compile(r'\b\d{1,2}(st|nd|rd|th)?\s+(century|Century)\b', re.IGNORECASE)
+_YEAR_PHRASE_RE = re.compile(r'\b(in|from|during|of|circa)\s+\d{4}s?\b', re.IGNORECASE)
+_YEAR_RE = re.compile(r'\b\d{4}s?\b')
+_COMMAND_RE = re.compile(r'^(Create|Generate|Make|Design|Produce)\s+(a|an|the)?\s*', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _trie_pattern(terms):
+    """
+    Build a regex from a prefix trie of the terms (e.g. "mur(?:der)?" style).
+    Shared prefixes are matched once, so the alternation behaves like an automaton
+    instead of trying every term at every position. Longer continuations are tried
+    first, so "war crimes" wins over "war".
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def _build(node):
+        end = "" in node
+        branches = [re.escape(char) + _build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not end:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if end else body
+
+    return _build(trie)
+
+
+class ContentFilter:
+    """
+    Restricted-term filter compiled once into a single trie-shaped regex.
+
+    Every match is handled in one pass over the text, and multi-word phrases
+    ("war crimes") win over the single words they contain ("war").
+    """
+
+    def __init__(self, terms=RESTRICTED_WORDS):
+        unique_terms = {}
+        for term in terms:
+            unique_terms.setdefault(term.lower(), term)
+        self.terms = unique_terms
+        self.pattern = re.compile(r'\b(?:' + _trie_pattern(unique_terms) + r')\b', re.IGNORECASE)
+
+    def filter(self, text, replacement="") -> FilterResult:
+        """
+        Remove (or replace) every restricted term in one pass
+
+        Returns:
+            FilterResult: (filtered text, {term: count} of the terms that were hit)
+        """
+        hits = Counter()
+
+        def _replace(match):
+            hits[self.terms[match.group(0).lower()]] += 1
+            return replacement
+
+        return FilterResult(self.pattern.sub(_replace, text), dict(hits))
+
+    def find(self, text) -> dict:
+        """
+        Report restricted terms present in the text without changing it
+        """
+        return dict(Counter(self.terms[match.lower()] for match in self.pattern.findall(text)))
+
+
+_default_filter = None
+
+
+def get_content_filter() -> ContentFilter:
+    """
+    Return the shared filter for RESTRICTED_WORDS (compiled on first use)
+    """
+    global _default_filter
+    if _default_filter is None:
+        _default_filter = ContentFilter()
+    return _default_filter
+
+
+def clean_ai_prompt(prompt_text, first_name, remove_name=True, filter_restricted=True, remove_centuries=False,
+                    keep_newlines=False):
+    """
+    Clean an AI image/video prompt by removing unwanted introductory text, year references,
+    restricted words, and optionally the person's name
+    
+    Args:
+        prompt_text (str): Raw prompt returned by the model
+        first_name (str): Name of the subject
+        remove_name (bool): Strip the subject's name
+        filter_restricted (bool): Strip restricted terms
+        remove_centuries (bool): Also strip "19th century" style references
+        keep_newlines (bool): Keep the line breaks (only blank lines are dropped)
+    
+    Returns:
+        str: The cleaned prompt
+    """
+    cleaned_prompt = _INTRO_RE.sub("", prompt_text)
+    
+    # Remove the person's name specifically if requested
+    if remove_name:
+        cleaned_prompt = cleaned_prompt.replace(first_name, "").replace(first_name.lower(), "").replace(first_name.upper(), "")
+    
+    # Remove specific year references
+    if remove_centuries:
+        cleaned_prompt = _CENTURY_RE.sub('', cleaned_prompt)
+    cleaned_prompt = _YEAR_PHRASE_RE.sub('', cleaned_prompt)
+    cleaned_prompt = _YEAR_RE.sub('', cleaned_prompt)
+    
+    # Remove any restricted words in a single pass
+    if filter_restricted:
+        cleaned_prompt, hits = get_content_filter().filter(cleaned_prompt)
+        if hits:
+            log(f"🧹 Removed restricted terms: {', '.join(sorted(hits))}")
+    
+    # Remove any phrases that start with creation verbs
+    cleaned_prompt = _COMMAND_RE.sub('', cleaned_prompt, count=1)
+    
+    # Clean up whitespace
+    if keep_newlines:
+        cleaned_prompt = "\n".join(line.strip() for line in cleaned_prompt.split("\n") if line.strip())
+    else:
+        cleaned_prompt = _WHITESPACE_RE.sub(' ', cleaned_prompt).strip()
+    
+    # Ensure the prompt starts with descriptive content, not commands
+    if cleaned_prompt.startswith(('a ', 'an ', 'the ')):
+        cleaned_prompt = cleaned_prompt[0].upper() + cleaned_prompt[1:]
+    
+    return cleaned_prompt
+
+
+def _legacy_filter(text):
+    """The previous per-word implementation, kept for the benchmark"""
+    for restricted_word in RESTRICTED_WORDS:
+        text = re.sub(r'\b' + restricted_word + r'\b', '', text, flags=re.IGNORECASE)
+    return text
+
+
+def benchmark(prompt_words=(100, 1000, 5000), batch_size=200):
+    """
+    Compare the per-word re.sub loop with the compiled single-pass filter
+    """
+    vocabulary = ("a dimly lit study with scattered manuscripts and brass instruments under warm "
+                  "candle light while a storm gathers over the harbour war gun crime").split()
+    content_filter = get_content_filter()
+    log(f"{'words':>8}{'prompts':>9}{'legacy s':>11}{'compiled s':>12}{'speedup':>9}")
+    for words in prompt_words:
+        prompts = [" ".join(vocabulary[(i + j) % len(vocabulary)] for j in range(words))
+                   for i in range(batch_size)]
+
+        # Warm up the compiled pattern so only filtering is timed
+        content_filter.filter(prompts[0])
+        # re caches only a few hundred patterns, so the legacy loop recompiles as it would in a real run
+        re.purge()
+
+        started = time.perf_counter()
+        legacy = [_legacy_filter(prompt) for prompt in prompts]
+        legacy_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        compiled = [content_filter.filter(prompt).text for prompt in prompts]
+        compiled_time = time.perf_counter() - started
+
+        assert legacy == compiled
+        log(f"{words:>8}{batch_size:>9}{legacy_time:>11.3f}{compiled_time:>12.3f}"
+            f"{legacy_time / compiled_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark()
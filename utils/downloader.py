@@ -0,0 +1,268 @@
+# utils/downloader.py
+import hashlib
+import json
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from config.settings import (
+    DOWNLOAD_CONNECTIONS,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_CHUNK_SIZE,
+    WAVESPEED_REQUEST_TIMEOUT,
+)
+from utils.asset_store import link_file
+from utils.event_log import log
+from utils.prometheus_metrics import API_RETRIES, FAILURES
+
+DownloadResult = namedtuple("DownloadResult", ["path", "size", "sha256"])
+
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)')
+# Single-part uploads on S3-style CDNs use the body's MD5 as ETag
+_MD5_ETAG_RE = re.compile(r'^"?([0-9a-f]{32})"?$')
+
+
+class DownloadError(Exception):
+    """A file could not be downloaded completely and intact"""
+    pass
+
+
+def _checksums(path, chunk_size=DOWNLOAD_CHUNK_SIZE) -> Tuple[str, str]:
+    sha256, md5 = hashlib.sha256(), hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+            md5.update(chunk)
+    return sha256.hexdigest(), md5.hexdigest()
+
+
+def _origin_path(part) -> Path:
+    return part.with_name(part.name + ".json")
+
+
+def _read_origin(part) -> Optional[dict]:
+    # URL and validators of the response a partial file was started from
+    try:
+        with open(_origin_path(part), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_origin(part, url, response):
+    origin = {"url": url, "etag": response.headers.get("ETag"),
+              "last_modified": response.headers.get("Last-Modified")}
+    with open(_origin_path(part), "w", encoding="utf-8") as f:
+        json.dump(origin, f)
+
+
+def _discard(part):
+    part.unlink(missing_ok=True)
+    _origin_path(part).unlink(missing_ok=True)
+
+
+def download_file(session, url, path, timeout=WAVESPEED_REQUEST_TIMEOUT, retries=DOWNLOAD_RETRIES,
+                  expected_sha256: Optional[str] = None, chunk_size=DOWNLOAD_CHUNK_SIZE) -> DownloadResult:
+    """
+    Stream url to path, resuming interrupted transfers with HTTP Range requests
+
+    Data goes to "<path>.part" and is moved into place only once its size
+    matches the advertised length and its checksum matches expected_sha256 (or
+    the ETag, when that is a plain MD5). A corrupt file is discarded and fetched
+    again from the start.
+
+    "<path>.part.json" records the URL, ETag and Last-Modified the partial file
+    came from. A partial file is only resumed for the same URL, with If-Range,
+    so a changed file (or a new render written to the same path) is fetched
+    whole instead of being appended to the old one.
+
+    Returns:
+        DownloadResult: (path, size in bytes, sha256 hex digest)
+
+    Raises:
+        DownloadError: If the file is still incomplete or corrupt after all retries
+    """
+    path = Path(path)
+    part = path.with_name(path.name + ".part")
+    last_error = None
+
+    for attempt in range(retries + 1):
+        if attempt:
+            API_RETRIES.inc(provider="download")
+            time.sleep(min(2 ** (attempt - 1), 10))
+        offset = part.stat().st_size if part.exists() else 0
+        origin = _read_origin(part) if offset else None
+        if offset and (origin is None or origin.get("url") != url):
+            _discard(part)
+            offset = 0
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            validator = origin.get("etag") if not (origin.get("etag") or "W/").startswith("W/") else None
+            validator = validator or origin.get("last_modified")
+            if validator:
+                headers["If-Range"] = validator
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416:
+                    # Nothing left to send: the part file is complete, or longer than the file
+                    match = _CONTENT_RANGE_RE.match(response.headers.get("Content-Range", ""))
+                    total = int(match.group(2)) if match and match.group(2) != "*" else None
+                    if total != offset:
+                        _discard(part)
+                        last_error = "partial file does not match the remote file"
+                        continue
+                    etag = None
+                elif response.status_code == 206:
+                    match = _CONTENT_RANGE_RE.match(response.headers.get("Content-Range", ""))
+                    if not match or int(match.group(1) or -1) != offset:
+                        _discard(part)
+                        last_error = "server answered with the wrong range"
+                        continue
+                    if origin and origin.get("etag") and response.headers.get("ETag") not in (None, origin["etag"]):
+                        _discard(part)
+                        last_error = "remote file changed since the partial download"
+                        continue
+                    total = int(match.group(2)) if match.group(2) != "*" else None
+                    etag = response.headers.get("ETag")
+                    mode = "ab"
+                elif response.status_code == 200:
+                    # Range not supported (or a fresh start): take the whole body
+                    length = response.headers.get("Content-Length")
+                    total = int(length) if length and "Content-Encoding" not in response.headers else None
+                    etag = response.headers.get("ETag")
+                    mode = "wb"
+                elif response.status_code >= 500:
+                    last_error = f"server error {response.status_code}"
+                    continue
+                else:
+                    FAILURES.inc(kind="download")
+                    raise DownloadError(f"Error downloading {url}: {response.status_code}")
+
+                if response.status_code != 416:
+                    if mode == "wb":
+                        # A fresh start, or the server ignored the Range: the partial file is dropped
+                        _write_origin(part, url, response)
+                    with open(part, mode) as f:
+                        for chunk in response.iter_content(chunk_size):
+                            f.write(chunk)
+        except requests.exceptions.RequestException as e:
+            last_error = str(e)
+            continue
+
+        size = part.stat().st_size
+        if total is not None and size < total:
+            last_error = f"incomplete transfer ({size} of {total} bytes)"
+            continue
+        if total is not None and size > total:
+            _discard(part)
+            last_error = f"received {size} bytes, expected {total}"
+            continue
+
+        sha256, md5 = _checksums(part, chunk_size)
+        etag_md5 = _MD5_ETAG_RE.match((etag or "").strip())
+        if (expected_sha256 and sha256 != expected_sha256) or (etag_md5 and etag_md5.group(1) != md5):
+            _discard(part)
+            last_error = "checksum mismatch"
+            continue
+
+        os.replace(part, path)
+        _origin_path(part).unlink(missing_ok=True)
+        return DownloadResult(path, size, sha256)
+
+    FAILURES.inc(kind="download")
+    raise DownloadError(f"Error downloading {url}: {last_error}")
+
+
+def download_all(session, items: Iterable[Tuple[str, Path]], connections=DOWNLOAD_CONNECTIONS) -> Dict[Path, object]:
+    """
+    Download (url, path) pairs concurrently; a URL listed more than once is fetched once
+
+    Returns:
+        dict: {path: DownloadResult or the exception that stopped it}
+    """
+    by_url = {}
+    for url, path in items:
+        by_url.setdefault(url, []).append(Path(path))
+
+    def _fetch(url, paths):
+        try:
+            result = download_file(session, url, paths[0])
+        except DownloadError as e:
+            return {path: e for path in paths}
+        results = {paths[0]: result}
+        for path in paths[1:]:
+            link_file(paths[0], path)
+            results[path] = result._replace(path=path)
+        return results
+
+    results = {}
+    if not by_url:
+        return results
+    with ThreadPoolExecutor(max_workers=min(connections, len(by_url)), thread_name_prefix="download") as pool:
+        for outcome in pool.map(lambda entry: _fetch(*entry), by_url.items()):
+            results.update(outcome)
+    return results
+
+
+def download_url_files(directory, pattern="video_url*.txt", session=None) -> bool:
+    """
+    Fetch the file behind every URL file in a directory, e.g. video_url_3.txt -> video_3.mp4
+
+    The local path is written next to the URL file (video_path_3.txt). Files
+    already downloaded from the same URL are skipped.
+
+    Returns:
+        bool: True if every file is available locally
+    """
+    if session is None:
+        from utils.wavespeed_client import get_wavespeed_client
+        session = get_wavespeed_client().session
+
+    directory = Path(directory)
+    items = []
+    for url_file in sorted(directory.glob(pattern)):
+        url = url_file.read_text(encoding="utf-8").strip()
+        if not url:
+            continue
+        suffix = Path(urlsplit(url).path).suffix or ".mp4"
+        target = directory / (url_file.stem.replace("_url", "") + suffix)
+        path_file = url_file.with_name(url_file.name.replace("_url", "_path"))
+        if target.exists() and path_file.exists() and _recorded_url(path_file) == url:
+            continue
+        items.append((url, target, url_file, path_file))
+    if not items:
+        return True
+
+    log(f"⬇️ Downloading {len(items)} rendered file(s)...")
+    begin = time.monotonic()
+    results = download_all(session, [(url, target) for url, target, _, _ in items])
+
+    success = True
+    total_bytes = 0
+    for url, target, url_file, path_file in items:
+        result = results[target]
+        if isinstance(result, Exception):
+            log(f"❌ {url_file.name}: {result}")
+            success = False
+            continue
+        total_bytes += result.size
+        with open(path_file, "w", encoding="utf-8") as f:
+            f.write(f"{target}\n{url}\nsha256:{result.sha256}\n")
+    log(f"✅ Downloaded {total_bytes / 1e6:.1f} MB in {time.monotonic() - begin:.2f} seconds")
+    return success
+
+
+def _recorded_url(path_file):
+    try:
+        lines = path_file.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    return lines[1] if len(lines) > 1 else None
@@ -0,0 +1,104 @@
+# utils/event_log.py
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from config.settings import EVENT_LOG_PATH, EVENT_LOG_CONSOLE
+
+# Leading symbol of a message -> level, for messages logged without one
+_LEVELS = {"❌": "error", "⚠️": "warning", "⏳": "debug"}
+
+# Fields (name, stage, ...) of the code currently running in this thread or task
+_context = contextvars.ContextVar("event_context", default={})
+# Name and run ID set by set_run in this thread or task
+_run = contextvars.ContextVar("event_run", default=None)
+# thread ident -> name and run ID, for worker threads that did not inherit the context
+_active_runs = {}
+_runs_lock = threading.Lock()
+_write_lock = threading.Lock()
+_file = None
+
+
+def set_run(name=None, run_id=None):
+    """
+    Mark the name (and its LLM metrics run ID) the calling thread is working on
+
+    Worker threads that did not inherit the caller's context are tagged with it
+    too, as long as it is the only run in progress; with several names processed
+    at once their events carry no name rather than a wrong one.
+    """
+    fields = {"name": name, "run_id": run_id} if name else None
+    _run.set(fields)
+    with _runs_lock:
+        if fields:
+            _active_runs[threading.get_ident()] = fields
+        else:
+            _active_runs.pop(threading.get_ident(), None)
+
+
+def _run_fields():
+    fields = _run.get()
+    if fields is not None:
+        return fields
+    with _runs_lock:
+        runs = list(_active_runs.values())
+    return runs[0] if len(runs) == 1 else {}
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Add fields (e.g. stage="long_video") to every event logged inside the block
+    """
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def _level(message):
+    for symbol, level in _LEVELS.items():
+        if message.lstrip().startswith(symbol):
+            return level
+    return "info"
+
+
+def _write(line):
+    global _file
+    if not EVENT_LOG_PATH:
+        return
+    with _write_lock:
+        try:
+            if _file is None:
+                Path(EVENT_LOG_PATH).parent.mkdir(parents=True, exist_ok=True)
+                _file = open(EVENT_LOG_PATH, "a", encoding="utf-8", buffering=1)
+            _file.write(line + "\n")
+        except OSError:
+            pass  # Logging must never break generation
+
+
+def log(message, level=None, event=None, echo=True, **fields):
+    """
+    Log a message: printed as before (or as JSON with EVENT_LOG_CONSOLE=json) and
+    appended to the JSON-lines event log with a timestamp, level, run ID, name,
+    stage and any extra fields (e.g. duration_s); echo=False only records it
+    """
+    record = {
+        "ts": round(time.time(), 3),
+        "level": level or _level(message),
+        **_run_fields(),
+        **_context.get(),
+        "event": event,
+        "message": message,
+        **fields,
+    }
+    record = {key: value for key, value in record.items() if value is not None}
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    _write(line)
+    if echo:
+        print(line if EVENT_LOG_CONSOLE == "json" else message)
+
@@ -2,6 +2,8 @@
 import pandas as pd
 import os
 
+from utils.event_log import log
+
 def read_excel_names(file_path='Names.xlsx', sheet_name='sheet'):
     """
     Read names from Excel file and return the first name
@@ -11,13 +13,31 @@ def read_excel_names(file_path='Names.xlsx', sheet_name='sheet'):
         names_list = df['Name'].dropna().tolist()
         
         if not names_list:
-            print("❌ The name list is empty. Please check the Excel file.")
+            log("❌ The name list is empty. Please check the Excel file.")
             return None
         
         first_name = names_list[0]
-        print(f"✅ First name extracted: {first_name}")
+        log(f"✅ First name extracted: {first_name}")
         return first_name
         
     except Exception as e:
-        print(f"❌ Error reading Excel file: {e}")
+        log(f"❌ Error reading Excel file: {e}")
         return None
+
+def read_all_excel_names(file_path='Names.xlsx', sheet_name='sheet'):
+    """
+    Read every name from the Excel file
+    """
+    try:
+        df = pd.read_excel(file_path, sheet_name=sheet_name)
+        names_list = [str(name).strip() for name in df['Name'].dropna().tolist()]
+        
+        if not names_list:
+            log("❌ The name list is empty. Please check the Excel file.")
+        else:
+            log(f"✅ {len(names_list)} names extracted")
+        return names_list
+        
+    except Exception as e:
+        log(f"❌ Error reading Excel file: {e}")
+        return []
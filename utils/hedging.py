@@ -0,0 +1,177 @@
+# utils/hedging.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
+
+from config.settings import (
+    HEDGE_ENABLED,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_BUDGET,
+    HEDGE_HISTORY_SIZE,
+    HEDGE_HISTORY_PATH,
+)
+from utils.event_log import log
+from utils.latency import LatencyHistory, percentile
+
+
+class HedgePolicy:
+    """
+    Hedged requests for one provider.
+
+    Latencies of successful calls are kept per key (task or endpoint). Once a
+    call has been running longer than the configured percentile of its key's
+    history, one duplicate is started and whichever finishes first wins. The
+    loser's cancel event is set so polling loops can stop; calls that cannot
+    be interrupted are simply ignored. Duplicates are capped at a fraction of
+    primary requests (the provider's budget).
+
+    run() hedges a blocking call. Callers that track requests themselves (the
+    render queue) use count_primary(), take_budget()/return_budget() and
+    count_win() around their own duplicates.
+    """
+
+    def __init__(self, provider, enabled=None, percentile=HEDGE_PERCENTILE,
+                 min_samples=HEDGE_MIN_SAMPLES, budget=None, history_size=HEDGE_HISTORY_SIZE,
+                 history_path=HEDGE_HISTORY_PATH):
+        self.provider = provider
+        self.enabled = HEDGE_ENABLED.get(provider, False) if enabled is None else enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.budget = HEDGE_BUDGET.get(provider, 0.0) if budget is None else budget
+        self.history = LatencyHistory(provider, history_path, history_size)
+        self.primaries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(thread_name_prefix=f"hedge-{provider}")
+
+    def record_latency(self, key, seconds):
+        # Latencies are only kept (and written) while hedging is on for the provider
+        if self.enabled:
+            self.history.record(key, seconds)
+
+    def hedge_delay(self, key) -> Optional[float]:
+        """
+        Seconds to wait before sending a duplicate, or None without enough history
+        """
+        history = self.history.get(key)
+        if len(history) < self.min_samples:
+            return None
+        return percentile(history, self.percentile)
+
+    def count_primary(self):
+        with self._lock:
+            self.primaries += 1
+
+    def take_budget(self) -> bool:
+        """
+        Reserve one duplicate under the budget; False if it is used up
+        """
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.primaries:
+                return False
+            self.hedges += 1
+            return True
+
+    def return_budget(self):
+        # A reserved duplicate that was not sent after all
+        with self._lock:
+            self.hedges -= 1
+
+    def count_win(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    def _timed(self, fn, cancelled):
+        started = time.monotonic()
+        result = fn(cancelled)
+        return result, time.monotonic() - started
+
+    def _timed_with_slot(self, fn, cancelled, slot):
+        try:
+            return self._timed(fn, cancelled)
+        finally:
+            if slot is not None:
+                slot.release()
+
+    def run(self, fn, key="default", hedge_slot=None, on_discarded=None):
+        """
+        Call fn(cancelled) and return its result, hedging it if it runs slow.
+        cancelled is a threading.Event that is set when the call has lost the race.
+
+        on_discarded, if given, is called with the result of a call that lost the
+        race but still completed, so work that was paid for can be accounted for.
+
+        hedge_slot, if given, is called before sending a duplicate and returns a
+        concurrency slot for it (released when the duplicate ends) or None, in
+        which case no duplicate is sent. The caller holds the primary's slot, so
+        time spent queued for it never counts as latency.
+        """
+        self.count_primary()
+
+        delay = self.hedge_delay(key) if self.enabled else None
+        if delay is None:
+            result, elapsed = self._timed(fn, threading.Event())
+            self.record_latency(key, elapsed)
+            return result
+
+        events = [threading.Event()]
+        futures = [self._executor.submit(self._timed, fn, events[0])]
+        done, _ = wait(futures, timeout=delay)
+        if not done and self.take_budget():
+            slot = hedge_slot() if hedge_slot is not None else None
+            if hedge_slot is None or slot is not None:
+                log(f"⏳ {self.provider} request slower than p{int(self.percentile * 100)} "
+                    f"({delay:.1f}s), sending a hedged duplicate")
+                events.append(threading.Event())
+                futures.append(self._executor.submit(self._timed_with_slot, fn, events[1], slot))
+            else:
+                self.return_budget()
+
+        pending = list(futures)
+        last_error = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                if future.exception() is not None:
+                    last_error = future.exception()
+                    continue
+
+                result, elapsed = future.result()
+                self.record_latency(key, elapsed)
+                winner = futures.index(future)
+                if winner > 0:
+                    self.count_win()
+                for index, event in enumerate(events):
+                    if index != winner:
+                        event.set()
+                        if on_discarded is not None:
+                            futures[index].add_done_callback(lambda loser: _discarded(loser, on_discarded))
+                return result
+
+        raise last_error
+
+
+def _discarded(future, on_discarded):
+    if future.exception() is None:
+        try:
+            on_discarded(future.result()[0])
+        except Exception as e:
+            log(f"⚠️ Could not account for a discarded hedged call: {e}")
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_hedge_policy(provider) -> HedgePolicy:
+    """
+    Return the process-wide hedge policy for a provider ("openai" or "wavespeed")
+    """
+    with _policies_lock:
+        if provider not in _policies:
+            _policies[provider] = HedgePolicy(provider)
+        return _policies[provider]
@@ -0,0 +1,314 @@
+# utils/image_variants.py
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import List, Optional
+
+from config.settings import IMAGE_POSTPROCESS, IMAGE_POSTPROCESS_WORKERS, IMAGE_OUTPUT_VARIANTS
+from utils.artifact_store import write_artifact
+from utils.event_log import log
+
+# Longest side of the downscaled copy used to find the busiest crop window
+_ENERGY_SIZE = 256
+# Pull towards the centre so flat backgrounds do not push the crop to an edge
+_CENTER_WEIGHT = 0.15
+
+DERIVATIONS_FILE = "derived_images.json"
+_derivations_lock = threading.Lock()
+
+# File extension and Pillow feature needed per output format
+_OUTPUT_FORMATS = {"JPEG": (".jpg", None), "PNG": (".png", None), "WEBP": (".webp", "webp"), "AVIF": (".avif", "avif")}
+
+
+def source_digest(path) -> str:
+    """
+    SHA-256 of an image file, recorded with everything derived from it
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def smart_crop_box(image, width, height):
+    """
+    Crop box with the target aspect ratio that keeps the most detail
+
+    The image is cropped along one axis only; the window position is the one
+    with the most edge energy, lightly weighted towards the centre.
+
+    Returns:
+        tuple: (left, top, right, bottom) in image pixels
+    """
+    from PIL import ImageFilter
+
+    source_width, source_height = image.size
+    target = width / height
+    if abs(source_width / source_height - target) < 1e-3:
+        return 0, 0, source_width, source_height
+
+    horizontal = source_width / source_height > target
+    crop_length = round(source_height * target) if horizontal else round(source_width / target)
+    full_length = source_width if horizontal else source_height
+
+    # Edge energy per column (or row) of a small greyscale copy
+    small = image.convert("L")
+    small.thumbnail((_ENERGY_SIZE, _ENERGY_SIZE))
+    edges = small.filter(ImageFilter.FIND_EDGES)
+    small_width, small_height = edges.size
+    pixels = list(edges.getdata())
+    if horizontal:
+        profile = [sum(pixels[x::small_width]) for x in range(small_width)]
+    else:
+        profile = [sum(pixels[y * small_width:(y + 1) * small_width]) for y in range(small_height)]
+
+    scale = len(profile) / full_length
+    window = max(1, min(len(profile), round(crop_length * scale)))
+    prefix = [0]
+    for value in profile:
+        prefix.append(prefix[-1] + value)
+    total = prefix[-1] or 1
+    centre = (len(profile) - window) / 2
+
+    def score(start):
+        offset = abs(start - centre) / max(centre, 1)
+        return (prefix[start + window] - prefix[start]) / total - _CENTER_WEIGHT * offset
+
+    best = max(range(len(profile) - window + 1), key=score)
+    start = min(full_length - crop_length, round(best / scale))
+    if horizontal:
+        return start, 0, start + crop_length, source_height
+    return 0, start, source_width, start + crop_length
+
+
+def derive_variant(master_path, output_path, width, height, quality=95) -> dict:
+    """
+    Crop and resize a master image into one variant (written atomically)
+
+    Returns:
+        dict: How the variant was derived
+    """
+    from PIL import Image
+
+    output_path = Path(output_path)
+    with Image.open(master_path) as master:
+        master = master.convert("RGB")
+        box = smart_crop_box(master, width, height)
+        variant = master.crop(box).resize((width, height), Image.LANCZOS)
+        master_size = master.size
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = output_path.with_name(f".{output_path.name}.{threading.get_ident()}.tmp")
+    variant.save(temporary, format="JPEG", quality=quality)
+    os.replace(temporary, output_path)
+    return {
+        "master": str(master_path),
+        "master_sha256": source_digest(master_path),
+        "master_size": list(master_size),
+        "crop": list(box),
+        "size": [width, height],
+        "method": "edge-energy crop, Lanczos resize",
+    }
+
+
+def record_derivation(output_path, derivation):
+    """
+    Add a variant's derivation to derived_images.json in its directory
+    """
+    output_path = Path(output_path)
+    record_path = output_path.parent / DERIVATIONS_FILE
+    with _derivations_lock:
+        records = {}
+        if record_path.exists():
+            try:
+                with open(record_path, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+            except (OSError, ValueError):
+                records = {}
+        records[output_path.name] = derivation
+        write_artifact(record_path, json.dumps(records, indent=2))
+
+
+def derivation_of(image_path):
+    """
+    Recorded derivation of an image, or None if it was rendered directly
+    """
+    image_path = Path(image_path)
+    record_path = image_path.parent / DERIVATIONS_FILE
+    if not image_path.exists() or not record_path.exists():
+        return None
+    try:
+        with open(record_path, "r", encoding="utf-8") as f:
+            return json.load(f).get(image_path.name)
+    except (OSError, ValueError):
+        return None
+
+
+def current_derivation(image_path):
+    """
+    Recorded derivation of an image, or None if it was rendered directly or its
+    master has changed (or is gone) since it was derived
+    """
+    derivation = derivation_of(image_path)
+    if not derivation or not derivation.get("master_sha256"):
+        return None
+    try:
+        if source_digest(derivation["master"]) != derivation["master_sha256"]:
+            return None
+    except OSError:
+        return None
+    return derivation
+
+
+def output_variant_path(image_path, name, spec) -> Path:
+    """
+    Where the output variant called name of an image is written, e.g. image_1.jpg -> image_1_web.webp
+    """
+    image_path = Path(image_path)
+    extension = _OUTPUT_FORMATS[spec["format"].upper()][0]
+    return image_path.with_name(f"{image_path.stem}_{name}{extension}")
+
+
+def write_output_variants(image_path, outputs=None) -> List[Path]:
+    """
+    Write the configured copies of a finished image next to it (each atomically)
+
+    Every output spec has a "format" (JPEG, PNG, WEBP or AVIF), a "quality", a
+    "max_dimension" for the longest side (None keeps the size) and, for JPEG,
+    "progressive". Each output's source digest and spec are recorded with
+    record_derivation; an output recorded for the same image content and spec
+    is left alone. Formats this Pillow build cannot write are skipped.
+
+    Returns:
+        list: Paths of the outputs written
+    """
+    from PIL import Image, features
+
+    image_path = Path(image_path)
+    outputs = IMAGE_OUTPUT_VARIANTS if outputs is None else outputs
+    digest = source_digest(image_path)
+    pending = {}
+    for name, spec in outputs.items():
+        image_format = spec["format"].upper()
+        feature = _OUTPUT_FORMATS[image_format][1]
+        if feature and not features.check(feature):
+            log(f"⚠️ Pillow cannot write {image_format}, skipping {name} copies")
+            continue
+        target = output_variant_path(image_path, name, spec)
+        recorded = derivation_of(target) or {}
+        if recorded.get("source_sha256") != digest or recorded.get("spec") != spec:
+            pending[name] = (spec, image_format, target)
+    if not pending:
+        return []
+
+    written = []
+    with Image.open(image_path) as source:
+        source = source.convert("RGB")
+        for name, (spec, image_format, target) in pending.items():
+            image = source
+            limit = spec.get("max_dimension")
+            if limit and max(source.size) > limit:
+                image = source.copy()
+                image.thumbnail((limit, limit), Image.LANCZOS)
+            options = {"quality": spec.get("quality", 85)}
+            if image_format == "JPEG":
+                options.update(optimize=True, progressive=spec.get("progressive", False))
+            elif image_format == "PNG":
+                options = {"optimize": True}
+            temporary = target.with_name(f".{target.name}.{threading.get_ident()}.tmp")
+            image.save(temporary, format=image_format, **options)
+            os.replace(temporary, target)
+            record_derivation(target, {"source": str(image_path), "source_sha256": digest, "spec": spec})
+            written.append(target)
+    return written
+
+
+class ImagePostProcessor:
+    """
+    Worker pool that writes the output variants of each image as soon as it is
+    saved, so they are done while the remaining renders are still running
+
+    Pillow releases the GIL while resizing and encoding, so threads scale.
+    """
+
+    def __init__(self, workers=IMAGE_POSTPROCESS_WORKERS, outputs=None):
+        self.outputs = IMAGE_OUTPUT_VARIANTS if outputs is None else outputs
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-postprocess")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, image_path):
+        """
+        Queue the output variants of an image; returns a future of the paths written
+        """
+        future = self._pool.submit(self._process, Path(image_path))
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _process(self, image_path):
+        begin = time.monotonic()
+        written = write_output_variants(image_path, self.outputs)
+        if written:
+            log(f"🖼️ {len(written)} output variant(s) of {image_path.name} written "
+                f"({time.monotonic() - begin:.2f} seconds)")
+        return written
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def wait(self) -> bool:
+        """
+        Wait for every queued image. Returns True if all variants were written.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        if not pending:
+            return True
+        log(f"⏳ Waiting for output variants of {len(pending)} image(s)...")
+        wait(pending)
+        success = True
+        for future in pending:
+            if future.exception() is not None:
+                log(f"❌ Could not post-process an image: {future.exception()}")
+                success = False
+        return success
+
+
+_postprocessor: Optional[ImagePostProcessor] = None
+_postprocessor_lock = threading.Lock()
+
+
+def get_image_postprocessor() -> ImagePostProcessor:
+    """
+    Process-wide post-processing pool
+    """
+    global _postprocessor
+    with _postprocessor_lock:
+        if _postprocessor is None:
+            _postprocessor = ImagePostProcessor()
+        return _postprocessor
+
+
+def postprocess_image(image_path):
+    """
+    Queue a finished image for its output variants, if post-processing is switched on
+    """
+    if IMAGE_POSTPROCESS:
+        get_image_postprocessor().submit(image_path)
+
+
+def wait_for_postprocessing() -> bool:
+    """
+    Wait for queued post-processing (True right away when it is switched off)
+    """
+    if not IMAGE_POSTPROCESS or _postprocessor is None:
+        return True
+    return _postprocessor.wait()
@@ -0,0 +1,261 @@
+# utils/job_journal.py
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from config.settings import JOB_JOURNAL_PATH, JOB_JOURNAL_MAX_AGE
+from utils.asset_store import _DELIVERY_FIELDS
+from utils.wavespeed_client import WaveSpeedError, WaveSpeedTimeout
+from utils.event_log import log
+
+OUTSTANDING = ("submitted", "uncertain")
+
+
+def job_hash(model, payload) -> str:
+    """
+    Prompt hash of a submission: endpoint plus everything in the payload that affects the render
+    """
+    fields = {k: v for k, v in payload.items() if k not in _DELIVERY_FIELDS}
+    return hashlib.sha256(json.dumps([model, fields], sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+class JobJournal:
+    """
+    Append-only record of WaveSpeed submissions (JSON lines)
+
+    Every submission is written before and after the submit request, and every
+    final state when it is seen, so a restarted process knows which paid jobs
+    exist. submit() reuses a journaled job with the same prompt hash instead of
+    paying for a new one, unless the same hash is being waited on in this
+    process already (a deliberate duplicate, e.g. a hedged request). Completed
+    jobs are only reused for seeded requests.
+
+    Entries: {"hash", "model", "request_id", "status", "output", "error", "label",
+    "payload", "target", "at"} with status "submitting", "submitted", "uncertain"
+    (the submit request timed out and may have created a job), "completed" or
+    "failed". target is the file the job's output is delivered to, so a job
+    picked up by a later run is delivered the same way (see register_completion).
+    """
+
+    def __init__(self, path=JOB_JOURNAL_PATH, max_age=JOB_JOURNAL_MAX_AGE):
+        self.path = Path(path) if path else None
+        self.max_age = max_age
+        self.resumed = set()  # Request IDs reused instead of resubmitted
+        self._latest = {}  # hash -> latest entry
+        self._by_request = {}  # request ID -> hash
+        self._active = {}  # hash -> waiters in this process
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return
+        lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        continue  # Torn last line of a crashed run
+        except OSError as e:
+            log(f"⚠️ Could not read job journal {self.path}: {e}")
+            return
+        self._compact(lines)
+
+    def _compact(self, lines):
+        # Keep only the latest, still relevant entry per hash once the file is mostly history
+        now = time.time()
+        self._latest = {h: entry for h, entry in self._latest.items() if now - entry["at"] <= self.max_age}
+        self._by_request = {entry["request_id"]: h for h, entry in self._latest.items() if entry.get("request_id")}
+        if lines <= 2 * len(self._latest) + 100:
+            return
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            for entry in self._latest.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(temporary, self.path)
+
+    def _apply(self, entry):
+        # A status update without a request ID belongs to the job already on record
+        previous = self._latest.get(entry["hash"], {})
+        for field in ("request_id", "payload", "target"):
+            if field not in entry:
+                entry[field] = previous.get(field)
+        self._latest[entry["hash"]] = entry
+        if entry.get("request_id"):
+            self._by_request[entry["request_id"]] = entry["hash"]
+
+    def _append(self, **entry):
+        entry["at"] = time.time()
+        with self._lock:
+            self._apply(entry)
+            if not self.path:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                log(f"⚠️ Could not write job journal {self.path}: {e}")
+
+    def outstanding(self):
+        """
+        Journaled jobs that were submitted but never seen to finish
+        """
+        with self._lock:
+            return [dict(entry) for entry in self._latest.values()
+                    if entry["status"] in OUTSTANDING and entry.get("request_id")]
+
+    def _reusable(self, client, entry) -> Optional[str]:
+        # A journaled job is reused if WaveSpeed still knows it and it has not failed
+        request_id = entry.get("request_id")
+        if not request_id or time.time() - entry["at"] > self.max_age:
+            return None
+        try:
+            status = client.poll(request_id).get("status")
+        except WaveSpeedError:
+            return None
+        return request_id if status != "failed" else None
+
+    def submit(self, client, model, payload, webhook=None, label=None, target=None) -> str:
+        """
+        Submit a job, or resume the journaled job with the same prompt hash
+
+        Call release(request_id) once the caller stops waiting for the job.
+
+        Args:
+            target (Path): File the output is delivered to, for resume_outstanding_jobs
+
+        Returns:
+            str: The prediction request ID
+        """
+        digest = job_hash(model, payload)
+        with self._lock:
+            entry = dict(self._latest.get(digest) or {})
+            duplicate = self._active.get(digest, 0) > 0
+            self._active[digest] = self._active.get(digest, 0) + 1
+
+        try:
+            if entry and not duplicate:
+                if entry["status"] in ("submitting", "uncertain") and not entry.get("request_id"):
+                    # The submit request timed out or the process died during it:
+                    # look for the job it may have created
+                    found = client.find_prediction(model, payload.get("prompt"), since=entry["at"] - 60)
+                    if found:
+                        self._append(hash=digest, model=model, request_id=found, status="submitted", label=label)
+                        entry = dict(self._latest[digest])
+                # A random-seed request is meant to be a new render: a finished job is never
+                # handed out again for it (see asset_key), only one that was never delivered
+                reusable = OUTSTANDING if payload.get("seed", -1) == -1 else OUTSTANDING + ("completed",)
+                if entry["status"] in reusable:
+                    request_id = self._reusable(client, entry)
+                    if request_id:
+                        self.resumed.add(request_id)
+                        log(f"🔁 Resuming journaled job {request_id} ({entry['status']}) instead of resubmitting")
+                        return request_id
+
+            self._append(hash=digest, model=model, request_id=None, status="submitting", label=label,
+                         payload=payload, target=str(target) if target else None)
+            try:
+                request_id = client.submit(model, payload, webhook=webhook)
+            except WaveSpeedTimeout:
+                self._append(hash=digest, model=model, status="uncertain", label=label)
+                raise
+            self._append(hash=digest, model=model, request_id=request_id, status="submitted", label=label)
+            return request_id
+        except Exception:
+            self._release_hash(digest)
+            raise
+
+    def release(self, request_id):
+        with self._lock:
+            digest = self._by_request.get(request_id)
+        if digest:
+            self._release_hash(digest)
+
+    def _release_hash(self, digest):
+        with self._lock:
+            count = self._active.get(digest, 0) - 1
+            if count > 0:
+                self._active[digest] = count
+            else:
+                self._active.pop(digest, None)
+
+    def finished(self, request_id, status, output=None, error=None):
+        """
+        Record a final state seen for a job ("completed" or "failed")
+        """
+        with self._lock:
+            digest = self._by_request.get(request_id)
+            entry = self._latest.get(digest) if digest else None
+            if entry is None or (entry["status"] == status and entry.get("request_id") == request_id):
+                return
+        self._append(hash=digest, model=entry["model"], request_id=request_id, status=status,
+                     output=output, error=error, label=entry.get("label"))
+
+
+_completions = {}
+
+
+def register_completion(model, complete):
+    """
+    Deliver jobs of an endpoint picked up from the journal with complete(entry, output_url),
+    the same way the generator that submitted them would
+    """
+    _completions[model] = complete
+
+
+def complete_journaled(entry, output_url):
+    """
+    Deliver a journaled job's output to the target it was submitted for
+    """
+    complete = _completions.get(entry["model"])
+    if complete is None or not entry.get("target") or entry.get("payload") is None:
+        log(f"⚠️ {entry.get('label') or entry['request_id']}: no delivery journaled, output left at {output_url}")
+        return output_url
+    return complete(entry, output_url)
+
+
+def resume_outstanding_jobs():
+    """
+    Poll jobs left outstanding by an earlier run to completion in the background
+
+    Returns:
+        int: Number of jobs picked up
+    """
+    from utils.render_queue import get_render_queue
+
+    journal = get_job_journal()
+    jobs = journal.outstanding()
+    if not jobs:
+        return 0
+    queue = get_render_queue()
+    log(f"🔁 Picking up {len(jobs)} WaveSpeed job(s) left outstanding by an earlier run")
+    for entry in jobs:
+        kind = "video" if "t2v" in entry["model"] else "image"
+        queue.adopt(entry["request_id"], label=entry.get("label") or f"Journaled job {entry['request_id']}",
+                    on_complete=lambda output_url, entry=entry: complete_journaled(entry, output_url), kind=kind)
+    return len(jobs)
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_job_journal() -> JobJournal:
+    """
+    Process-wide job journal
+    """
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = JobJournal()
+        return _journal
@@ -0,0 +1,106 @@
+# utils/latency.py
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from config.settings import LATENCY_FLUSH_INTERVAL
+from utils.event_log import log
+
+# One lock per history file, shared by every namespace written to it
+_file_locks = {}
+_file_locks_lock = threading.Lock()
+
+
+def _file_lock(path) -> threading.Lock:
+    with _file_locks_lock:
+        return _file_locks.setdefault(str(Path(path).resolve()), threading.Lock())
+
+
+def percentile(values, fraction) -> float:
+    """
+    Nearest-rank percentile of a list of numbers (fraction between 0 and 1)
+    """
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LatencyHistory:
+    """
+    Recent latencies per key, persisted to a JSON file shared by namespace
+    ({namespace: {key: [seconds, ...]}})
+
+    Changes are written at most every flush_interval seconds and at exit, under
+    a process-wide lock per file, by replacing the file with a complete new copy.
+    """
+
+    def __init__(self, namespace, path, size, flush_interval=LATENCY_FLUSH_INTERVAL):
+        self.namespace = namespace
+        self.path = Path(path) if path else None
+        self.size = size
+        self.flush_interval = flush_interval
+        self._values = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._load()
+        if self.path:
+            atexit.register(self.flush)
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f).get(self.namespace, {})
+            for key, values in saved.items():
+                self._values[key] = deque(values, maxlen=self.size)
+        except (OSError, ValueError) as e:
+            log(f"⚠️ Could not load latency history {self.path}: {e}")
+
+    def flush(self):
+        """
+        Write this namespace's latencies if they changed, keeping the file's other namespaces
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            values = {key: list(values) for key, values in self._values.items()}
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        with _file_lock(self.path):
+            try:
+                saved = {}
+                if self.path.exists():
+                    try:
+                        with open(self.path, "r", encoding="utf-8") as f:
+                            saved = json.load(f)
+                    except ValueError:
+                        saved = {}  # Unreadable: start over rather than lose this namespace too
+                saved[self.namespace] = values
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temporary = self.path.with_name(f".{self.path.name}.{threading.get_ident()}.tmp")
+                with open(temporary, "w", encoding="utf-8") as f:
+                    json.dump(saved, f)
+                os.replace(temporary, self.path)
+            except OSError as e:
+                log(f"⚠️ Could not save latency history {self.path}: {e}")
+
+    def record(self, key, seconds):
+        with self._lock:
+            values = self._values.setdefault(key, deque(maxlen=self.size))
+            values.append(round(seconds, 3))
+            self._dirty = True
+            due = time.monotonic() - self._saved_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def get(self, key) -> list:
+        with self._lock:
+            return list(self._values.get(key, ()))
@@ -0,0 +1,243 @@
+# utils/llm_metrics.py
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from config.settings import LLM_METRICS_DB_PATH, OPENAI_PRICING
+from utils.event_log import log
+
+# One batch per process; every name processed in it gets its own run ID
+BATCH_ID = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    batch_id TEXT NOT NULL,
+    run_id TEXT,
+    name TEXT,
+    stage TEXT,
+    task TEXT,
+    model TEXT,
+    prompt_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
+    cached_tokens INTEGER DEFAULT 0,
+    latency_s REAL,
+    attempts INTEGER DEFAULT 1,
+    cost_usd REAL DEFAULT 0,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_batch ON llm_calls (batch_id);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_run ON llm_calls (run_id);
+"""
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens=0) -> float:
+    """
+    Estimate the USD cost of a call from the per-million-token price table
+    """
+    prices = OPENAI_PRICING.get(model)
+    if not prices:
+        return 0.0
+    uncached = max(0, prompt_tokens - cached_tokens)
+    cost = (uncached * prices["prompt"]
+            + cached_tokens * prices.get("cached", prices["prompt"])
+            + completion_tokens * prices["completion"])
+    return cost / 1_000_000
+
+
+class LLMMetricsStore:
+    """
+    Local SQLite store for per-call token, latency and cost records
+    """
+
+    def __init__(self, db_path=LLM_METRICS_DB_PATH):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._runs = {}
+
+    def _connection(self):
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(llm_calls)")}
+            if "task" not in columns:
+                # Databases created before model routing have no task column
+                self._conn.execute("ALTER TABLE llm_calls ADD COLUMN task TEXT")
+        return self._conn
+
+    def begin_run(self, name) -> str:
+        """
+        Start a new run for a name; later calls tagged with that name belong to it
+        """
+        run_id = f"{BATCH_ID}:{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            self._runs[name] = run_id
+        return run_id
+
+    def run_id_for(self, name) -> Optional[str]:
+        return self._runs.get(name)
+
+    def record(self, *, name, stage, model, latency_s, task=None, attempts=1, usage=None, status="ok"):
+        """
+        Record one LLM call. usage is the OpenAI usage object (or dict)
+        """
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        cost = estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT INTO llm_calls (ts, batch_id, run_id, name, stage, task, model, prompt_tokens, "
+                    "completion_tokens, cached_tokens, latency_s, attempts, cost_usd, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (time.time(), BATCH_ID, self._runs.get(name), name, stage, task, model, prompt_tokens,
+                     completion_tokens, cached_tokens, latency_s, attempts, cost, status),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            # Metrics must never break generation
+            log(f"⚠️ Could not record LLM metrics: {e}")
+
+    def summarize(self, batch_id=None, run_id=None) -> dict:
+        """
+        Aggregate calls for a batch or a single run, broken down by stage
+        """
+        if run_id:
+            where, params = "run_id = ?", (run_id,)
+        else:
+            where, params = "batch_id = ?", (batch_id or BATCH_ID,)
+
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(
+                f"SELECT COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(cached_tokens), "
+                f"SUM(latency_s), SUM(cost_usd), SUM(status NOT IN ('ok', 'batch', 'hedge')), SUM(attempts - 1), "
+                f"COUNT(DISTINCT name) FROM llm_calls WHERE {where}",
+                params,
+            ).fetchone()
+            stages = conn.execute(
+                f"SELECT stage, model, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), "
+                f"SUM(cached_tokens), AVG(latency_s), MAX(latency_s), SUM(cost_usd) "
+                f"FROM llm_calls WHERE {where} GROUP BY stage, model ORDER BY SUM(latency_s) DESC",
+                params,
+            ).fetchall()
+            routes = conn.execute(
+                f"SELECT task, model, COUNT(*), SUM(prompt_tokens + completion_tokens), AVG(latency_s), "
+                f"MAX(latency_s), SUM(cost_usd) FROM llm_calls WHERE {where} "
+                f"GROUP BY task, model ORDER BY SUM(cost_usd) DESC",
+                params,
+            ).fetchall()
+
+        return {
+            "batch_id": batch_id or (None if run_id else BATCH_ID),
+            "run_id": run_id,
+            "calls": total[0] or 0,
+            "prompt_tokens": total[1] or 0,
+            "completion_tokens": total[2] or 0,
+            "cached_tokens": total[3] or 0,
+            "latency_s": total[4] or 0.0,
+            "cost_usd": total[5] or 0.0,
+            "failures": total[6] or 0,
+            "retries": total[7] or 0,
+            "names": total[8] or 0,
+            "stages": [
+                {
+                    "stage": row[0], "model": row[1], "calls": row[2],
+                    "prompt_tokens": row[3] or 0, "completion_tokens": row[4] or 0,
+                    "cached_tokens": row[5] or 0, "avg_latency_s": row[6] or 0.0,
+                    "max_latency_s": row[7] or 0.0, "cost_usd": row[8] or 0.0,
+                }
+                for row in stages
+            ],
+            "routes": [
+                {
+                    "task": row[0], "model": row[1], "calls": row[2], "tokens": row[3] or 0,
+                    "avg_latency_s": row[4] or 0.0, "max_latency_s": row[5] or 0.0,
+                    "cost_usd": row[6] or 0.0,
+                }
+                for row in routes
+            ],
+        }
+
+
+def format_report(summary) -> str:
+    """
+    Render a summary from LLMMetricsStore.summarize() as a plain-text table
+    """
+    scope = f"run {summary['run_id']}" if summary["run_id"] else f"batch {summary['batch_id']}"
+    lines = [
+        f"LLM usage report for {scope}",
+        "=" * 60,
+        f"Names: {summary['names']}  Calls: {summary['calls']}  "
+        f"Failures: {summary['failures']}  Retries: {summary['retries']}",
+        f"Tokens: {summary['prompt_tokens']} prompt ({summary['cached_tokens']} cached), "
+        f"{summary['completion_tokens']} completion",
+        f"LLM time: {summary['latency_s']:.1f}s  Estimated cost: ${summary['cost_usd']:.4f}",
+        "",
+        f"{'stage':<28}{'model':<16}{'calls':>6}{'prompt':>9}{'compl':>8}{'avg s':>8}{'max s':>8}{'cost $':>10}",
+    ]
+    for stage in summary["stages"]:
+        lines.append(
+            f"{(stage['stage'] or '-'):<28}{(stage['model'] or '-'):<16}{stage['calls']:>6}"
+            f"{stage['prompt_tokens']:>9}{stage['completion_tokens']:>8}"
+            f"{stage['avg_latency_s']:>8.2f}{stage['max_latency_s']:>8.2f}{stage['cost_usd']:>10.4f}"
+        )
+    lines += ["", f"{'route':<28}{'model':<16}{'calls':>6}{'tokens':>9}{'avg s':>8}{'max s':>8}{'cost $':>10}"]
+    for route in summary["routes"]:
+        lines.append(
+            f"{(route['task'] or '-'):<28}{(route['model'] or '-'):<16}{route['calls']:>6}"
+            f"{route['tokens']:>9}{route['avg_latency_s']:>8.2f}{route['max_latency_s']:>8.2f}"
+            f"{route['cost_usd']:>10.4f}"
+        )
+    return "\n".join(lines)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_metrics_store() -> LLMMetricsStore:
+    """
+    Return the process-wide metrics store
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LLMMetricsStore()
+        return _store
+
+
+def main():
+    """Print the report for a batch (latest by default) or a single run"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarise recorded LLM calls")
+    parser.add_argument("--batch", help="Batch ID (defaults to the most recent batch)")
+    parser.add_argument("--run", help="Run ID of a single name")
+    args = parser.parse_args()
+
+    store = get_metrics_store()
+    batch_id = args.batch
+    if not batch_id and not args.run:
+        row = store._connection().execute(
+            "SELECT batch_id FROM llm_calls ORDER BY ts DESC LIMIT 1"
+        ).fetchone()
+        if not row:
+            print("No LLM calls recorded yet.")
+            return
+        batch_id = row[0]
+    print(format_report(store.summarize(batch_id=batch_id, run_id=args.run)))
+
+
+if __name__ == "__main__":
+    main()
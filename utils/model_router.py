@@ -0,0 +1,119 @@
+# utils/model_router.py
+import threading
+import time
+
+import openai
+
+from config.settings import (
+    MODEL_ROUTES,
+    DEFAULT_MODEL_ROUTE,
+    LLM_BACKEND,
+    OPENAI_REQUEST_TIMEOUT,
+)
+
+
+def resolve_route(task) -> dict:
+    """
+    Return the model profile for a generation task: model, max_tokens, temperature and backend.
+    Unknown or missing tasks fall back to DEFAULT_MODEL_ROUTE.
+    """
+    route = dict(DEFAULT_MODEL_ROUTE)
+    route.update(MODEL_ROUTES.get(task, {}))
+    route.setdefault("backend", "openai")
+    if LLM_BACKEND:
+        route["backend"] = LLM_BACKEND
+    return route
+
+
+def route_request_body(request) -> dict:
+    """
+    Turn a generator request ({"task", "messages"}) into a complete chat completions body
+    """
+    route = resolve_route(request.get("task"))
+    return {
+        "model": route["model"],
+        "messages": request["messages"],
+        "temperature": route["temperature"],
+        "max_tokens": route["max_tokens"],
+    }
+
+
+class OpenAIBackend:
+    """
+    Chat completions through the OpenAI API
+    """
+
+    def complete(self, model, messages, temperature, max_tokens, task=None, **kwargs):
+        response = openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            request_timeout=OPENAI_REQUEST_TIMEOUT,
+            **kwargs
+        )
+        return response.choices[0].message.content, response.get("usage") or {}
+
+
+def stub_response(task, messages) -> str:
+    """
+    Deterministic placeholder output for a task, shaped like the real model output
+    """
+    if task == "short_package":
+        return ("[SCRIPT]\nStub script.\n\n[DESCRIPTION]\nStub description.\n\n"
+                "[IMAGE_PROMPT_1]\nA quiet library at dawn, soft window light falling across "
+                "open books and brass instruments.\n\n"
+                "[VIDEO_PROMPT]\nA slow pan across a cluttered workshop bench, sparks drifting "
+                "through warm amber light.\n\n"
+                "[IMAGE_PROMPT_2]\nA sunlit observatory dome under a clear evening sky, "
+                "telescope pointed toward the first stars.")
+    if task == "script":
+        return "\n\n".join(f"[SECTION {i}]\nStub section {i}." for i in range(1, 15))
+    if task in ("image_prompt", "visual_prompt", "video_prompt", "thumbnail", "prompt_repair", "prompt_diversify"):
+        return "A cinematic wide shot of a candle-lit study with scattered manuscripts, warm light."
+    return f"Stub {task or 'chat'} response."
+
+
+class StubBackend:
+    """
+    Local backend for tests: no network, optional simulated latency.
+    The responder receives (task, messages) and returns the message content.
+    """
+
+    def __init__(self, responder=None, latency=0.0):
+        self.responder = responder or stub_response
+        self.latency = latency
+        self.calls = []
+
+    def complete(self, model, messages, temperature, max_tokens, task=None, **kwargs):
+        self.calls.append({"task": task, "model": model, "max_tokens": max_tokens})
+        if self.latency:
+            time.sleep(self.latency)
+        content = self.responder(task, messages)
+        prompt_tokens = sum(len(message.get("content") or "") for message in messages) // 4
+        completion_tokens = len(content) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return content, usage
+
+
+_backends = {"openai": OpenAIBackend(), "stub": StubBackend()}
+_backends_lock = threading.Lock()
+
+
+def register_backend(name, backend):
+    """
+    Register (or replace) a backend that routes can refer to by name
+    """
+    with _backends_lock:
+        _backends[name] = backend
+
+
+def get_backend(name):
+    with _backends_lock:
+        if name not in _backends:
+            raise KeyError(f"Unknown LLM backend: {name}")
+        return _backends[name]
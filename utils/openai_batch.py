@@ -0,0 +1,318 @@
+# utils/openai_batch.py
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Optional
+
+import requests
+from dotenv import load_dotenv
+
+from config.settings import BATCH_DIR, BATCH_COMPLETION_WINDOW
+from utils.llm_metrics import get_metrics_store
+from utils.model_router import route_request_body, stub_response
+from utils.event_log import log
+from generators.youtube_post_generator import build_caption_request
+from generators.short_video_generator import build_short_package_request
+from generators.long_video_generator import (
+    build_script_request,
+    build_thumbnail_request,
+    build_description_request,
+)
+
+OPENAI_API_BASE = "https://api.openai.com/v1"
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+
+# Requests that only need the source text; they go into the first batch.
+# The description needs the script, so it is sent in a follow-up batch.
+INITIAL_STAGES = {
+    "post_caption": build_caption_request,
+    "short_package": build_short_package_request,
+    "long_script": build_script_request,
+    "long_thumbnail_prompt": build_thumbnail_request,
+}
+FOLLOWUP_STAGES = ("long_description",)
+
+# Routing task behind each batch stage
+STAGE_TASKS = {
+    "post_caption": "caption",
+    "short_package": "short_package",
+    "long_script": "script",
+    "long_thumbnail_prompt": "thumbnail",
+    "long_description": "description",
+}
+
+
+def batch_custom_id(name, stage) -> str:
+    """
+    Stable custom ID for a (name, stage) pair, e.g. "Ada_Lovelace-3f2a9c1e--post_caption"
+
+    The slug keeps IDs readable; the short hash of the original name keeps
+    names that slug the same ("José" and "Jos") or to nothing (non-Latin
+    scripts) apart.
+    """
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_")[:48]
+    digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[:8]
+    return f"{slug}-{digest}--{stage}" if slug else f"{digest}--{stage}"
+
+
+def _request_line(name, stage, request):
+    return {
+        "custom_id": batch_custom_id(name, stage),
+        "method": "POST",
+        "url": CHAT_COMPLETIONS_URL,
+        "body": route_request_body(request),
+    }
+
+
+def _write_requests(lines, manifest, requests_path):
+    requests_path = Path(requests_path)
+    requests_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(requests_path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    with open(manifest_path_for(requests_path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return requests_path
+
+
+def manifest_path_for(requests_path) -> Path:
+    """
+    The manifest maps custom IDs back to names and stages
+    """
+    requests_path = Path(requests_path)
+    return requests_path.with_name(requests_path.stem + ".manifest.json")
+
+
+def write_batch_requests(names_and_texts, requests_path):
+    """
+    Write Batch API request lines for every name's text-only requests
+
+    Args:
+        names_and_texts (dict): {name: extracted PDF text}
+        requests_path (Path): JSONL file to write
+
+    Returns:
+        Path: The written requests file
+    """
+    lines = []
+    manifest = {}
+    for name, text in names_and_texts.items():
+        for stage, builder in INITIAL_STAGES.items():
+            line = _request_line(name, stage, builder(name, text))
+            lines.append(line)
+            manifest[line["custom_id"]] = {"name": name, "stage": stage}
+
+    path = _write_requests(lines, manifest, requests_path)
+    log(f"✅ Batch request file written: {path} ({len(lines)} requests for {len(names_and_texts)} names)")
+    return path
+
+
+class BatchResponseStore:
+    """
+    Responses ingested from Batch API result files, one JSON file per custom ID.
+    The OpenAI client serves matching (name, stage) calls from here instead of the API.
+    """
+
+    def __init__(self, directory=BATCH_DIR / "responses"):
+        self.directory = Path(directory)
+
+    def _path(self, custom_id):
+        return self.directory / f"{custom_id}.json"
+
+    def save(self, custom_id, name, stage, content, model=None, usage=None):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        record = {
+            "custom_id": custom_id,
+            "name": name,
+            "stage": stage,
+            "model": model,
+            "content": content,
+            "usage": usage or {},
+        }
+        with open(self._path(custom_id), "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+
+    def lookup(self, name, stage) -> Optional[str]:
+        """
+        Return the ingested content for a name and stage, or None
+        """
+        path = self._path(batch_custom_id(name, stage))
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["content"]
+
+
+def ingest_batch_results(results_path, requests_path, store=None, texts=None, followup_path=None):
+    """
+    Read a Batch API results file and store each successful response
+
+    Args:
+        results_path (Path): Batch output JSONL
+        requests_path (Path): The request file the results belong to (for its manifest)
+        store (BatchResponseStore): Where to keep responses
+        texts (dict): {name: text}; when given, description requests for names whose
+            script arrived are written to followup_path
+        followup_path (Path): Follow-up requests file
+
+    Returns:
+        list: Names that have at least one stored response
+    """
+    store = store or BatchResponseStore()
+    with open(manifest_path_for(requests_path), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    metrics = get_metrics_store()
+    names = []
+    failed = 0
+    with open(results_path, "r", encoding="utf-8") as f:
+        for raw_line in f:
+            if not raw_line.strip():
+                continue
+            line = json.loads(raw_line)
+            entry = manifest.get(line.get("custom_id"))
+            if not entry:
+                log(f"⚠️ Unknown custom ID in batch results: {line.get('custom_id')}")
+                continue
+
+            response = line.get("response") or {}
+            body = response.get("body") or {}
+            if line.get("error") or response.get("status_code") != 200:
+                failed += 1
+                log(f"❌ Batch request failed: {line['custom_id']} {line.get('error') or body.get('error')}")
+                continue
+
+            content = body["choices"][0]["message"]["content"]
+            store.save(line["custom_id"], entry["name"], entry["stage"], content,
+                       model=body.get("model"), usage=body.get("usage"))
+            metrics.record(name=entry["name"], stage=entry["stage"], task=STAGE_TASKS.get(entry["stage"]),
+                           model=body.get("model"), latency_s=None, usage=body.get("usage"), status="batch")
+            if entry["name"] not in names:
+                names.append(entry["name"])
+
+    log(f"✅ Ingested batch results for {len(names)} names ({failed} failed requests)")
+
+    if texts and followup_path:
+        write_followup_requests(names, texts, store, followup_path)
+    return names
+
+
+def write_followup_requests(names, texts, store, followup_path):
+    """
+    Write description requests for names whose script has been ingested
+    """
+    lines = []
+    manifest = {}
+    for name in names:
+        script_content = store.lookup(name, "long_script")
+        if script_content is None or store.lookup(name, "long_description") is not None:
+            continue
+        line = _request_line(name, "long_description",
+                             build_description_request(name, texts[name], script_content.strip()))
+        lines.append(line)
+        manifest[line["custom_id"]] = {"name": name, "stage": "long_description"}
+
+    if not lines:
+        return None
+    path = _write_requests(lines, manifest, followup_path)
+    log(f"✅ Follow-up batch request file written: {path} ({len(lines)} requests)")
+    return path
+
+
+def _api_headers():
+    load_dotenv()
+    return {"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+
+
+def submit_batch(requests_path) -> str:
+    """
+    Upload a request file and create a Batch API job. Returns the batch ID.
+    """
+    with open(requests_path, "rb") as f:
+        upload = requests.post(f"{OPENAI_API_BASE}/files", headers=_api_headers(),
+                               data={"purpose": "batch"}, files={"file": f}, timeout=300)
+    upload.raise_for_status()
+
+    response = requests.post(
+        f"{OPENAI_API_BASE}/batches",
+        headers=_api_headers(),
+        json={
+            "input_file_id": upload.json()["id"],
+            "endpoint": CHAT_COMPLETIONS_URL,
+            "completion_window": BATCH_COMPLETION_WINDOW,
+        },
+        timeout=60,
+    )
+    response.raise_for_status()
+    batch_id = response.json()["id"]
+    log(f"✅ Batch submitted: {batch_id}")
+    return batch_id
+
+
+def download_batch_results(batch_id, results_path) -> bool:
+    """
+    Download the output file of a finished batch. Returns False while it is still running.
+    """
+    response = requests.get(f"{OPENAI_API_BASE}/batches/{batch_id}", headers=_api_headers(), timeout=60)
+    response.raise_for_status()
+    batch = response.json()
+    if batch["status"] != "completed":
+        log(f"⏳ Batch {batch_id} status: {batch['status']}")
+        return False
+
+    content = requests.get(f"{OPENAI_API_BASE}/files/{batch['output_file_id']}/content",
+                           headers=_api_headers(), timeout=300)
+    content.raise_for_status()
+    Path(results_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(results_path, "wb") as f:
+        f.write(content.content)
+    log(f"✅ Batch results downloaded: {results_path}")
+    return True
+
+
+class LocalBatchRunner:
+    """
+    Local stand-in for the Batch API: turns a request file into a results file.
+    The responder receives (custom_id, body) and returns the message content.
+    """
+
+    def __init__(self, responder=None):
+        self.responder = responder or self.default_response
+
+    @staticmethod
+    def default_response(custom_id, body):
+        stage = custom_id.split("--", 1)[1]
+        return stub_response(STAGE_TASKS.get(stage), body["messages"])
+
+    def run(self, requests_path, results_path):
+        results_path = Path(results_path)
+        results_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(requests_path, "r", encoding="utf-8") as src, \
+                open(results_path, "w", encoding="utf-8") as dst:
+            for index, raw_line in enumerate(src):
+                if not raw_line.strip():
+                    continue
+                request = json.loads(raw_line)
+                content = self.responder(request["custom_id"], request["body"])
+                result = {
+                    "id": f"batch_req_local_{index}",
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "request_id": f"local-{index}",
+                        "body": {
+                            "object": "chat.completion",
+                            "created": int(time.time()),
+                            "model": request["body"]["model"],
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": content}}],
+                            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                        },
+                    },
+                    "error": None,
+                }
+                dst.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return results_path
@@ -0,0 +1,362 @@
+# utils/openai_client.py
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import openai
+
+from config.settings import (
+    OPENAI_MAX_RETRIES,
+    OPENAI_BACKOFF_BASE,
+    OPENAI_BACKOFF_MAX,
+    OPENAI_TPM_LIMIT,
+    OPENAI_TPM_HEADROOM,
+    OPENAI_INITIAL_CONCURRENCY,
+    OPENAI_MAX_CONCURRENCY,
+)
+from utils.llm_metrics import get_metrics_store
+from utils.model_router import resolve_route, get_backend
+from utils.hedging import get_hedge_policy
+from utils.event_log import log
+from utils.prometheus_metrics import API_CALLS, API_RETRIES, API_SECONDS, FAILURES
+
+# Errors that are worth retrying: throttling, overload and transport problems.
+# Anything else (bad request, auth, permission) fails immediately.
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value) -> Optional[float]:
+    """
+    Parse OpenAI reset durations such as "1s", "6m0s" or "250ms" into seconds
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_int(headers, name) -> Optional[int]:
+    # Rate limit headers are plain integers, but a proxy may mangle or drop them
+    try:
+        return int(float(str(headers.get(name)).strip()))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def estimate_request_tokens(messages, max_tokens) -> int:
+    """
+    Rough token estimate for a chat request (~4 characters per token).
+    OpenAI counts max_tokens against the TPM budget, so it is included.
+    """
+    characters = sum(len(message.get("content") or "") for message in messages)
+    return characters // 4 + (max_tokens or 0)
+
+
+class Reservation:
+    """
+    A request slot and its share of the TPM budget, held until release()
+    """
+
+    def __init__(self, limiter, tokens):
+        self.limiter = limiter
+        self.entry = [time.monotonic(), tokens]  # In the limiter's token window
+        self.released = False
+
+    def release(self, used_tokens=None, throttled=False):
+        self.limiter.release(self, used_tokens=used_tokens, throttled=throttled)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limiter for in-flight OpenAI requests.
+
+    The concurrency limit grows by roughly one slot per round of successful
+    requests and is halved whenever the API throttles us. A sliding one-minute
+    token window keeps the reserved tokens under the TPM budget.
+    """
+
+    def __init__(self, initial=OPENAI_INITIAL_CONCURRENCY, maximum=OPENAI_MAX_CONCURRENCY,
+                 tpm_limit=OPENAI_TPM_LIMIT, headroom=OPENAI_TPM_HEADROOM):
+        self._cond = threading.Condition()
+        self._limit = float(max(1, initial))
+        self._maximum = max(1, maximum)
+        self._in_flight = 0
+        self._token_budget = int(tpm_limit * headroom) if tpm_limit else None
+        self._window = deque()  # (timestamp, tokens) reservations in the last 60 s
+        self._paused_until = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _window_tokens(self, now):
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+        return sum(tokens for _, tokens in self._window)
+
+    def acquire(self, tokens, block=True) -> Optional[Reservation]:
+        """
+        Block until a slot and enough of the TPM budget are free.
+        Returns a reservation to hand back to release(); with block=False,
+        None if there is no room right now.
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = None
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._in_flight >= self.limit:
+                    wait = 1.0
+                elif self._token_budget:
+                    # An empty window always admits one request, so an oversized one cannot wait forever
+                    used = self._window_tokens(now)
+                    if self._window and used + tokens > self._token_budget:
+                        wait = max(0.05, 60 - (now - self._window[0][0]))
+                if wait is None:
+                    break
+                if not block:
+                    return None
+                self._cond.wait(timeout=wait)
+
+            reservation = Reservation(self, tokens)
+            self._window.append(reservation.entry)
+            self._in_flight += 1
+            return reservation
+
+    def release(self, reservation, used_tokens=None, throttled=False):
+        """
+        Return a slot. Additive increase on success, multiplicative decrease on throttling.
+        """
+        with self._cond:
+            if reservation.released:
+                return
+            reservation.released = True
+            self._in_flight = max(0, self._in_flight - 1)
+            if used_tokens is not None:
+                reservation.entry[1] = used_tokens
+            if throttled:
+                self._limit = max(1.0, self._limit / 2)
+            else:
+                self._limit = min(float(self._maximum), self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+
+    def observe_headers(self, headers, decrease=True):
+        """
+        Use x-ratelimit-* headers to back off before the API starts rejecting requests
+
+        With decrease=False only the pauses are applied, for a response whose
+        throttling already halved the limit in release().
+        """
+        if not headers:
+            return
+        remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+        reset_tokens = parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+        reset_requests = parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+
+        with self._cond:
+            exhausted = False
+            if remaining_requests is not None and remaining_requests <= 0:
+                exhausted = True
+                if reset_requests:
+                    self._paused_until = max(self._paused_until, time.monotonic() + reset_requests)
+            if remaining_tokens is not None:
+                if self._token_budget and remaining_tokens < self._token_budget * 0.1:
+                    exhausted = True
+                if remaining_tokens <= 0 and reset_tokens:
+                    self._paused_until = max(self._paused_until, time.monotonic() + reset_tokens)
+            if exhausted and decrease:
+                self._limit = max(1.0, self._limit / 2)
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """
+        Hold back every new request for the given number of seconds (Retry-After)
+        """
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _retry_after(error) -> Optional[float]:
+    headers = getattr(error, "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    return parse_reset_duration(headers.get("retry-after"))
+
+
+def _is_retryable(error) -> bool:
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    if isinstance(error, openai.error.APIError):
+        status = getattr(error, "http_status", None)
+        return status is None or status >= 500
+    return False
+
+
+class OpenAIClient:
+    """
+    Shared OpenAI chat client with retries and adaptive concurrency.
+    All generator modules go through the module-level instance.
+    """
+
+    def __init__(self, max_retries=OPENAI_MAX_RETRIES, backoff_base=OPENAI_BACKOFF_BASE,
+                 backoff_max=OPENAI_BACKOFF_MAX, limiter=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+        self.prefilled_responses = None
+
+    def use_prefilled_responses(self, store):
+        """
+        Serve (name, stage) calls from a store of ingested batch responses when available
+        """
+        self.prefilled_responses = store
+
+    def _backoff(self, attempt, error):
+        """
+        Exponential backoff with full jitter, never shorter than Retry-After
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+            self.limiter.pause(retry_after)
+        return delay
+
+    def chat_completion(self, messages, task=None, model=None, temperature=None, max_tokens=None,
+                        name=None, stage=None, **kwargs):
+        """
+        Create a chat completion and return the message content.
+
+        The task selects a model profile from the routing table; explicit model,
+        temperature or max_tokens arguments override it. Every call is recorded in
+        the LLM metrics store, tagged by name, stage and task.
+
+        Raises:
+            openai.error.OpenAIError: When the request fails permanently or retries run out
+        """
+        if self.prefilled_responses is not None and name and stage:
+            content = self.prefilled_responses.lookup(name, stage)
+            if content is not None:
+                return content
+
+        route = resolve_route(task)
+        model = model or route["model"]
+        temperature = route["temperature"] if temperature is None else temperature
+        max_tokens = max_tokens or route["max_tokens"]
+        backend = get_backend(route["backend"])
+        hedging = get_hedge_policy("openai")
+
+        estimated_tokens = estimate_request_tokens(messages, max_tokens)
+        metrics = get_metrics_store()
+        started = time.monotonic()
+
+        # Every call, hedged duplicates included, holds its own limiter reservation. The
+        # primary's is taken before the hedge policy starts timing (so waiting for the
+        # limiter is not mistaken for latency), a duplicate's only if there is room
+        ready = queue.SimpleQueue()
+
+        def _hedge_slot():
+            reservation = self.limiter.acquire(estimated_tokens, block=False)
+            if reservation is not None:
+                ready.put(reservation)
+            return reservation
+
+        def _call(cancelled):
+            reservation = ready.get_nowait()
+            call_started = time.monotonic()
+            try:
+                content, usage = backend.complete(model, messages, temperature, max_tokens, task=task, **kwargs)
+            except Exception as e:
+                # A 429 halves the limit once, in release(); its headers only add pauses
+                throttled = isinstance(e, openai.error.RateLimitError)
+                self.limiter.release(reservation, throttled=throttled)
+                self.limiter.observe_headers(getattr(e, "headers", None), decrease=not throttled)
+                API_CALLS.inc(provider="openai", endpoint=model, outcome=type(e).__name__)
+                API_SECONDS.observe(time.monotonic() - call_started, provider="openai", endpoint=model)
+                raise
+            self.limiter.release(reservation, used_tokens=usage.get("total_tokens"))
+            API_CALLS.inc(provider="openai", endpoint=model, outcome="ok")
+            API_SECONDS.observe(time.monotonic() - call_started, provider="openai", endpoint=model)
+            return content, usage, time.monotonic() - call_started
+
+        def _discarded(result):
+            # The slower of a hedged pair was still billed: record its tokens and cost
+            _, usage, latency_s = result
+            metrics.record(name=name, stage=stage, task=task, model=model, latency_s=latency_s,
+                           usage=usage, status="hedge")
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                # A hedged duplicate cannot be interrupted; the slower answer is only metered
+                ready.put(self.limiter.acquire(estimated_tokens))
+                content, usage, _ = hedging.run(_call, key=task or "default", hedge_slot=_hedge_slot,
+                                                on_discarded=_discarded)
+            except Exception as e:
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    metrics.record(name=name, stage=stage, task=task, model=model, attempts=attempt + 1,
+                                   latency_s=time.monotonic() - started, status=type(e).__name__)
+                    FAILURES.inc(kind="llm")
+                    raise
+
+                API_RETRIES.inc(provider="openai")
+                delay = self._backoff(attempt, e)
+                log(f"⏳ OpenAI request failed ({type(e).__name__}), retrying in {delay:.1f}s "
+                    f"(attempt {attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+                continue
+
+            metrics.record(name=name, stage=stage, task=task, model=model, attempts=attempt + 1,
+                           latency_s=time.monotonic() - started, usage=usage)
+            return content
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client() -> OpenAIClient:
+    """
+    Return the process-wide OpenAI client
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenAIClient()
+        return _client
+
+
+def chat_completion(messages, task=None, name=None, stage=None, **kwargs):
+    """
+    Convenience wrapper around the shared client's chat_completion
+    """
+    return get_openai_client().chat_completion(messages, task=task, name=name, stage=stage, **kwargs)
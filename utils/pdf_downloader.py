@@ -5,6 +5,8 @@ from urllib.parse import quote
 import logging
 import time
 
+from utils.artifact_store import get_artifact_store
+
 class PDFDownloader:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -30,8 +32,8 @@ class PDFDownloader:
             response = requests.get(pdf_url, headers=self.headers, timeout=timeout)
             response.raise_for_status()
             
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+            # Written atomically, so a crash never leaves a truncated PDF that is reused later
+            get_artifact_store().write_bytes(output_path, response.content)
                 
             self.logger.info(f"✅ PDF downloaded successfully: {output_path}")
             return output_path
@@ -0,0 +1,128 @@
+# utils/poll_schedule.py
+import threading
+
+from config.settings import (
+    POLL_HISTORY_PATH,
+    POLL_HISTORY_SIZE,
+    POLL_MIN_SAMPLES,
+    POLL_START_PERCENTILE,
+    POLL_END_PERCENTILE,
+    POLL_DENSE_STEPS,
+    POLL_MIN_INTERVAL,
+    POLL_MAX_INTERVAL,
+    POLL_TIMEOUT_PERCENTILE,
+    POLL_TIMEOUT_MARGIN,
+    POLL_MIN_TIMEOUT,
+    WAVESPEED_IMAGE_TIMEOUT,
+    WAVESPEED_VIDEO_TIMEOUT,
+    WAVESPEED_COMPLETION_MODE,
+    WAVESPEED_WEBHOOK_FALLBACK,
+    EXPECTED_RENDER_SECONDS,
+)
+from utils.latency import LatencyHistory, percentile
+from utils.prometheus_metrics import RENDER_SECONDS
+
+
+def render_key(model, size, duration=None) -> str:
+    """
+    Timing key of a WaveSpeed job, e.g. "bytedance/seedream-v3:1280*720" or
+    "wavespeed-ai/wan-2.2/t2v-720p-ultra-fast:720*1280:5s"
+    """
+    key = f"{model}:{size}"
+    return f"{key}:{duration}s" if duration is not None else key
+
+
+class PollSchedule:
+    """
+    When to poll one job: wait until first_poll, poll every interval until
+    backoff_after, then at double the interval (capped), and give up at timeout.
+    All times are seconds since submit.
+    """
+
+    def __init__(self, first_poll, interval, backoff_after, timeout, learned=False):
+        self.first_poll = first_poll
+        self.interval = interval
+        self.backoff_after = backoff_after
+        self.timeout = timeout
+        self.learned = learned
+
+    def next_delay(self, elapsed) -> float:
+        """
+        Seconds from now until the next poll, given the time since submit
+        """
+        if elapsed < self.first_poll:
+            return self.first_poll - elapsed
+        if elapsed < self.backoff_after:
+            return self.interval
+        return min(self.interval * 2, POLL_MAX_INTERVAL)
+
+    def __repr__(self):
+        return (f"PollSchedule(first={self.first_poll:.2f}s, every={self.interval:.2f}s, "
+                f"backoff>{self.backoff_after:.1f}s, timeout={self.timeout:.0f}s, learned={self.learned})")
+
+
+# Fixed schedules used until an endpoint has enough history
+DEFAULT_SCHEDULES = {
+    "image": PollSchedule(first_poll=1.0, interval=1.0, backoff_after=30.0, timeout=WAVESPEED_IMAGE_TIMEOUT),
+    "video": PollSchedule(first_poll=2.0, interval=2.0, backoff_after=10.0, timeout=WAVESPEED_VIDEO_TIMEOUT),
+}
+
+
+class CompletionTimes:
+    """
+    Submit-to-complete durations of WaveSpeed jobs and the poll schedules learned from them
+    """
+
+    def __init__(self, path=POLL_HISTORY_PATH, size=POLL_HISTORY_SIZE, min_samples=POLL_MIN_SAMPLES,
+                 mode=WAVESPEED_COMPLETION_MODE, webhook_fallback=WAVESPEED_WEBHOOK_FALLBACK):
+        self.history = LatencyHistory("wavespeed", path, size)
+        self.min_samples = min_samples
+        # In webhook mode a job is only polled once the fallback has passed without a
+        # callback, so it must not time out before it has been polled for a while
+        self.min_timeout = POLL_MIN_TIMEOUT + (webhook_fallback if mode == "webhook" else 0)
+
+    def record(self, key, seconds):
+        self.history.record(key, seconds)
+        RENDER_SECONDS.observe(seconds, endpoint=key.split(":")[0])
+
+    def schedule(self, key, kind="image") -> PollSchedule:
+        """
+        Poll schedule for a job: start polling near the expected completion,
+        poll densely across the usual completion window and time out at a
+        high percentile with a safety margin
+        """
+        default = DEFAULT_SCHEDULES[kind]
+        durations = self.history.get(key)
+        if len(durations) < self.min_samples:
+            return default
+
+        start = percentile(durations, POLL_START_PERCENTILE)
+        end = percentile(durations, POLL_END_PERCENTILE)
+        interval = min(POLL_MAX_INTERVAL, max(POLL_MIN_INTERVAL, (end - start) / POLL_DENSE_STEPS))
+        timeout = max(percentile(durations, POLL_TIMEOUT_PERCENTILE) * POLL_TIMEOUT_MARGIN, self.min_timeout)
+        return PollSchedule(first_poll=max(0.0, start - interval), interval=interval,
+                            backoff_after=end, timeout=timeout, learned=True)
+
+    def expected(self, key, kind="image") -> float:
+        """
+        Typical submit-to-complete seconds of a job (median of its history), for scheduling
+        """
+        durations = self.history.get(key) if key else []
+        if not durations:
+            return EXPECTED_RENDER_SECONDS[kind]
+        return percentile(durations, 0.5)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_completion_times() -> CompletionTimes:
+    """
+    Return the process-wide completion time store
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CompletionTimes()
+        return _store
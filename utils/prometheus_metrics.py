@@ -0,0 +1,218 @@
+# utils/prometheus_metrics.py
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+from config.settings import METRICS_HOST, METRICS_PORT
+
+METRICS_PATH = "/metrics"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class Counter:
+    """
+    Monotonic count per label set
+    """
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative bucket counts, sum and count per label set
+    """
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = sorted(buckets)
+        self._values: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, entry in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, entry):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_label_text(labels + (('le', f'{bound:g}'),))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_label_text(labels + (('le', '+Inf'),))} {entry[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(labels)} {entry[-2]:g}")
+                lines.append(f"{self.name}_count{_label_text(labels)} {entry[-1]}")
+        return lines
+
+
+class Gauge:
+    """
+    Value read when the metrics are scraped; read() returns a number or {labels dict as tuple: number}
+    """
+
+    def __init__(self, name, help_text, read: Callable):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.read()
+        except Exception:
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            if value is not None:
+                lines.append(f"{self.name}{_label_text(labels)} {value:g}")
+        return lines
+
+
+_API_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+_RENDER_BUCKETS = (2, 5, 10, 20, 30, 60, 90, 120, 180, 300, 600)
+
+API_CALLS = Counter("pipeline_api_calls_total", "API requests by provider, endpoint and outcome")
+API_RETRIES = Counter("pipeline_api_retries_total", "Requests retried after a transient failure")
+API_SECONDS = Histogram("pipeline_api_call_seconds", "API request latency", _API_BUCKETS)
+RENDER_SECONDS = Histogram("pipeline_render_seconds", "WaveSpeed render time from submit to completion",
+                           _RENDER_BUCKETS)
+FAILURES = Counter("pipeline_failures_total", "Failed LLM calls, renders, downloads and stages")
+STAGE_SECONDS = Histogram("pipeline_stage_seconds", "Duration of each generator stage per name",
+                          (10, 30, 60, 120, 300, 600, 1200, 1800, 3600))
+
+_metrics = [API_CALLS, API_RETRIES, API_SECONDS, RENDER_SECONDS, FAILURES, STAGE_SECONDS]
+_metrics_lock = threading.Lock()
+
+
+def register_gauge(name, help_text, read: Callable):
+    """
+    Add a gauge read at scrape time, e.g. a queue depth
+    """
+    with _metrics_lock:
+        _metrics.append(Gauge(name, help_text, read))
+
+
+def render_metrics() -> str:
+    """
+    All metrics in the Prometheus text exposition format
+    """
+    with _metrics_lock:
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _register_queue_gauges():
+    from utils.concurrency_governor import get_concurrency_governor
+    from utils.openai_client import get_openai_client
+    import utils.render_queue as render_queue
+
+    register_gauge("pipeline_wavespeed_jobs_running", "WaveSpeed jobs holding a concurrency slot",
+                   lambda: get_concurrency_governor().stats("wavespeed")["running"])
+    register_gauge("pipeline_wavespeed_jobs_waiting", "WaveSpeed jobs queued for a concurrency slot",
+                   lambda: get_concurrency_governor().stats("wavespeed")["waiting"])
+    register_gauge("pipeline_render_queue_jobs", "Jobs the render queue is waiting on",
+                   lambda: render_queue._queue.outstanding() if render_queue._queue else 0)
+    register_gauge("pipeline_openai_in_flight", "OpenAI requests in flight",
+                   lambda: get_openai_client().limiter.in_flight)
+    register_gauge("pipeline_openai_concurrency_limit", "Current adaptive OpenAI concurrency limit",
+                   lambda: get_openai_client().limiter.limit)
+
+
+class MetricsServer:
+    """
+    Serves render_metrics() at /metrics for Prometheus to scrape
+    """
+
+    def __init__(self, host=METRICS_HOST, port=METRICS_PORT):
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _handler():
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != METRICS_PATH:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = render_metrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+_server: Optional[MetricsServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT) -> Optional[MetricsServer]:
+    """
+    Start the metrics endpoint once per process if a port is configured (METRICS_PORT)
+    """
+    global _server
+    if port is None:
+        return None
+    with _server_lock:
+        if _server is None:
+            from utils.event_log import log
+            try:
+                _server = MetricsServer(port=port)
+            except OSError as e:
+                log(f"⚠️ Could not start metrics endpoint on port {port}: {e}")
+                return None
+            _register_queue_gauges()
+            log(f"📈 Prometheus metrics at http://{METRICS_HOST}:{_server.port}{METRICS_PATH}",
+                event="metrics_endpoint", port=_server.port)
+        return _server
@@ -0,0 +1,175 @@
+# utils/prompt_dedupe.py
+import json
+import math
+import re
+from collections import Counter, namedtuple
+from pathlib import Path
+from typing import Dict, List
+
+from config.settings import PROMPT_DEDUPE_ACTION, PROMPT_DEDUPE_THRESHOLD
+from utils.artifact_store import write_artifact
+from utils.asset_store import link_file
+from utils.content_filter import clean_ai_prompt
+from utils.image_variants import postprocess_image
+from utils.openai_client import chat_completion
+from utils.prompt_linter import ensure_renderable_prompt
+from utils.event_log import log
+
+# A prompt file, the file its render ends up in, and "image" or "video"
+VisualPrompt = namedtuple("VisualPrompt", ["prompt_file", "output_file", "kind"])
+
+DUPLICATES_FILE = "prompt_duplicates.json"
+
+_WORD_RE = re.compile(r"[a-z][a-z'-]+")
+# Words every cinematic prompt shares; they say nothing about what is in the picture
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "with", "in", "on", "at", "by", "for", "to", "from",
+    "into", "onto", "as", "is", "are", "its", "their", "that", "this", "while", "which",
+    "cinematic", "shot", "scene", "style", "lighting", "light", "mood", "composition",
+    "camera", "angle", "frame", "framing", "professional", "documentary", "detailed",
+}
+_SUFFIXES = ("ing", "ed", "es", "s", "ly")
+
+
+def _stem(word):
+    # Crude suffix stripping so "scattered"/"scatter" and "candles"/"candle" match
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def _terms(text) -> Counter:
+    return Counter(_stem(word) for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS)
+
+
+def tfidf_similarities(texts: List[str]) -> List[List[float]]:
+    """
+    Pairwise TF-IDF cosine similarities of a small set of texts
+    """
+    term_counts = [_terms(text) for text in texts]
+    document_frequency = Counter(term for counts in term_counts for term in counts)
+    total = len(texts)
+    vectors = []
+    for counts in term_counts:
+        vector = {term: count * (1 + math.log((1 + total) / (1 + document_frequency[term])))
+                  for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({term: weight / norm for term, weight in vector.items()})
+
+    similarities = [[1.0] * total for _ in range(total)]
+    for i in range(total):
+        for j in range(i + 1, total):
+            small, large = sorted((vectors[i], vectors[j]), key=len)
+            score = sum(weight * large.get(term, 0.0) for term, weight in small.items())
+            similarities[i][j] = similarities[j][i] = score
+    return similarities
+
+
+def find_near_duplicates(prompts: List[VisualPrompt], texts: List[str],
+                         threshold=PROMPT_DEDUPE_THRESHOLD) -> Dict[VisualPrompt, tuple]:
+    """
+    Near-duplicate prompts of the same kind
+
+    Each prompt is compared with the earlier ones; the first earlier prompt that
+    is similar enough (and not itself a duplicate) becomes its representative.
+
+    Returns:
+        dict: {duplicate: (representative, similarity)}
+    """
+    similarities = tfidf_similarities(texts)
+    duplicates = {}
+    for j, prompt in enumerate(prompts):
+        for i in range(j):
+            if prompts[i] in duplicates or prompts[i].kind != prompt.kind:
+                continue
+            if similarities[i][j] >= threshold:
+                duplicates[prompt] = (prompts[i], round(similarities[i][j], 3))
+                break
+    return duplicates
+
+
+def _diversify(duplicate_text, representative_text, kind, first_name, stage):
+    messages = [
+        {"role": "system", "content": f"You rewrite AI {kind} generation prompts so that they show a clearly different scene. Keep the same subject matter and cinematic quality, but change the setting, objects, viewpoint and palette so the result does not look like the reference. Return only the new prompt as one paragraph, without personal names, years or restricted terms."},
+        {"role": "user", "content": f"Reference prompt (already rendered):\n{representative_text}\n\nPrompt to rewrite:\n{duplicate_text}"}
+    ]
+    rewritten = chat_completion(messages, task="prompt_diversify", name=first_name, stage=stage).strip()
+    cleaned = clean_ai_prompt(rewritten, first_name, remove_name=True, remove_centuries=True)
+    return ensure_renderable_prompt(cleaned, first_name, kind=kind, stage=f"{stage}_repair")
+
+
+def collapse_duplicate_prompts(prompts: List[VisualPrompt], first_name, stage,
+                               action=PROMPT_DEDUPE_ACTION) -> Dict[VisualPrompt, VisualPrompt]:
+    """
+    Find near-duplicate visual prompts before rendering and collapse them
+
+    "reuse": duplicates are not rendered; link_duplicate_outputs copies the
+    representative's output to them afterwards. "diversify": each duplicate
+    prompt file is rewritten by the LLM to show a different scene. "off" does
+    nothing. The groups are recorded in prompt_duplicates.json.
+
+    Args:
+        prompts (list): VisualPrompt of every prompt about to be rendered
+        first_name (str): Subject name (for cleaning and metrics)
+        stage (str): Metrics stage prefix, e.g. "long"
+
+    Returns:
+        dict: {duplicate: representative} of the prompts that must not be rendered
+    """
+    prompts = [prompt for prompt in prompts if prompt.prompt_file.exists()]
+    if action == "off" or len(prompts) < 2:
+        return {}
+    texts = [prompt.prompt_file.read_text(encoding="utf-8").strip() for prompt in prompts]
+    duplicates = find_near_duplicates(prompts, texts)
+
+    texts = dict(zip(prompts, texts))
+    record = []
+    skipped = {}
+    for duplicate, (representative, similarity) in duplicates.items():
+        entry = {
+            "duplicate": duplicate.prompt_file.name,
+            "representative": representative.prompt_file.name,
+            "similarity": similarity,
+        }
+        if action == "diversify":
+            log(f"🔀 Diversifying {duplicate.prompt_file.name} ({similarity:.0%} like {representative.prompt_file.name})")
+            try:
+                rewritten = _diversify(texts[duplicate], texts[representative], duplicate.kind, first_name,
+                                       stage=f"{stage}_{duplicate.prompt_file.stem}_diversify")
+            except Exception as e:
+                log(f"⚠️ Could not diversify prompt: {e}")
+                rewritten = None
+            if rewritten:
+                write_artifact(duplicate.prompt_file, rewritten)
+            entry["resolution"] = "diversified" if rewritten else "kept"
+        else:
+            log(f"♻️ {duplicate.prompt_file.name} reuses the render of {representative.prompt_file.name} "
+                f"({similarity:.0%} similar)")
+            skipped[duplicate] = representative
+            entry["resolution"] = "reused"
+        record.append(entry)
+
+    directory = prompts[0].prompt_file.parent
+    write_artifact(directory / DUPLICATES_FILE, json.dumps(
+        {"action": action, "threshold": PROMPT_DEDUPE_THRESHOLD, "groups": record,
+         "renders_avoided": len(skipped)}, indent=2))
+    if skipped:
+        log(f"💰 {len(skipped)} near-duplicate render(s) avoided")
+    return skipped
+
+
+def link_duplicate_outputs(duplicates: Dict[VisualPrompt, VisualPrompt]) -> bool:
+    """
+    Give each skipped duplicate its representative's output. Returns True if all could be linked.
+    """
+    success = True
+    for duplicate, representative in duplicates.items():
+        if not Path(representative.output_file).exists():
+            log(f"❌ No render of {representative.prompt_file.name} to reuse for {duplicate.prompt_file.name}")
+            success = False
+            continue
+        link_file(representative.output_file, duplicate.output_file)
+        if duplicate.kind == "image":
+            postprocess_image(duplicate.output_file)
+    return success
@@ -0,0 +1,149 @@
+# utils/prompt_linter.py
+import re
+from collections import namedtuple
+
+from config.settings import (
+    PROMPT_LINT_MIN_WORDS,
+    PROMPT_LINT_MAX_CHARS,
+    PROMPT_LINT_THRESHOLD,
+    PROMPT_REPAIR_ATTEMPTS,
+)
+from utils.content_filter import get_content_filter, clean_ai_prompt
+from utils.openai_client import chat_completion
+from utils.event_log import log
+
+LintResult = namedtuple("LintResult", ["score", "issues", "passed"])
+
+_YEAR_RE = re.compile(r'\b(1[0-9]{3}|20[0-9]{2})s?\b')
+
+# Marks left behind when cleaning cuts words out of a sentence: (label, pattern, penalty per hit)
+_DAMAGE_PATTERNS = [
+    ("repeated punctuation", re.compile(r'[,;:]\s*[,;:.]'), 0.1),
+    ("space before punctuation", re.compile(r'\s[,.;:!?]'), 0.05),
+    ("dangling article or preposition",
+     re.compile(r'\b(a|an|the|of|with|and|in|on|by|for|to)\s*[,.;:!?]', re.IGNORECASE), 0.2),
+    ("stacked articles", re.compile(r'\b(a|an|the)\s+(a|an|the|and|of|with)\b', re.IGNORECASE), 0.2),
+    ("empty brackets", re.compile(r'\(\s*\)|\[\s*\]'), 0.1),
+    ("leading punctuation", re.compile(r'^\s*[,.;:\-]'), 0.1),
+    ("dangling ending", re.compile(r'\b(a|an|the|of|with|and|in|on|by|for|to)\s*$', re.IGNORECASE), 0.2),
+]
+
+
+def tidy_prompt(prompt):
+    """
+    Free local repair of punctuation damage (", ," / " ." / leading commas)
+    """
+    tidied = re.sub(r'\(\s*\)|\[\s*\]', '', prompt)
+    tidied = re.sub(r'([,;:])(\s*[,;:])+', r'\1', tidied)
+    tidied = re.sub(r'[,;:]\s*\.', '.', tidied)
+    tidied = re.sub(r'\s+([,.;:!?])', r'\1', tidied)
+    tidied = re.sub(r'^\s*[,.;:\-]+\s*', '', tidied)
+    tidied = "\n".join(re.sub(r'\s+', ' ', line).strip() for line in tidied.split("\n") if line.strip())
+    if tidied[:1].islower():
+        tidied = tidied[0].upper() + tidied[1:]
+    return tidied
+
+
+def lint_prompt(prompt, first_name=None, allow_name=False, check_restricted=True) -> LintResult:
+    """
+    Score a cleaned prompt for how likely it is to render well
+
+    Checks length, residual restricted terms, leftover names or years, and
+    grammatical damage left by cleaning. Restricted terms, names and a near-empty
+    prompt fail outright; the rest lower the score.
+
+    Returns:
+        LintResult: (score between 0 and 1, list of issues, passed)
+    """
+    issues = []
+    hard_failure = False
+    score = 1.0
+    prompt = prompt or ""
+    words = prompt.split()
+
+    if len(words) < PROMPT_LINT_MIN_WORDS:
+        issues.append(f"too short ({len(words)} words)")
+        score -= 0.5
+        hard_failure = hard_failure or len(words) < PROMPT_LINT_MIN_WORDS // 2
+    if len(prompt) > PROMPT_LINT_MAX_CHARS:
+        issues.append(f"too long ({len(prompt)} characters)")
+        score -= 0.2
+
+    if check_restricted:
+        hits = get_content_filter().find(prompt)
+        if hits:
+            issues.append(f"restricted terms: {', '.join(sorted(hits))}")
+            hard_failure = True
+
+    if first_name and not allow_name:
+        name_parts = [part for part in re.split(r'\s+', first_name) if len(part) > 2]
+        leftover = [part for part in name_parts
+                    if re.search(r'\b' + re.escape(part) + r'\b', prompt, re.IGNORECASE)]
+        if leftover:
+            issues.append(f"leftover name: {', '.join(leftover)}")
+            hard_failure = True
+
+    years = _YEAR_RE.findall(prompt)
+    if years:
+        issues.append(f"years: {', '.join(sorted(set(years)))}")
+        score -= 0.2
+
+    for label, pattern, penalty in _DAMAGE_PATTERNS:
+        count = len(pattern.findall(prompt))
+        if count:
+            issues.append(f"{label} (x{count})")
+            score -= min(0.4, penalty * count)
+
+    score = max(0.0, round(score, 2))
+    return LintResult(score, issues, not hard_failure and score >= PROMPT_LINT_THRESHOLD)
+
+
+def _repair_with_llm(prompt, issues, kind, name, stage):
+    messages = [
+        {"role": "system", "content": f"You repair AI {kind} generation prompts. Return only the repaired prompt as one fluent paragraph: keep the visual content, fix broken grammar and missing words, and never add personal names, years, or violent, sexual, medical or otherwise restricted terms."},
+        {"role": "user", "content": f"Problems found: {'; '.join(issues)}\n\nPrompt:\n{prompt}"}
+    ]
+    return chat_completion(messages, task="prompt_repair", name=name, stage=stage).strip()
+
+
+def ensure_renderable_prompt(prompt, first_name, kind="image", allow_name=False, check_restricted=True, stage=None,
+                             keep_newlines=False):
+    """
+    Lint a cleaned prompt before it is sent to WaveSpeed and repair it if needed
+
+    Local tidying is tried first; only prompts that still fail go to a cheap LLM
+    repair, whose output is cleaned and linted again.
+
+    Args:
+        prompt (str): Prompt after clean_ai_prompt
+        first_name (str): Subject name (used for leftover-name checks and metrics)
+        kind (str): "image" or "video"
+        allow_name (bool): The name is allowed (thumbnails)
+        check_restricted (bool): Fail on restricted terms
+        stage (str): Metrics stage of the repair call
+        keep_newlines (bool): Keep the line breaks of a repaired prompt
+
+    Returns:
+        str or None: A prompt that passed linting, or None if it could not be repaired
+    """
+    candidate = tidy_prompt(prompt)
+    result = lint_prompt(candidate, first_name, allow_name, check_restricted)
+    if result.passed:
+        return candidate
+
+    for attempt in range(PROMPT_REPAIR_ATTEMPTS):
+        log(f"🩹 Repairing {kind} prompt (score {result.score}): {'; '.join(result.issues)}")
+        try:
+            repaired = _repair_with_llm(candidate, result.issues, kind, first_name, stage)
+        except Exception as e:
+            log(f"⚠️ Prompt repair failed: {e}")
+            break
+        candidate = tidy_prompt(clean_ai_prompt(repaired, first_name, remove_name=not allow_name,
+                                                filter_restricted=check_restricted, keep_newlines=keep_newlines))
+        result = lint_prompt(candidate, first_name, allow_name, check_restricted)
+        if result.passed:
+            log(f"✅ {kind.capitalize()} prompt repaired (score {result.score})")
+            return candidate
+
+    log(f"❌ {kind.capitalize()} prompt rejected, skipping render: {'; '.join(result.issues)}")
+    return None
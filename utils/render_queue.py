@@ -0,0 +1,441 @@
+# utils/render_queue.py
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from config.settings import (
+    WAVESPEED_DOWNLOAD_WORKERS,
+    WAVESPEED_POOL_SIZE,
+    WAVESPEED_SUBMIT_WORKERS,
+    WAVESPEED_COMPLETION_MODE,
+    WAVESPEED_WEBHOOK_FALLBACK,
+)
+from utils.concurrency_governor import get_concurrency_governor
+from utils.hedging import get_hedge_policy
+from utils.job_journal import get_job_journal
+from utils.poll_schedule import get_completion_times, DEFAULT_SCHEDULES
+from utils.wavespeed_client import get_wavespeed_client, WaveSpeedError
+from utils.event_log import log
+from utils.prometheus_metrics import FAILURES
+
+# Longest the poller sleeps between checks of its deadlines
+_MAX_IDLE = 5.0
+# Seconds a callback for a job that is not registered yet is kept for it
+_EARLY_CALLBACK_MAX_AGE = 300.0
+
+
+class RenderJob:
+    """
+    One submitted WaveSpeed prediction
+    """
+
+    def __init__(self, label, request_id, on_complete, schedule, timeout, key=None, poll_delay=0.0):
+        self.label = label
+        self.request_id = request_id
+        self.on_complete = on_complete
+        self.schedule = schedule
+        self.key = key
+        self.submitted_at = time.monotonic()
+        self.deadline = self.submitted_at + timeout
+        self.next_poll = self.submitted_at + max(poll_delay, schedule.next_delay(0.0))
+        self.resumed = False
+        self.slot = None
+        self.future = Future()
+        # Hedging: what to resubmit, when, and the other job of a hedged pair
+        self.submission = None  # (model, payload, target, webhook, expected seconds)
+        self.hedge_key = None
+        self.hedge_at = None
+        self.partner = None
+        self.duplicate = False
+
+
+class RenderQueue:
+    """
+    Submit WaveSpeed jobs up front and wait for all of them together.
+
+    One poller thread checks every outstanding prediction when its poll
+    schedule (learned from past completion times of the same endpoint, size
+    and duration) says it is due; finished predictions are handed to a small
+    pool of download workers, which run the job's on_complete(output_url)
+    callback. The job's future resolves to the callback's return value, or to
+    a WaveSpeedError if the prediction failed or timed out.
+
+    In webhook mode submissions carry the URL of a local receiver and jobs
+    complete when WaveSpeed calls back; a job is only polled once it has gone
+    webhook_fallback seconds without a callback.
+
+    Jobs are only submitted once the concurrency governor grants them a slot
+    under the WaveSpeed and endpoint limits; the slot is held until the job
+    finishes. Queued jobs start longest-expected-first.
+
+    Jobs submitted with a hedge_key are hedged like generate_ai_image/video:
+    once one has run longer than the hedge policy's percentile for the key, the
+    poller submits one duplicate, if the budget allows and the governor has a
+    slot for it right away. Both share the job's future; the first to complete
+    is delivered and the other is abandoned.
+    """
+
+    def __init__(self, client=None, download_workers=WAVESPEED_DOWNLOAD_WORKERS,
+                 mode=WAVESPEED_COMPLETION_MODE, webhook_fallback=WAVESPEED_WEBHOOK_FALLBACK,
+                 completion_times=None, journal=None, governor=None, hedging=None):
+        self.client = client or get_wavespeed_client()
+        self.completion_times = completion_times or get_completion_times()
+        self.journal = journal or get_job_journal()
+        self.governor = governor or get_concurrency_governor()
+        self.hedging = hedging or get_hedge_policy("wavespeed")
+        self.mode = mode
+        self.webhook_fallback = webhook_fallback
+        self.polls = 0
+        self._jobs = {}
+        self._early_callbacks = {}  # request ID -> (result, received at)
+        self._condition = threading.Condition()
+        self._downloads = ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix="wavespeed-download")
+        self._sync_calls = ThreadPoolExecutor(max_workers=WAVESPEED_POOL_SIZE, thread_name_prefix="wavespeed-sync")
+        self._submissions = ThreadPoolExecutor(max_workers=WAVESPEED_SUBMIT_WORKERS,
+                                               thread_name_prefix="wavespeed-submit")
+        self._poller = None
+        self._receiver = None
+
+    def _webhook_url(self):
+        from utils.webhook_receiver import WebhookReceiver
+
+        with self._condition:
+            if self._receiver is None:
+                self._receiver = WebhookReceiver(self.complete)
+            return self._receiver.url
+
+    def submit(self, model, payload, on_complete, label, timeout=None, key=None, kind="image",
+               target=None, hedge_key=None) -> Future:
+        """
+        Queue a prediction for submission and return a future for its on_complete result
+
+        Args:
+            timeout (float): Upper bound in seconds; the learned timeout is used if shorter
+            key (str): Timing key (see poll_schedule.render_key)
+            kind (str): "image" or "video", for the default schedule and expected duration
+            target (Path): File on_complete delivers to, journaled for a later run
+            hedge_key (str): Hedge policy key (as in generate_ai_image/video); None to never hedge
+
+        Returns:
+            Future: Resolves to on_complete's result, or raises WaveSpeedError if the
+                task could not be submitted, failed or timed out
+        """
+        future = Future()
+        self.governor.request(
+            "wavespeed", model, self.completion_times.expected(key, kind),
+            lambda slot: self._submissions.submit(self._submit_now, slot, future, model, payload,
+                                                  on_complete, label, timeout, key, kind, target, hedge_key)
+        )
+        return future
+
+    def _submit_now(self, slot, future, model, payload, on_complete, label, timeout, key, kind, target,
+                    hedge_key):
+        try:
+            webhook = self._webhook_url() if self.mode == "webhook" else None
+            request_id = self.journal.submit(self.client, model, payload, webhook=webhook, label=label,
+                                             target=target)
+        except Exception as e:
+            slot.release()
+            future.set_exception(e)
+            return
+        resumed = request_id in self.journal.resumed
+        if not resumed:
+            waited = f" after {slot.waited:.1f}s in queue" if slot.waited >= 1 else ""
+            log(f"📤 {label} submitted{waited}. Request ID: {request_id}")
+        # A resumed job was registered with an earlier webhook (if any), so it is polled right away
+        job = self._job(request_id, on_complete, label, timeout, key, kind,
+                        poll_delay=self.webhook_fallback if webhook and not resumed else 0.0)
+        job.resumed = resumed
+        job.slot = slot
+        if hedge_key and not resumed and self.hedging.enabled:
+            # The poller sends a duplicate once the job is slower than usual (see _hedge)
+            self.hedging.count_primary()
+            delay = self.hedging.hedge_delay(hedge_key)
+            if delay is not None:
+                job.submission = (model, payload, target, webhook, self.completion_times.expected(key, kind))
+                job.hedge_key = hedge_key
+                job.hedge_at = job.submitted_at + delay
+        self._track(job).add_done_callback(lambda done: _copy_outcome(done, future))
+
+    def _job(self, request_id, on_complete, label, timeout, key, kind, poll_delay=0.0) -> RenderJob:
+        schedule = self.completion_times.schedule(key, kind) if key else DEFAULT_SCHEDULES[kind]
+        timeout = min(timeout, schedule.timeout) if timeout else schedule.timeout
+        return RenderJob(label, request_id, on_complete, schedule, timeout, key=key, poll_delay=poll_delay)
+
+    def adopt(self, request_id, on_complete, label, timeout=None, key=None, kind="image", poll_delay=0.0,
+              resumed=True, slot=None) -> Future:
+        """
+        Track an already submitted prediction, e.g. one journaled by an earlier run
+
+        Completion times of resumed jobs are not recorded, since their submit time is unknown.
+        """
+        job = self._job(request_id, on_complete, label, timeout, key, kind, poll_delay=poll_delay)
+        job.resumed = resumed
+        job.slot = slot
+        return self._track(job)
+
+    def _track(self, job) -> Future:
+        request_id = job.request_id
+        with self._condition:
+            previous = self._jobs.get(request_id)
+            if previous is not None:
+                # Already tracked (e.g. picked up at startup): the new job takes over and
+                # the earlier future resolves to the same outcome
+                job.future.add_done_callback(lambda done, earlier=previous.future: _copy_outcome(done, earlier))
+            self._jobs[request_id] = job
+            early = self._early_callbacks.pop(request_id, None)
+            self._ensure_poller()
+            self._condition.notify()
+        if early is not None:
+            self._handle(job, early[0])
+        return job.future
+
+    def run_sync(self, fn, label, model, key=None, kind="image") -> Future:
+        """
+        Run a blocking sync-mode render in the background once the governor grants
+        it a slot; the future resolves to fn()
+        """
+        future = Future()
+
+        def _run(slot):
+            log(f"📤 {label} submitted (sync delivery)")
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                slot.release()
+
+        self.governor.request("wavespeed", model, self.completion_times.expected(key, kind),
+                              lambda slot: self._sync_calls.submit(_run, slot))
+        return future
+
+    def complete(self, request_id, result):
+        """
+        Resolve a job from a webhook callback
+        """
+        with self._condition:
+            job = self._jobs.get(request_id)
+            if job is None:
+                # The callback beat submit() to registering the job. Callbacks nobody
+                # registers (e.g. for a job that was abandoned) are dropped after a while
+                now = time.monotonic()
+                self._early_callbacks = {rid: early for rid, early in self._early_callbacks.items()
+                                         if now - early[1] <= _EARLY_CALLBACK_MAX_AGE}
+                self._early_callbacks[request_id] = (result, now)
+                return
+        self._handle(job, result)
+
+    def outstanding(self) -> int:
+        with self._condition:
+            return len(self._jobs)
+
+    def _ensure_poller(self):
+        if self._poller is None or not self._poller.is_alive():
+            self._poller = threading.Thread(target=self._poll_loop, name="wavespeed-poller", daemon=True)
+            self._poller.start()
+
+    def _poll_loop(self):
+        while True:
+            with self._condition:
+                while not self._jobs:
+                    self._condition.wait()
+                jobs = list(self._jobs.values())
+
+            now = time.monotonic()
+            for job in jobs:
+                # One bad job must not stop the poller every other job waits on
+                try:
+                    if now >= job.next_poll or now > job.deadline:
+                        self._check(job)
+                except Exception as e:
+                    self._fail(job, WaveSpeedError(f"{job.label}: could not check request {job.request_id}: {e}"))
+                try:
+                    if job.hedge_at is not None and now >= job.hedge_at:
+                        self._hedge(job)
+                except Exception as e:
+                    log(f"⚠️ {job.label}: could not send a hedged duplicate: {e}")
+
+            # Sleep until the next job is due, but wake early for new jobs
+            with self._condition:
+                if self._jobs:
+                    due = min(min(job.next_poll, job.deadline, job.hedge_at or job.deadline)
+                              for job in self._jobs.values())
+                    remaining = min(_MAX_IDLE, due - time.monotonic())
+                    if remaining > 0:
+                        self._condition.wait(remaining)
+
+    def _hedge(self, job):
+        # Runs on the poller: reserve a duplicate, submit it in the background
+        job.hedge_at = None
+        with self._condition:
+            if self._jobs.get(job.request_id) is not job:
+                return
+        if not self.hedging.take_budget():
+            return
+        model, _, _, _, expected = job.submission
+        slot = self.governor.try_acquire("wavespeed", model, expected)
+        if slot is None:
+            self.hedging.return_budget()
+            return
+        log(f"⏳ {job.label} slower than p{int(self.hedging.percentile * 100)} "
+            f"({time.monotonic() - job.submitted_at:.1f}s), sending a hedged duplicate")
+        self._submissions.submit(self._submit_hedge, job, slot)
+
+    def _submit_hedge(self, job, slot):
+        model, payload, target, webhook, _ = job.submission
+        try:
+            # The journal hands out a fresh request while the job's hash is being waited on
+            request_id = self.journal.submit(self.client, model, payload, webhook=webhook,
+                                             label=job.label, target=target)
+        except Exception as e:
+            slot.release()
+            self.hedging.return_budget()
+            log(f"⚠️ {job.label}: hedged duplicate could not be submitted: {e}")
+            return
+        duplicate = RenderJob(f"{job.label} (hedge)", request_id, job.on_complete, job.schedule,
+                              job.schedule.timeout, key=job.key,
+                              poll_delay=self.webhook_fallback if webhook else 0.0)
+        duplicate.slot = slot
+        duplicate.hedge_key = job.hedge_key
+        duplicate.duplicate = True
+        duplicate.future = job.future
+        with self._condition:
+            if self._jobs.get(job.request_id) is job:
+                job.partner = duplicate
+                duplicate.partner = job
+        if duplicate.partner is None:
+            # The job finished while the duplicate was being submitted
+            self._abandon(duplicate)
+            return
+        log(f"📤 {duplicate.label} submitted. Request ID: {request_id}")
+        self._track(duplicate)
+
+    def _abandon(self, job):
+        # The other job of a hedged pair won; this one is never delivered (nor resumed later)
+        self.journal.release(job.request_id)
+        self.journal.finished(job.request_id, "failed", error="lost to a hedged duplicate")
+        if job.slot is not None:
+            job.slot.release()
+
+    def _finish(self, job) -> bool:
+        # Only the first of poller and webhook to see a final state resolves the job
+        with self._condition:
+            if self._jobs.get(job.request_id) is not job:
+                return False
+            del self._jobs[job.request_id]
+        self.journal.release(job.request_id)
+        if job.slot is not None:
+            job.slot.release()
+        return True
+
+    def _win(self, job) -> bool:
+        # As _finish, and a still running partner of a hedged pair is abandoned
+        with self._condition:
+            if self._jobs.get(job.request_id) is not job:
+                return False
+            del self._jobs[job.request_id]
+            loser = job.partner
+            if loser is not None and self._jobs.get(loser.request_id) is loser:
+                del self._jobs[loser.request_id]
+            else:
+                loser = None
+        if loser is not None:
+            self._abandon(loser)
+        self.journal.release(job.request_id)
+        if job.slot is not None:
+            job.slot.release()
+        return True
+
+    def _fail(self, job, error, failed=False, reason=None):
+        # A failed or timed out job of a hedged pair leaves the future to its partner.
+        # Only failures are journaled: a timed out job may still be picked up later
+        if not self._finish(job):
+            return
+        FAILURES.inc(kind="render")
+        if failed:
+            self.journal.finished(job.request_id, "failed", error=reason)
+        with self._condition:
+            partner = job.partner
+            running = partner is not None and self._jobs.get(partner.request_id) is partner
+            if running:
+                partner.partner = None
+        if running:
+            log(f"⚠️ {error}; waiting for {partner.label}")
+        else:
+            self._resolve(job, error=error)
+
+    def _resolve(self, job, result=None, error=None):
+        # The jobs of a hedged pair share a future: only its first outcome counts
+        with self._condition:
+            if job.future.done():
+                return
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+    def _check(self, job):
+        if time.monotonic() > job.deadline:
+            self._fail(job, WaveSpeedError(f"{job.label} timed out (request {job.request_id})"))
+            return
+
+        try:
+            self.polls += 1
+            result = self.client.poll(job.request_id)
+        except WaveSpeedError as e:
+            # Transient polling errors are retried at the next scheduled poll
+            log(f"⏳ {job.label}: {e}, retrying...")
+            result = {}
+        self._handle(job, result)
+        job.next_poll = time.monotonic() + job.schedule.next_delay(time.monotonic() - job.submitted_at)
+
+    def _handle(self, job, result):
+        status = result.get("status")
+        if status == "completed" and not result.get("outputs"):
+            self._fail(job, WaveSpeedError(f"{job.label} completed with no outputs (request {job.request_id})"),
+                       failed=True, reason="no outputs")
+        elif status == "completed":
+            if not self._win(job):
+                return
+            elapsed = time.monotonic() - job.submitted_at
+            if job.key and not job.resumed:
+                self.completion_times.record(job.key, elapsed)
+            if job.hedge_key:
+                self.hedging.record_latency(job.hedge_key, elapsed)
+                if job.duplicate:
+                    self.hedging.count_win()
+            log(f"✅ {job.label} completed in {elapsed:.2f} seconds.")
+            self.journal.finished(job.request_id, "completed", output=result["outputs"][0])
+            self._downloads.submit(self._deliver, job, result["outputs"][0])
+        elif status == "failed":
+            self._fail(job, WaveSpeedError(f"Task failed: {result.get('error', 'Unknown error')}"),
+                       failed=True, reason=result.get("error"))
+
+    def _deliver(self, job, output_url):
+        try:
+            self._resolve(job, result=job.on_complete(output_url))
+        except Exception as e:
+            self._resolve(job, error=e)
+
+
+def _copy_outcome(source, target):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_render_queue() -> RenderQueue:
+    """
+    Return the process-wide render queue
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = RenderQueue()
+        return _queue
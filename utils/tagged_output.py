@@ -0,0 +1,162 @@
+# utils/tagged_output.py
+import re
+from typing import Callable, Dict, Iterable, List, Optional
+
+from utils.event_log import log
+
+# "[TAG]" opens a section; "[TAG: value]" is an annotation on the current section
+_TAG_RE = re.compile(r'\[\s*([A-Za-z][A-Za-z0-9_ ]*?)\s*(?::\s*([^\]\n]*))?\]')
+
+# Section markers of a long script, in order of preference
+_SECTION_MARKER_RE = re.compile(
+    r'\[SECTION\s+(?P<bracket>\d+)\]'
+    r'|\bSection\s+(?P<colon>\d+):'
+    r'|\bPart\s+(?P<part>\d+):'
+    r'|###\s*Section\s+(?P<hashes>\d+)\s*###',
+    re.IGNORECASE,
+)
+_SECTION_STYLES = ("bracket", "colon", "part", "hashes")
+
+# Markdown left around tags, e.g. "**[SCRIPT]**" or "## [SCRIPT]"
+_EDGE_MARKUP = " \t\r\n*"
+_TRAILING_HEADING_RE = re.compile(r'(?:^|\s)#+$')
+
+
+class TaggedOutput:
+    """
+    Sections of a tagged LLM response, e.g. [SCRIPT] ... [DESCRIPTION] ...
+
+    Attributes:
+        sections (dict): {TAG: content} in the order the tags appeared
+        annotations (dict): {TAG: {ANNOTATION: value}}, e.g. {"VIDEO_PROMPT": {"APPEARS_AT": "..."}}
+    """
+
+    def __init__(self, sections=None, annotations=None):
+        self.sections: Dict[str, str] = sections or {}
+        self.annotations: Dict[str, Dict[str, str]] = annotations or {}
+
+    def get(self, tag, default=None) -> Optional[str]:
+        return self.sections.get(tag.upper(), default)
+
+    def missing(self, required: Iterable[str]) -> List[str]:
+        """
+        Required tags that are absent or empty
+        """
+        return [tag for tag in required if not self.sections.get(tag.upper())]
+
+    def merge(self, other: "TaggedOutput", tags: Optional[Iterable[str]] = None):
+        """
+        Take sections from another response (only the given tags, if any)
+        """
+        for tag, content in other.sections.items():
+            if tags is None or tag in tags:
+                self.sections[tag] = content
+                if tag in other.annotations:
+                    self.annotations[tag] = other.annotations[tag]
+
+    def __repr__(self):
+        return f"TaggedOutput({list(self.sections)})"
+
+
+def parse_tagged_output(content, tags: Iterable[str], annotation_tags: Iterable[str] = ("APPEARS_AT",)) -> TaggedOutput:
+    """
+    Parse a tagged LLM response in a single pass
+
+    Only the expected tags open sections, so bracketed text inside the content
+    (e.g. "[PAUSE]") is left alone. Annotations are removed from the content and
+    kept on the section they belong to.
+
+    Args:
+        content (str): The model response
+        tags (iterable): Section tags, e.g. ("SCRIPT", "DESCRIPTION")
+        annotation_tags (iterable): Tags of the form [TAG: value] to collect
+
+    Returns:
+        TaggedOutput: The parsed sections
+    """
+    tags = {tag.upper() for tag in tags}
+    annotation_tags = {tag.upper() for tag in annotation_tags}
+    result = TaggedOutput()
+
+    current = None
+    pieces = []
+    position = 0
+
+    def _close():
+        if current is not None and not result.sections.get(current):
+            # A repeated tag keeps its first non-empty occurrence
+            text = "".join(pieces).strip(_EDGE_MARKUP)
+            result.sections[current] = _TRAILING_HEADING_RE.sub("", text).strip(_EDGE_MARKUP)
+
+    for match in _TAG_RE.finditer(content):
+        tag = re.sub(r'\s+', '_', match.group(1).strip()).upper()
+        value = match.group(2)
+
+        if value is not None and tag in annotation_tags:
+            if current is not None:
+                pieces.append(content[position:match.start()])
+                result.annotations.setdefault(current, {})[tag] = value.strip()
+            position = match.end()
+        elif value is None and tag in tags:
+            if current is not None:
+                pieces.append(content[position:match.start()])
+            _close()
+            current = tag
+            pieces = []
+            position = match.end()
+
+    if current is not None:
+        pieces.append(content[position:])
+        _close()
+
+    return result
+
+
+def complete_missing_sections(parsed: TaggedOutput, required: Iterable[str],
+                              request_missing: Callable[[List[str]], str],
+                              tags: Iterable[str], attempts: int = 1) -> List[str]:
+    """
+    Ask again for only the sections the model left out and merge them in
+
+    Args:
+        parsed (TaggedOutput): First parse; updated in place
+        required (iterable): Tags that must be present
+        request_missing (callable): Takes the missing tags, returns a new tagged response
+        tags (iterable): All known tags (for parsing the follow-up)
+        attempts (int): Follow-up requests before giving up
+
+    Returns:
+        list: Tags still missing afterwards
+    """
+    missing = parsed.missing(required)
+    for attempt in range(attempts):
+        if not missing:
+            break
+        log(f"🔁 Requesting missing sections: {', '.join(missing)}")
+        follow_up = parse_tagged_output(request_missing(missing), tags)
+        parsed.merge(follow_up, tags=missing)
+        missing = parsed.missing(required)
+    return missing
+
+
+def split_numbered_sections(script_content) -> Dict[int, str]:
+    """
+    Split a script on "[SECTION n]" / "Section n:" / "Part n:" / "### Section n ###" markers
+
+    All marker styles are found in one scan; the most preferred style present
+    decides where the script is split.
+
+    Returns:
+        dict: {section number: content}, empty if the script has no markers
+    """
+    markers = {style: [] for style in _SECTION_STYLES}
+    for match in _SECTION_MARKER_RE.finditer(script_content):
+        style = match.lastgroup
+        markers[style].append((int(match.group(style)), match.start(), match.end()))
+
+    chosen = next((markers[style] for style in _SECTION_STYLES if markers[style]), [])
+    sections = {}
+    for index, (number, _, body_start) in enumerate(chosen):
+        body_end = chosen[index + 1][1] if index + 1 < len(chosen) else len(script_content)
+        sections[number] = script_content[body_start:body_end].strip()
+    return sections
@@ -0,0 +1,247 @@
+# utils/video_assembly.py
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.settings import (
+    VIDEO_ASSEMBLY,
+    FFMPEG_BINARY,
+    ASSEMBLY_WORKERS,
+    ASSEMBLY_FPS,
+    ASSEMBLY_MIN_SEGMENT_SECONDS,
+    NARRATION_WORDS_PER_MINUTE,
+)
+from utils.event_log import log
+
+# One entry of a video's timeline: a still (turned into a slow zoom) or a clip
+# (scaled, padded and looped to length). A clip without a duration plays once.
+Segment = namedtuple("Segment", ["index", "source", "kind", "duration"])
+
+# Every segment is encoded with the same parameters so the final concat is a stream copy
+_ENCODE_ARGS = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20", "-pix_fmt", "yuv420p",
+                "-video_track_timescale", "90000", "-an"]
+# Zoom reached at the end of a still segment
+_STILL_ZOOM = 1.12
+
+SEGMENTS_DIR = "segments"
+
+
+class AssemblyError(Exception):
+    """ffmpeg could not encode a segment or join the segments"""
+    pass
+
+
+def narration_seconds(text) -> float:
+    """
+    Time to read text aloud at the configured speaking rate
+    """
+    return len((text or "").split()) * 60.0 / NARRATION_WORDS_PER_MINUTE
+
+
+def long_video_timeline(long_video_dir, section_contents: Dict[int, str], image_sections, video_sections) -> List[Segment]:
+    """
+    Sections in script order, each shown for as long as its narration takes
+
+    Image sections use long_video_image_N.jpg, video sections the downloaded video_N.mp4.
+    """
+    long_video_dir = Path(long_video_dir)
+    timeline = []
+    for section in sorted(set(image_sections) | set(video_sections)):
+        duration = max(ASSEMBLY_MIN_SEGMENT_SECONDS, narration_seconds(section_contents.get(section)))
+        if section in video_sections:
+            timeline.append(Segment(section, long_video_dir / f"video_{section}.mp4", "clip", duration))
+        else:
+            timeline.append(Segment(section, long_video_dir / f"long_video_image_{section}.jpg", "still", duration))
+    return timeline
+
+
+def short_video_timeline(short_video_dir, clip_seconds) -> List[Segment]:
+    """
+    Image 1, the clip, image 2; the stills share the narration time the clip leaves
+    """
+    short_video_dir = Path(short_video_dir)
+    script_file = short_video_dir / "script.txt"
+    script = script_file.read_text(encoding="utf-8") if script_file.exists() else ""
+    still = max(ASSEMBLY_MIN_SEGMENT_SECONDS, (narration_seconds(script) - clip_seconds) / 2)
+    return [
+        Segment(1, short_video_dir / "short_video_image_1.jpg", "still", still),
+        Segment(2, short_video_dir / "video.mp4", "clip", None),
+        Segment(3, short_video_dir / "short_video_image_2.jpg", "still", still),
+    ]
+
+
+class VideoAssembler:
+    """
+    Builds a finished video from a timeline with the local ffmpeg
+
+    Segments are encoded in a worker pool as soon as their source file is
+    reported ready (source_ready), so most of the encoding happens while the
+    remaining renders are still running; finish() encodes whatever is left and
+    joins the segments with a stream-copy concat. Encoded segments are kept in
+    a "segments" folder next to the output and reused while their source and
+    settings are unchanged.
+    """
+
+    def __init__(self, timeline: List[Segment], output_path, size, fps=ASSEMBLY_FPS,
+                 workers=ASSEMBLY_WORKERS, ffmpeg=None):
+        self.timeline = list(timeline)
+        self.output_path = Path(output_path)
+        self.width, self.height = size
+        self.fps = fps
+        self.ffmpeg = ffmpeg or shutil.which(FFMPEG_BINARY)
+        self.segments_dir = self.output_path.parent / SEGMENTS_DIR
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assembly")
+        self._encodes = {}  # segment index -> Future of its encoded file
+        self._lock = threading.Lock()
+
+    def segment_path(self, segment) -> Path:
+        # The name changes with anything that changes the encode, including the source's
+        # identity (path, inode, size, mtime), so stale segments are never reused
+        # even when a replaced source keeps its name or carries an older mtime
+        stat = segment.source.stat()
+        signature = hashlib.sha256(repr((str(segment.source.resolve()), stat.st_ino, stat.st_size,
+                                         stat.st_mtime_ns, segment.kind, segment.duration,
+                                         self.width, self.height, self.fps)).encode("utf-8")).hexdigest()[:10]
+        return self.segments_dir / f"segment_{segment.index:02d}_{signature}.mp4"
+
+    def source_ready(self, source):
+        """
+        Start encoding every segment that uses source (ignored until the file exists)
+        """
+        source = Path(source)
+        if not self.ffmpeg or not source.exists():
+            return
+        with self._lock:
+            for segment in self.timeline:
+                if segment.source == source and segment.index not in self._encodes:
+                    self._encodes[segment.index] = self._pool.submit(self._encode, segment)
+
+    def watch(self, futures):
+        """
+        Call source_ready for each image job once it delivers its (success, path, error) result
+        """
+        def _done(future):
+            if future.exception() is None:
+                success, path, _ = future.result()
+                if success:
+                    self.source_ready(path)
+
+        for future in futures:
+            future.add_done_callback(_done)
+
+    def _encode(self, segment) -> Path:
+        target = self.segment_path(segment)
+        if target.exists():
+            return target
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+
+        begin = time.monotonic()
+        temporary = target.with_name(target.stem + ".tmp.mp4")
+        fit = (f"scale={self.width}:{self.height}:force_original_aspect_ratio=decrease,"
+               f"pad={self.width}:{self.height}:(ow-iw)/2:(oh-ih)/2,setsar=1")
+        if segment.kind == "still":
+            # Slow centred zoom over an upscaled copy (zoompan on the original size jitters)
+            frames = max(1, round(segment.duration * self.fps))
+            step = (_STILL_ZOOM - 1) / frames
+            video_filter = (f"scale={self.width * 2}:{self.height * 2}:force_original_aspect_ratio=increase,"
+                            f"crop={self.width * 2}:{self.height * 2},"
+                            f"zoompan=z='min(1+{step:.6f}*on,{_STILL_ZOOM})':d={frames}"
+                            f":x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':s={self.width}x{self.height}:fps={self.fps},"
+                            f"format=yuv420p")
+            inputs = ["-i", str(segment.source)]
+            length = ["-frames:v", str(frames)]
+        else:
+            video_filter = f"{fit},fps={self.fps},format=yuv420p"
+            if segment.duration is None:
+                inputs = ["-i", str(segment.source)]
+                length = []
+            else:
+                # Loop the clip to cover the section's narration
+                inputs = ["-stream_loop", "-1", "-i", str(segment.source)]
+                length = ["-t", f"{segment.duration:.3f}"]
+
+        self._run(inputs + ["-vf", video_filter] + length + ["-r", str(self.fps)] + _ENCODE_ARGS
+                  + [str(temporary)])
+        os.replace(temporary, target)
+        # Earlier encodes of this segment are stale now
+        for stale in self.segments_dir.glob(f"segment_{segment.index:02d}_*.mp4"):
+            if stale != target:
+                stale.unlink(missing_ok=True)
+        log(f"🎞️ Segment {segment.index} encoded ({time.monotonic() - begin:.1f} seconds)")
+        return target
+
+    def _run(self, args):
+        command = [self.ffmpeg, "-hide_banner", "-loglevel", "error", "-y"] + args
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise AssemblyError(result.stderr.strip().splitlines()[-1] if result.stderr.strip()
+                                else f"ffmpeg exited with {result.returncode}")
+
+    def finish(self) -> bool:
+        """
+        Encode the remaining segments, wait for all of them and join them into output_path
+
+        Returns:
+            bool: True if the finished video was written
+        """
+        try:
+            if not self.ffmpeg:
+                log(f"⚠️ {FFMPEG_BINARY} not found, skipping assembly of {self.output_path.name}")
+                return False
+
+            missing = [segment for segment in self.timeline if not segment.source.exists()]
+            if missing:
+                log(f"❌ Cannot assemble {self.output_path.name}, missing: "
+                    f"{', '.join(segment.source.name for segment in missing)}")
+                return False
+
+            begin = time.monotonic()
+            for segment in self.timeline:
+                self.source_ready(segment.source)
+            with self._lock:
+                encodes = [self._encodes[segment.index] for segment in self.timeline]
+            try:
+                segments = [encode.result() for encode in encodes]
+            except (AssemblyError, OSError) as e:
+                log(f"❌ Could not encode a segment of {self.output_path.name}: {e}")
+                return False
+
+            list_file = self.segments_dir / f"{self.output_path.stem}_concat.txt"
+            with open(list_file, "w", encoding="utf-8") as f:
+                for path in segments:
+                    f.write(f"file {_concat_quote(path.resolve().as_posix())}\n")
+            temporary = self.output_path.with_name(self.output_path.stem + ".tmp.mp4")
+            try:
+                self._run(["-f", "concat", "-safe", "0", "-i", str(list_file), "-c", "copy",
+                           "-movflags", "+faststart", str(temporary)])
+            except (AssemblyError, OSError) as e:
+                log(f"❌ Could not join the segments of {self.output_path.name}: {e}")
+                return False
+            os.replace(temporary, self.output_path)
+
+            log(f"✅ Video assembled: {self.output_path} ({len(segments)} segments, "
+                f"{time.monotonic() - begin:.1f} seconds after the last asset)")
+            return True
+        finally:
+            self._pool.shutdown(wait=False)
+
+
+def _concat_quote(path) -> str:
+    # Quoting for the concat demuxer: a ' inside '...' is written as '\'' (e.g. "O'Brien")
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
+def create_assembler(timeline, output_path, size) -> Optional[VideoAssembler]:
+    """
+    Assembler for a timeline, or None if assembly is switched off
+    """
+    if not VIDEO_ASSEMBLY:
+        return None
+    return VideoAssembler(timeline, output_path, size)
@@ -0,0 +1,360 @@
+# utils/wavespeed_client.py
+import base64
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from config.settings import (
+    WAVESPEED_BASE_URL,
+    WAVESPEED_KEY_TTL,
+    WAVESPEED_POOL_SIZE,
+    WAVESPEED_REQUEST_TIMEOUT,
+    WAVESPEED_SYNC_TIMEOUT,
+)
+from utils.downloader import download_file, DownloadError
+from utils.event_log import log
+from utils.prometheus_metrics import API_CALLS, API_SECONDS
+
+# Start of the first "outputs" entry in a prediction response; the captured
+# byte tells a string ('"') from an empty list
+_OUTPUTS_RE = re.compile(rb'"outputs"\s*:\s*\[\s*(.)', re.DOTALL)
+_BASE64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+_NOT_BASE64 = bytes(b for b in range(256) if b not in _BASE64_ALPHABET)
+
+
+class WaveSpeedError(Exception):
+    """Error talking to the WaveSpeedAI API"""
+    pass
+
+
+class WaveSpeedTimeout(WaveSpeedError):
+    """A submit request timed out; the job may or may not have been created"""
+    pass
+
+
+class WaveSpeedClient:
+    """
+    Shared WaveSpeedAI client.
+
+    The API key is read and validated once and trusted for key_ttl seconds;
+    all requests go through one keep-alive session with a connection pool.
+    """
+
+    def __init__(self, base_url=WAVESPEED_BASE_URL, key_ttl=WAVESPEED_KEY_TTL,
+                 pool_size=WAVESPEED_POOL_SIZE, request_timeout=WAVESPEED_REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.key_ttl = key_ttl
+        self.request_timeout = request_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.hooks["response"].append(self._record_call)
+        self._api_key = None
+        self._validated_at = None
+        self._lock = threading.Lock()
+
+    def _record_call(self, response, *args, **kwargs):
+        # Session response hook: count and time every request by kind (until the headers arrive)
+        url = response.request.url
+        if not url.startswith(self.base_url):
+            endpoint = "download"
+        elif "/predictions/" in url:
+            endpoint = "poll"
+        elif url.split("?")[0].endswith("/predictions"):
+            endpoint = "predictions"
+        else:
+            endpoint = "submit"
+        API_CALLS.inc(provider="wavespeed", endpoint=endpoint, outcome=str(response.status_code))
+        API_SECONDS.observe(response.elapsed.total_seconds(), provider="wavespeed", endpoint=endpoint)
+
+    def api_key(self, force=False) -> Optional[str]:
+        """
+        Return the validated API key, or None if it is missing or rejected.
+        Validation runs at most once per key_ttl unless force is set.
+        """
+        with self._lock:
+            fresh = self._validated_at is not None and time.monotonic() - self._validated_at < self.key_ttl
+            if fresh and not force:
+                return self._api_key
+
+            load_dotenv()
+            api_key = os.getenv("WAVESPEED_API_KEY")
+            if not api_key:
+                log("❌ WAVESPEED_API_KEY not found in environment variables")
+                log("💡 Please add WAVESPEED_API_KEY=your_key_here to your .env file")
+                return None
+
+            self._api_key = self._validate(api_key)
+            self._validated_at = time.monotonic() if self._api_key else None
+            return self._api_key
+
+    def _validate(self, api_key) -> Optional[str]:
+        # Test if the API key is valid by making a simple request
+        try:
+            response = self.session.get(f"{self.base_url}/predictions",
+                                        headers={"Authorization": f"Bearer {api_key}"}, timeout=10)
+            if response.status_code == 200:
+                log("✅ WaveSpeedAI API configured successfully")
+                return api_key
+            elif response.status_code == 401:
+                log("❌ Invalid WaveSpeedAI API key: Unauthorized")
+                return None
+            else:
+                log(f"⚠️ WaveSpeedAI API key test returned status: {response.status_code}")
+                # Still return the key as it might work for generation
+                return api_key
+        except Exception as e:
+            log(f"⚠️ Could not validate WaveSpeedAI API key (may still work): {e}")
+            return api_key
+
+    def _auth_headers(self) -> dict:
+        # Sent only to the API, never to the CDN that serves outputs
+        api_key = self.api_key()
+        if not api_key:
+            raise WaveSpeedError("WaveSpeedAI API key is not configured or invalid")
+        return {"Authorization": f"Bearer {api_key}"}
+
+    def submit(self, model, payload, webhook=None) -> str:
+        """
+        Submit a task to a model endpoint, e.g. "bytedance/seedream-v3"
+        With a webhook URL, WaveSpeed posts the finished prediction there.
+
+        Returns:
+            str: The prediction request ID
+        """
+        headers = self._auth_headers()
+        try:
+            response = self.session.post(f"{self.base_url}/{model}", headers=headers, json=payload,
+                                         params={"webhook": webhook} if webhook else None,
+                                         timeout=self.request_timeout)
+        except requests.exceptions.Timeout:
+            raise WaveSpeedTimeout("API request timeout")
+        except requests.exceptions.RequestException as e:
+            raise WaveSpeedError(f"API request failed: {e}")
+
+        if response.status_code != 200:
+            raise WaveSpeedError(f"Error submitting task: {response.status_code}, {response.text}")
+        try:
+            return response.json()["data"]["id"]
+        except (KeyError, ValueError) as e:
+            raise WaveSpeedError(f"Invalid API response format: {e}")
+
+    def find_prediction(self, model, prompt, since) -> Optional[str]:
+        """
+        Best-effort lookup of a recent prediction by endpoint and prompt, for
+        submissions whose request timed out before the ID came back
+
+        Returns:
+            str or None: The request ID of a matching prediction created after since (epoch seconds)
+        """
+        try:
+            response = self.session.get(f"{self.base_url}/predictions", headers=self._auth_headers(),
+                                        timeout=self.request_timeout)
+            items = response.json()["data"]["items"] if response.status_code == 200 else []
+        except (requests.exceptions.RequestException, KeyError, TypeError, ValueError):
+            return None
+        for item in items:
+            created = item.get("created_at")
+            if isinstance(created, str):
+                try:
+                    created = datetime.fromisoformat(created.replace("Z", "+00:00")).timestamp()
+                except ValueError:
+                    created = None
+            if (item.get("model") == model and (item.get("input") or {}).get("prompt") == prompt
+                    and (created is None or created >= since)):
+                return item.get("id")
+        return None
+
+    def poll(self, request_id) -> dict:
+        """
+        Fetch the current state of a prediction
+
+        Returns:
+            dict: The prediction data ("status", "outputs", "error", ...)
+        """
+        headers = self._auth_headers()
+        try:
+            response = self.session.get(f"{self.base_url}/predictions/{request_id}/result",
+                                        headers=headers, timeout=self.request_timeout)
+        except requests.exceptions.RequestException as e:
+            raise WaveSpeedError(f"Polling error: {e}")
+
+        if response.status_code != 200:
+            raise WaveSpeedError(f"Error checking task status: {response.status_code}, {response.text}")
+        try:
+            return response.json()["data"]
+        except (KeyError, ValueError) as e:
+            raise WaveSpeedError(f"Invalid polling response: {e}")
+
+    def download(self, url, path) -> Path:
+        """
+        Stream a generated file to disk, resuming and verifying it (see utils.downloader)
+        """
+        try:
+            return download_file(self.session, url, path, timeout=self.request_timeout).path
+        except DownloadError as e:
+            raise WaveSpeedError(str(e))
+
+    def run_sync(self, model, payload, output_path) -> Tuple[dict, Optional[str]]:
+        """
+        Submit a task in sync mode and write its first output to output_path
+
+        Base64 outputs are decoded to disk while the response streams in, so the
+        encoded image is never held in memory; URL outputs are downloaded.
+
+        Returns:
+            tuple: (prediction data without the base64 payload, output URL or None)
+
+        The output is decoded into a temporary file next to output_path and only
+        replaces it once the response has been read and checked, so a failed
+        request never leaves a truncated file behind, and an output path that is
+        a hard link into the asset store is replaced rather than rewritten.
+        """
+        output_path = Path(output_path)
+        temporary = output_path.with_name(f".{output_path.name}.{threading.get_ident()}.tmp")
+        headers = self._auth_headers()
+        try:
+            try:
+                with self.session.post(f"{self.base_url}/{model}", headers=headers, json=payload,
+                                       stream=True, timeout=WAVESPEED_SYNC_TIMEOUT) as response:
+                    if response.status_code != 200:
+                        raise WaveSpeedError(f"Error submitting task: {response.status_code}, {response.text}")
+                    with open(temporary, "wb") as f:
+                        written, skeleton = stream_base64_output(response.iter_content(1 << 16), f)
+            except requests.exceptions.Timeout:
+                raise WaveSpeedError("API request timeout")
+            except requests.exceptions.RequestException as e:
+                raise WaveSpeedError(f"API request failed: {e}")
+            except ValueError as e:
+                raise WaveSpeedError(f"Invalid base64 output: {e}")
+
+            try:
+                data = json.loads(skeleton)["data"]
+            except (KeyError, ValueError) as e:
+                raise WaveSpeedError(f"Invalid API response format: {e}")
+            if data.get("status") == "failed":
+                raise WaveSpeedError(f"Task failed: {data.get('error', 'Unknown error')}")
+            if written:
+                os.replace(temporary, output_path)
+                return data, None
+        finally:
+            temporary.unlink(missing_ok=True)
+
+        # Sync mode without base64: the output is a URL
+        outputs = data.get("outputs") or []
+        if not outputs or not outputs[0]:
+            raise WaveSpeedError(f"Task {data.get('id')} returned no output (status: {data.get('status')})")
+        self.download(outputs[0], output_path)
+        return data, outputs[0]
+
+
+def stream_base64_output(chunks, f) -> Tuple[int, bytes]:
+    """
+    Decode the first "outputs" entry of a streamed JSON response into a file
+
+    The entry is decoded in 4-character blocks as it arrives; a data URI prefix
+    and JSON escapes are dropped. Entries that are URLs are not base64 and are
+    left alone: the caller sees them in the returned JSON.
+
+    Args:
+        chunks (iterable): Raw response body chunks
+        f (file): Binary file to write decoded bytes to
+
+    Returns:
+        tuple: (decoded byte count, the response JSON with the decoded entry replaced by "")
+    """
+    head = b""
+    text = b""
+    tail = bytearray()
+    pending = b""
+    written = 0
+    state = "search"
+
+    for chunk in chunks:
+        if state == "done":
+            tail += chunk
+            continue
+        if state == "search":
+            head += chunk
+            match = _OUTPUTS_RE.search(head)
+            if not match:
+                continue
+            head, text = head[:match.end() - 1], head[match.end() - 1:]
+            if not text.startswith(b'"'):
+                # Empty outputs list
+                tail += text
+                text = b""
+                state = "done"
+                continue
+            head += b'"'
+            text = text[1:]
+            state = "prefix"
+        else:
+            text += chunk
+
+        if state == "prefix":
+            closed = b'"' in text
+            if len(text) < 5 and not closed:
+                continue
+            if text.startswith(b"data:"):
+                comma = text.find(b",")
+                if comma < 0 and not closed:
+                    continue
+                if 0 <= comma < (text.find(b'"') if closed else len(text)) and text[:comma].endswith(b";base64"):
+                    text = text[comma + 1:]
+                    state = "decode"
+            elif not text.startswith((b"http", b"/")):
+                state = "decode"
+            if state != "decode":
+                # A URL or other plain string: leave it in the JSON
+                tail += text
+                text = b""
+                state = "done"
+                continue
+
+        end = text.find(b'"')
+        piece = text if end < 0 else text[:end]
+        pending += piece.translate(None, _NOT_BASE64)
+        usable = len(pending) - len(pending) % 4
+        if usable:
+            decoded = base64.b64decode(pending[:usable])
+            f.write(decoded)
+            written += len(decoded)
+            pending = pending[usable:]
+        if end < 0:
+            text = b""
+            continue
+        tail += text[end:]
+        text = b""
+        state = "done"
+
+    if pending:
+        decoded = base64.b64decode(pending + b"=" * (-len(pending) % 4))
+        f.write(decoded)
+        written += len(decoded)
+    return written, head + text + bytes(tail)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_wavespeed_client() -> WaveSpeedClient:
+    """
+    Return the process-wide WaveSpeed client
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = WaveSpeedClient()
+        return _client
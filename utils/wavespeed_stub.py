@@ -0,0 +1,255 @@
+# utils/wavespeed_stub.py
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import requests
+
+API_PREFIX = "/api/v3"
+
+
+class WaveSpeedStubServer:
+    """
+    Local stand-in for the WaveSpeedAI API, for tests and benchmarks.
+
+    Accepts submissions on any model path, reports each job as completed after
+    image_delay (or video_delay for text-to-video models), serves placeholder
+    output files (with Range requests and an MD5 ETag) and, when a submission carries a webhook URL, posts the
+    finished prediction to it. Sync-mode submissions answer once the job is
+    done, with base64 outputs if enable_base64_output is set.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, image_delay=2.0, video_delay=5.0, output_bytes=b"stub-output"):
+        self.image_delay = image_delay
+        self.video_delay = video_delay
+        self.output_bytes = output_bytes
+        self.jobs = {}
+        self.counts = {"submits": 0, "polls": 0, "callbacks": 0, "downloads": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="wavespeed-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _prediction(self, request_id):
+        job = self.jobs[request_id]
+        done = time.monotonic() - job["created"] >= job["delay"]
+        host, port = self._server.server_address[:2]
+        if not done:
+            outputs = []
+        elif job["payload"].get("enable_base64_output"):
+            outputs = [base64.b64encode(self.output_bytes).decode("ascii")]
+        else:
+            outputs = [f"http://{host}:{port}/outputs/{request_id}.{job['extension']}"]
+        return {
+            "id": request_id,
+            "model": job["model"],
+            "outputs": outputs,
+            "status": "completed" if done else "processing",
+            "error": "",
+        }
+
+    def _fire_webhook(self, request_id, webhook):
+        time.sleep(self.jobs[request_id]["delay"])
+        try:
+            requests.post(webhook, json=self._prediction(request_id), timeout=10)
+            self._count("callbacks")
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Stub webhook to {webhook} failed: {e}")
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, body, status=200):
+                raw = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def _authorized(self):
+                if not self.headers.get("Authorization", "").startswith("Bearer "):
+                    self._send_json({"code": 401, "message": "Unauthorized"}, status=401)
+                    return False
+                return True
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                if path.startswith("/outputs/"):
+                    request_id = path.rsplit("/", 1)[1].split(".")[0]
+                    if request_id not in stub.jobs:
+                        self.send_response(404)
+                        self.end_headers()
+                        return
+                    stub._count("downloads")
+                    body = stub.output_bytes
+                    start = 0
+                    ranged = re.match(r'bytes=(\d+)-$', self.headers.get("Range", ""))
+                    if ranged:
+                        start = int(ranged.group(1))
+                        if start >= len(body):
+                            self.send_response(416)
+                            self.send_header("Content-Range", f"bytes */{len(body)}")
+                            self.end_headers()
+                            return
+                        self.send_response(206)
+                        self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                    else:
+                        self.send_response(200)
+                    self.send_header("Content-Length", str(len(body) - start))
+                    self.send_header("Accept-Ranges", "bytes")
+                    self.send_header("ETag", f'"{hashlib.md5(body).hexdigest()}"')
+                    self.end_headers()
+                    self.wfile.write(body[start:])
+                elif not self._authorized():
+                    return
+                elif path == f"{API_PREFIX}/predictions":
+                    self._send_json({"code": 200, "data": {"items": []}})
+                elif path.startswith(f"{API_PREFIX}/predictions/") and path.endswith("/result"):
+                    request_id = path.split("/")[-2]
+                    if request_id not in stub.jobs:
+                        self._send_json({"code": 404, "message": "Not found"}, status=404)
+                        return
+                    stub._count("polls")
+                    self._send_json({"code": 200, "data": stub._prediction(request_id)})
+                else:
+                    self._send_json({"code": 404, "message": "Not found"}, status=404)
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                if not url.path.startswith(API_PREFIX) or not self._authorized():
+                    return
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                model = url.path[len(API_PREFIX) + 1:]
+                is_video = "t2v" in model or "duration" in payload
+                request_id = uuid.uuid4().hex
+                stub.jobs[request_id] = {
+                    "model": model,
+                    "payload": payload,
+                    "created": time.monotonic(),
+                    "delay": stub.video_delay if is_video else stub.image_delay,
+                    "extension": "mp4" if is_video else "jpg",
+                }
+                stub._count("submits")
+                if payload.get("enable_sync_mode"):
+                    time.sleep(stub.jobs[request_id]["delay"])
+                    self._send_json({"code": 200, "data": stub._prediction(request_id)})
+                    return
+                self._send_json({"code": 200, "data": {"id": request_id, "status": "created"}})
+
+                webhook = parse_qs(url.query).get("webhook")
+                if webhook:
+                    threading.Thread(target=stub._fire_webhook, args=(request_id, webhook[0]), daemon=True).start()
+
+        return Handler
+
+
+def benchmark(images=5, image_delay=1.0, image_bytes=2_000_000):
+    """
+    Compare image delivery modes against the stub: round trips, latency and peak memory
+    """
+    import os
+    import tempfile
+    import tracemalloc
+    from pathlib import Path
+
+    from utils.poll_schedule import DEFAULT_SCHEDULES
+    from utils.wavespeed_client import WaveSpeedClient
+
+    os.environ.setdefault("WAVESPEED_API_KEY", "stub")
+    stub = WaveSpeedStubServer(image_delay=image_delay, output_bytes=os.urandom(image_bytes)).start()
+    client = WaveSpeedClient(base_url=stub.base_url)
+    client.api_key()
+    schedule = DEFAULT_SCHEDULES["image"]
+    model = "bytedance/seedream-v3"
+
+    def url_mode(payload, path):
+        request_id = client.submit(model, payload)
+        begin = time.monotonic()
+        while True:
+            time.sleep(schedule.next_delay(time.monotonic() - begin))
+            result = client.poll(request_id)
+            if result["status"] == "completed":
+                return client.download(result["outputs"][0], path)
+
+    def sync_mode(payload, path):
+        return client.run_sync(model, payload, path)
+
+    modes = {
+        "url": (url_mode, {}),
+        "sync": (sync_mode, {"enable_sync_mode": True}),
+        "base64": (sync_mode, {"enable_sync_mode": True, "enable_base64_output": True}),
+    }
+    print(f"Delivery benchmark: {images} images of {image_bytes / 1e6:.1f} MB, {image_delay}s render time")
+    print(f"{'mode':<8} {'requests/img':>13} {'latency s':>10} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, (run, flags) in modes.items():
+            before = sum(stub.counts.values())
+            latencies = []
+            tracemalloc.start()
+            for i in range(images):
+                payload = {"prompt": f"benchmark {i}", "size": "1280*720", "seed": -1, **flags}
+                path = Path(tmp) / f"{mode}_{i}.jpg"
+                started = time.monotonic()
+                run(payload, path)
+                latencies.append(time.monotonic() - started)
+                assert path.stat().st_size == image_bytes
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            requests_per_image = (sum(stub.counts.values()) - before) / images
+            print(f"{mode:<8} {requests_per_image:>13.1f} {sum(latencies) / images:>10.2f} {peak / 1e6:>8.1f}")
+    stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local WaveSpeedAI stub server")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--image-delay", type=float, default=2.0, help="Seconds until an image job completes")
+    parser.add_argument("--video-delay", type=float, default=5.0, help="Seconds until a video job completes")
+    parser.add_argument("--benchmark", action="store_true", help="Compare image delivery modes and exit")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(image_delay=args.image_delay)
+        return
+
+    stub = WaveSpeedStubServer(port=args.port, image_delay=args.image_delay, video_delay=args.video_delay).start()
+    print(f"✅ WaveSpeed stub running: set WAVESPEED_BASE_URL={stub.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# utils/webhook_receiver.py
+import json
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from config.settings import (
+    WAVESPEED_WEBHOOK_HOST,
+    WAVESPEED_WEBHOOK_PORT,
+    WAVESPEED_WEBHOOK_URL,
+)
+from utils.event_log import log
+
+WEBHOOK_PATH = "/wavespeed/webhook"
+
+
+class WebhookReceiver:
+    """
+    Local HTTP receiver for WaveSpeed completion callbacks.
+
+    Each callback's prediction data is passed to on_prediction(request_id, data).
+    Callbacks must carry the receiver's random token, so other requests that
+    reach the port cannot complete jobs. public_url is the address WaveSpeed
+    calls; the receiver is not started without one.
+    """
+
+    def __init__(self, on_prediction, host=WAVESPEED_WEBHOOK_HOST, port=WAVESPEED_WEBHOOK_PORT,
+                 public_url=WAVESPEED_WEBHOOK_URL):
+        if not public_url:
+            raise ValueError("WAVESPEED_WEBHOOK_URL must be set to receive WaveSpeed webhooks")
+        self.on_prediction = on_prediction
+        self.token = secrets.token_urlsafe(16)
+        self.callbacks = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"{public_url}{'&' if '?' in public_url else '?'}token={self.token}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="wavespeed-webhook", daemon=True)
+        self._thread.start()
+        log(f"✅ WaveSpeed webhook receiver listening on port {self._server.server_port}")
+
+    def _handler(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                if url.path != WEBHOOK_PATH or parse_qs(url.query).get("token") != [receiver.token]:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+
+                # Callbacks carry the prediction itself, sometimes wrapped in "data"
+                data = body.get("data", body) if isinstance(body, dict) else {}
+                self.send_response(200)
+                self.end_headers()
+                if data.get("id"):
+                    receiver.callbacks += 1
+                    receiver.on_prediction(data["id"], data)
+
+        return Handler
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()